@@ -24,6 +24,24 @@ target_metadata = Base.metadata
 
 config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
 
+# Full-text search objects created by CONTACTS_SEARCH_DDL in src.database.models rather than by
+# the metadata: the SQLite FTS5 table with its shadow tables, and the PostgreSQL generated column
+# and GIN index. Autogenerate would otherwise propose dropping them.
+SEARCH_TABLES = {"contacts_fts", "contacts_fts_data", "contacts_fts_idx", "contacts_fts_config",
+                 "contacts_fts_docsize", "contacts_fts_content"}
+SEARCH_COLUMNS = {("contacts", "search_vector")}
+SEARCH_INDEXES = {"ix_contacts_search"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table":
+        return name not in SEARCH_TABLES
+    if type_ == "column":
+        return (object.table.name, name) not in SEARCH_COLUMNS
+    if type_ == "index":
+        return name not in SEARCH_INDEXES
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -48,6 +66,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -69,7 +88,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,29 @@
+"""contacts.email unique per user
+
+Revision ID: 2c7e9a4f6b13
+Revises: 9d2f4b7c1e85
+Create Date: 2026-10-17 22:40:18.093657
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7e9a4f6b13'
+down_revision: Union[str, None] = '9d2f4b7c1e85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], unique=True)
+    op.drop_index('ix_contacts_email', table_name='contacts')
+
+
+def downgrade() -> None:
+    # Fails once two users have a contact with the same e-mail.
+    op.create_index('ix_contacts_email', 'contacts', ['email'], unique=True)
+    op.drop_index('ix_contacts_user_id_email', table_name='contacts')
@@ -0,0 +1,78 @@
+"""contacts phone_e164
+
+Revision ID: 5e8b1d3a7c24
+Revises: 2c7e9a4f6b13
+Create Date: 2026-10-17 23:52:41.218306
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b1d3a7c24'
+down_revision: Union[str, None] = '2c7e9a4f6b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 10000
+# Country code of national numbers; override with ``alembic -x phone_country_code=48 upgrade head``.
+DEFAULT_COUNTRY_CODE = '380'
+NON_DIGITS = re.compile(r'\D')
+
+
+def phone_e164(value, country_code):
+    # A frozen copy of src.database.models.phone_e164 as of this revision, so that replaying the
+    # migration gives the same data whatever the app code is by then.
+    if not value:
+        return None
+    value = value.strip()
+    digits = NON_DIGITS.sub('', value)
+    if value.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]
+    elif not digits.startswith(country_code):
+        digits = country_code + digits
+    if not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return None
+    return '+' + digits
+
+
+def upgrade() -> None:
+    country_code = context.get_x_argument(as_dictionary=True).get('phone_country_code', DEFAULT_COUNTRY_CODE)
+    op.add_column('contacts', sa.Column('phone_e164', sa.String(length=16), nullable=True))
+    # The numbers are free-form, so they are normalized in Python, in batches by id; the index is
+    # built once they are all set.
+    contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('phone_number', sa.String),
+                        sa.column('phone_e164', sa.String))
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(contacts.c.id, contacts.c.phone_number)
+            .where(contacts.c.id > last_id, contacts.c.phone_number.is_not(None))
+            .order_by(contacts.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        values = [{'contact_id': contact_id, 'value': phone_e164(phone, country_code)} for contact_id, phone in rows]
+        values = [value for value in values if value['value'] is not None]
+        if values:
+            conn.execute(
+                contacts.update().where(contacts.c.id == sa.bindparam('contact_id'))
+                .values(phone_e164=sa.bindparam('value')),
+                values,
+            )
+        last_id = rows[-1][0]
+    op.create_index('ix_contacts_user_id_phone_e164', 'contacts', ['user_id', 'phone_e164'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_e164', table_name='contacts')
+    op.drop_column('contacts', 'phone_e164')
@@ -0,0 +1,33 @@
+"""case-insensitive unique index on users.email
+
+Revision ID: 9d2f4b7c1e85
+Revises: 5b8d2e6f1a94
+Create Date: 2026-10-17 21:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f4b7c1e85'
+down_revision: Union[str, None] = '5b8d2e6f1a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fails if two users' e-mails differ only in case; merge or rename those accounts first:
+    # SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) > 1
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+    if op.get_bind().dialect.name == 'postgresql':
+        # The case-sensitive constraint is implied by the new index; SQLite cannot drop it in place.
+        op.drop_constraint('users_email_key', 'users', type_='unique')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_unique_constraint('users_email_key', 'users', ['email'])
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,39 @@
+"""contacts birthday_key
+
+Revision ID: c28d6f1e0a37
+Revises: 7a4e0c5b9d12
+Create Date: 2026-10-17 17:21:05.664310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c28d6f1e0a37'
+down_revision: Union[str, None] = '7a4e0c5b9d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_key', sa.SmallInteger(), nullable=True))
+    # Day of a leap year the birthday falls on, see src.database.models.birthday_key.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE contacts SET birthday_key = EXTRACT(DOY FROM make_date(2000, "
+            "EXTRACT(MONTH FROM birthday)::int, EXTRACT(DAY FROM birthday)::int)) WHERE birthday IS NOT NULL"
+        )
+    else:
+        op.execute(
+            "UPDATE contacts SET birthday_key = CAST(strftime('%j', '2000-' || strftime('%m-%d', birthday)) AS INTEGER) "
+            "WHERE birthday IS NOT NULL"
+        )
+    op.create_index('ix_contacts_user_id_birthday_key', 'contacts', ['user_id', 'birthday_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_key', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
@@ -0,0 +1,28 @@
+"""contacts versions
+
+Revision ID: e4b7a1c9f3d2
+Revises: c28d6f1e0a37
+Create Date: 2026-10-17 17:52:41.208137
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a1c9f3d2'
+down_revision: Union[str, None] = 'c28d6f1e0a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('contacts_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'contacts_version')
+    op.drop_column('contacts', 'version')
@@ -0,0 +1,125 @@
+"""
+Avatar upload benchmark: blocking upload in the handler against :class:`AvatarPipeline`.
+
+Runs ``--uploads`` avatar uploads, ``--concurrency`` at a time, of ``--distinct`` different
+``--pixels``-wide PNGs, while a probe task measures how late the event loop wakes it up.
+
+* ``inline`` does what the handler did before: a synchronous upload on the event loop, which
+  sleeps ``--upload-ms`` to stand in for the transfer to Cloudinary.
+* ``pipeline`` accepts the upload with :meth:`AvatarPipeline.accept` and lets the background job
+  resize it and save every size to a storage whose saves take ``--upload-ms`` without blocking.
+
+Reported latency is the time until the request could respond; ``drained`` is until the last
+background job finished.
+
+Usage::
+
+    python -m benchmarks.avatars --uploads 200 --concurrency 20 --upload-ms 150 --distinct 50
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from fastapi import UploadFile
+from PIL import Image
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, User
+from src.services.avatars import AvatarPipeline, LocalAvatarStorage
+
+
+class SlowStorage(LocalAvatarStorage):
+
+    def __init__(self, root: str, latency: float):
+        super().__init__(root, "/static/avatars")
+        self.latency = latency
+        self.saves = 0
+
+    async def save(self, key: str, data: bytes) -> None:
+        await asyncio.sleep(self.latency)
+        self.saves += 1
+        await super().save(key, data)
+
+
+def png(i: int, pixels: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.effect_noise((pixels, pixels), 64 + i).convert("RGB").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - started - 0.005)
+
+
+async def run(mode: str, images: list[bytes], args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add_all([User(username=f"user{i}", email=f"user{i}@example.com", password="x")
+                        for i in range(args.concurrency)])
+            await db.commit()
+        storage = SlowStorage(directory, args.upload_ms / 1000)
+        # No bound on pending uploads: every upload is measured, none rejected.
+        pipeline = AvatarPipeline(storage, session_factory, (250, 100, 50), args.workers, 10 * 1024 * 1024,
+                                  max_pending=args.uploads)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def upload(i: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                file = UploadFile(file=io.BytesIO(images[i % len(images)]), filename="avatar.png")
+                if mode == "inline":
+                    file.file.read()
+                    time.sleep(args.upload_ms / 1000)
+                    storage.saves += 1
+                else:
+                    await pipeline.accept(file, f"user{i % args.concurrency}@example.com")
+                latencies.append(time.perf_counter() - started)
+
+        lags, stop = [], asyncio.Event()
+        prober = asyncio.create_task(probe(lags, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(i) for i in range(args.uploads)))
+        responded = time.perf_counter() - started
+        await pipeline.drain()
+        drained = time.perf_counter() - started
+        stop.set()
+        await prober
+        pipeline.shutdown()
+        await engine.dispose()
+    latencies.sort()
+    print(f"{mode:<9} {args.uploads / responded:>8.1f} {statistics.median(latencies) * 1000:>8.1f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} {max(lags) * 1000:>8.1f} {drained:>8.2f} "
+          f"{pipeline.stats['rendered']:>8} {storage.saves:>6}")
+
+
+async def main(args):
+    images = [png(i, args.pixels) for i in range(args.distinct)]
+    print(f"{'mode':<9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'lag ms':>8} {'drained':>8} {'rendered':>8} "
+          f"{'saves':>6}")
+    for mode in ("inline", "pipeline"):
+        await run(mode, images, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--distinct", type=int, default=50, help="Different images among the uploads.")
+    parser.add_argument("--pixels", type=int, default=1024, help="Width and height of the images.")
+    parser.add_argument("--upload-ms", type=float, default=150)
+    parser.add_argument("--workers", type=int, default=2, help="Resizing pool size.")
+    asyncio.run(main(parser.parse_args()))
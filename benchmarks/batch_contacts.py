@@ -0,0 +1,117 @@
+"""
+Batch update/delete benchmark.
+
+Seeds a SQLite database with ``--contacts`` contacts for one user, then updates and deletes
+``--items`` of them each, once through the per-item ``update_contact``/``remove_contact`` loop
+and once through ``batch_contacts``. ``--latency-ms`` adds a delay to every statement to stand in
+for the round-trip to PostgreSQL. Each run starts from a fresh copy of the seeded database.
+
+Usage::
+
+    python -m benchmarks.batch_contacts --contacts 100000 --items 1000 --latency-ms 1
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactSchema
+
+BATCH = 50_000
+LATENCY = 0.0
+
+
+class SlowCursor(sqlite3.Cursor):
+    def execute(self, *args, **kwargs):
+        time.sleep(LATENCY)
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        time.sleep(LATENCY)
+        return super().executemany(*args, **kwargs)
+
+
+class SlowConnection(sqlite3.Connection):
+    def cursor(self, factory=SlowCursor):
+        return super().cursor(factory)
+
+
+def seed(path: str, contacts: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        for start in range(0, contacts, BATCH):
+            conn.execute(insert(Contact), [
+                {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+                 "phone_number": "0501234567", "user_id": 1}
+                for i in range(start, min(start + BATCH, contacts))
+            ])
+    engine.dispose()
+
+
+def workload(contacts: int, items: int) -> tuple[list[ContactSchema], list[int]]:
+    step = contacts // (2 * items)
+    ids = list(range(1, contacts + 1, step))[:2 * items]
+    updates = [ContactSchema(id=i, first_name=f"Renamed{i}", last_name=f"Last{i}", email=f"r{i}@example.com",
+                             phone_number="0500000000", birthday="1990-05-17", additional_info="batch")
+               for i in ids[::2]]
+    return updates, ids[1::2]
+
+
+async def per_item(db, user, updates, deletes):
+    for body in updates:
+        await repository_contacts.update_contact(body, body.id, db, user)
+    for contact_id in deletes:
+        await repository_contacts.remove_contact(contact_id, db, user)
+
+
+async def batched(db, user, updates, deletes):
+    results = await repository_contacts.batch_contacts(updates, deletes, db, user)
+    assert all(result.status in ("updated", "deleted") for result in results)
+
+
+async def run(path: str, method, updates, deletes) -> float:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"factory": SlowConnection})
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        await method(db, User(id=1), updates, deletes)
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=1000, help="Updates and deletes each.")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    LATENCY = args.latency_ms / 1000
+
+    updates, deletes = workload(args.contacts, args.items)
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = os.path.join(tmp, "seed.db")
+        seed(seeded, args.contacts)
+        print(f"contacts={args.contacts} updates={len(updates)} deletes={len(deletes)} latency={args.latency_ms} ms")
+        for name, method in (("per-item", per_item), ("batch", batched)):
+            path = os.path.join(tmp, f"{name}.db")
+            shutil.copy(seeded, path)
+            elapsed = asyncio.run(run(path, method, updates, deletes))
+            print(f"{name:>9}: {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Upcoming birthdays benchmark.
+
+Seeds ``--users`` users with ``--contacts`` contacts each (random birthdays) and compares the old
+``extract('month'/'day', ...)`` filter with the ``birthday_key`` range query of
+``get_birthdays_week`` for the first user.
+
+Usage::
+
+    python -m benchmarks.birthdays --users 5 --contacts 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.sql import extract
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+
+BATCH = 50_000
+
+
+def seed(path: str, users: int, contacts: int) -> User:
+    rnd = random.Random(42)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "username": f"u{u}", "email": f"u{u}@example.com", "password": "x"}
+                                    for u in range(1, users + 1)])
+        for user_id in range(1, users + 1):
+            for start in range(0, contacts, BATCH):
+                conn.execute(insert(Contact), [
+                    {"first_name": "First", "last_name": "Last", "email": f"c{user_id}-{i}@example.com",
+                     "birthday": date(1950, 1, 1) + timedelta(days=rnd.randrange(365 * 50)), "user_id": user_id}
+                    for i in range(start, min(start + BATCH, contacts))
+                ])
+    engine.dispose()
+    return User(id=1)
+
+
+async def extract_search(db, user: User):
+    # The query as it was before birthday_key.
+    today = date.today()
+    end_date = today + timedelta(days=7)
+    stmt = select(Contact).filter(
+        (Contact.user_id == user.id) &
+        (extract('month', Contact.birthday) == today.month) & (extract('day', Contact.birthday) >= today.day)
+        & (extract('month', Contact.birthday) == end_date.month) & (extract('day', Contact.birthday) <= end_date.day)
+    )
+    return (await db.execute(stmt)).scalars().all()
+
+
+async def timed(fn, repeat: int):
+    result = await fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - started) / repeat * 1000, len(result)
+
+
+async def bench(path: str, user: User, args):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    async with SessionLocal() as db:
+        old_ms, old_rows = await timed(lambda: extract_search(db, user), args.repeat)
+        print(f"extract(), 7 days      : {old_ms:8.2f} ms  rows={old_rows}")
+        for days in (7, 30):
+            ms, rows = await timed(lambda: repository_contacts.get_birthdays_week(db, user, days), args.repeat)
+            print(f"birthday_key, {days:>2} days : {ms:8.2f} ms  rows={rows}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--contacts", type=int, default=200_000, help="Contacts per user.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        user = seed(path, args.users, args.contacts)
+        print(f"seeded {args.users * args.contacts} contacts in {time.perf_counter() - started:.1f}s")
+        asyncio.run(bench(path, user, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Conditional GET benchmark for the contact reads.
+
+Seeds a SQLite database with one user owning ``--contacts`` contacts and times the
+``read_contacts`` and ``get_contact`` handlers, including the JSON encoding FastAPI would do,
+without ``If-None-Match`` and with the ``ETag`` of the previous response.
+
+Usage::
+
+    python -m benchmarks.conditional_get --contacts 10000 --limit 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.routes.contacts import read_contacts, get_contact
+from src.schemas import ContactSchema
+
+contacts_adapter = TypeAdapter(list[ContactSchema])
+
+
+def seed(path: str, contacts: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        conn.execute(insert(Contact), [
+            {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+             "phone_number": "0501234567", "user_id": 1}
+            for i in range(contacts)
+        ])
+    engine.dispose()
+
+
+def body_size(result) -> int:
+    if isinstance(result, Response):
+        return len(result.body)
+    if isinstance(result, list):
+        return len(contacts_adapter.dump_json(result))
+    return len(ContactSchema.model_validate(result).model_dump_json())
+
+
+async def timed(handler, repeat: int) -> tuple[float, int]:
+    size = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        size = body_size(await handler())
+    return (time.perf_counter() - started) / repeat * 1000, size
+
+
+async def bench(path: str, args):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    user = User(id=1)
+    async with SessionLocal() as db:
+        contact_response = Response()
+        list_response = await read_contacts(args.limit, 0, None, None, db, user)
+        await get_contact(contact_response, 1, None, db, user)
+        cases = {
+            "list": lambda etag: read_contacts(args.limit, 0, None, etag, db, user),
+            "contact": lambda etag: get_contact(Response(), 1, etag, db, user),
+        }
+        etags = {"list": list_response.headers["ETag"], "contact": contact_response.headers["ETag"]}
+        print(f"contacts={args.contacts} limit={args.limit}")
+        print(f"{'read':>8} {'full ms':>9} {'bytes':>7} {'304 ms':>8} {'bytes':>6}")
+        for name, handler in cases.items():
+            full_ms, full_size = await timed(lambda: handler(None), args.repeat)
+            cond_ms, cond_size = await timed(lambda: handler(etags[name]), args.repeat)
+            print(f"{name:>8} {full_ms:>9.2f} {full_size:>7} {cond_ms:>8.2f} {cond_size:>6}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, args.contacts)
+        asyncio.run(bench(path, args))
+
+
+if __name__ == "__main__":
+    main()
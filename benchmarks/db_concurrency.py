@@ -0,0 +1,130 @@
+"""
+Concurrency benchmark for the database layer.
+
+Compares the old blocking ``Session.query(...)`` access with the ``AsyncSession`` repositories
+under parallel load. A per-statement latency is injected into the SQLite driver to stand in
+for the network round-trip to PostgreSQL, so the numbers show how many round-trips a single
+event loop can overlap.
+
+Usage::
+
+    python -m benchmarks.db_concurrency --requests 2000 --concurrency 100 --latency-ms 5
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, and_
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+
+
+LATENCY = 0.0
+
+
+class SlowCursor(sqlite3.Cursor):
+    def execute(self, *args, **kwargs):
+        time.sleep(LATENCY)
+        return super().execute(*args, **kwargs)
+
+
+class SlowConnection(sqlite3.Connection):
+    def cursor(self, factory=SlowCursor):
+        return super().cursor(factory)
+
+
+def seed(path: str, contacts: int) -> User:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine, expire_on_commit=False)() as db:
+        user = User(username="bench", email="bench@example.com", password="x", confirmed=True)
+        db.add(user)
+        db.flush()
+        db.add_all(Contact(first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com",
+                           phone_number="0501234567", user_id=user.id) for i in range(contacts))
+        db.commit()
+        db.expunge(user)
+    engine.dispose()
+    return user
+
+
+async def run(handler, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await handler()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def bench_sync(path: str, user: User, args) -> float:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"factory": SlowConnection, "check_same_thread": False},
+                           poolclass=QueuePool, pool_size=args.pool_size)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    async def handler():
+        # Baseline: what the repositories did before, a blocking query inside a coroutine.
+        db = SessionLocal()
+        try:
+            db.query(Contact).filter(and_(Contact.user_id == user.id)).limit(10).offset(0).all()
+        finally:
+            db.close()
+
+    try:
+        return await run(handler, args.requests, args.concurrency)
+    finally:
+        engine.dispose()
+
+
+async def bench_async(path: str, user: User, args) -> float:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"factory": SlowConnection},
+                                 poolclass=AsyncAdaptedQueuePool, pool_size=args.pool_size)
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def handler():
+        async with SessionLocal() as db:
+            await repository_contacts.get_contacts(10, 0, db, user)
+
+    try:
+        return await run(handler, args.requests, args.concurrency)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated DB round-trip per statement.")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=1000)
+    args = parser.parse_args()
+    LATENCY = args.latency_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        user = seed(path, args.contacts)
+        sync_rps = asyncio.run(bench_sync(path, user, args))
+        async_rps = asyncio.run(bench_async(path, user, args))
+
+    print(f"requests={args.requests} concurrency={args.concurrency} latency={args.latency_ms}ms")
+    print(f"sync Session   : {sync_rps:10.1f} req/s")
+    print(f"AsyncSession   : {async_rps:10.1f} req/s")
+    print(f"speed-up       : {async_rps / sync_rps:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Duplicate contacts benchmark: pairwise comparison against blocking keys.
+
+Seeds a SQLite database with one user owning ``--contacts`` contacts drawn like
+``benchmarks.generate_data`` does, then adds a near copy of every ``--duplicate-every``-th one:
+the e-mail in another case or with a ``+tag``, the phone number with the country code, or the
+first name spelled differently with the birthday and no e-mail or phone.
+
+* ``pairwise`` compares every pair of a ``--pairwise-sample`` contacts sample with the same rules;
+  its time for all contacts is extrapolated quadratically.
+* ``blocking`` is :func:`services.duplicates.find_duplicates` over all contacts, read from the
+  database.
+
+Reported are the time, the groups found, the groups mixing contacts that are not copies of each
+other, and the share of planted copies found, by kind. Then the
+first ``--merges`` groups are merged with :func:`repository.contacts.merge_contacts`.
+
+Usage::
+
+    python -m benchmarks.duplicates --contacts 500000 --duplicate-every 20
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from random import Random
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.generate_data import FIRST_NAMES, LAST_NAMES, DOMAINS, OPERATORS, BIRTHDAY_RANGE
+from src.conf.config import settings
+from src.database.models import Base, Contact, User, phone_e164
+from src.repository.contacts import merge_contacts
+from src.services.duplicates import DuplicateFinder, find_duplicates, name_key, normalize_email
+
+BATCH = 50_000
+FIELDS = ("id", "first_name", "last_name", "email", "phone_number", "birthday")
+KINDS = ("email", "phone", "name")
+# Spellings with the same Soundex code.
+RESPELLINGS = {"a": "e", "o": "u", "i": "y", "y": "i", "e": "a", "u": "o"}
+
+
+def respell(name: str) -> str:
+    for position in range(len(name) - 1, 0, -1):
+        if name[position] in RESPELLINGS:
+            return name[:position] + RESPELLINGS[name[position]] + name[position + 1:]
+    return name + "e"
+
+
+def generate(contacts: int, duplicate_every: int, seed: int) -> tuple[list[dict], dict[int, tuple[int, str]]]:
+    random = Random(seed)
+    rows, planted = [], {}
+    for i in itertools.count(1):
+        if len(rows) >= contacts:
+            break
+        first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+        row = {
+            "id": len(rows) + 1, "first_name": first, "last_name": last,
+            "email": f"{first.lower()}.{last.lower()}{len(rows) + 1}@{random.choice(DOMAINS)}",
+            # Distinct numbers: random ones would collide by the thousand at this size.
+            "phone_number": f"0{random.choice(OPERATORS)}{len(rows) * 7919 % 10 ** 7:07d}",
+            "birthday": date.fromordinal(random.randint(*BIRTHDAY_RANGE)), "additional_info": None, "user_id": 1,
+        }
+        rows.append(row)
+        if i % duplicate_every or len(rows) >= contacts:
+            continue
+        kind = KINDS[(i // duplicate_every) % len(KINDS)]
+        copy = {**row, "id": len(rows) + 1, "email": None, "phone_number": None, "birthday": None}
+        if kind == "email":
+            local, domain = row["email"].split("@")
+            copy["email"] = f"{local}+imported@{domain}".upper()
+        elif kind == "phone":
+            copy["phone_number"] = f"+38 {row['phone_number'][:3]} {row['phone_number'][3:]}"
+        else:
+            copy["first_name"], copy["birthday"] = respell(first), row["birthday"]
+        rows.append(copy)
+        planted[copy["id"]] = (row["id"], kind)
+    return rows, planted
+
+
+def seed_database(path: str, rows: list[dict]):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        for start in range(0, len(rows), BATCH):
+            conn.execute(insert(Contact), rows[start:start + BATCH])
+    engine.dispose()
+
+
+def pairwise(rows: list[tuple]) -> list[tuple[list[int], list[str]]]:
+    finder = DuplicateFinder(max_block=0)
+    keys = []
+    for contact_id, first_name, last_name, email, phone_number, birthday in rows:
+        keys.append((contact_id, normalize_email(email), phone_e164(phone_number),
+                     name_key(first_name, last_name), birthday))
+    for i, (a, email_a, phone_a, name_a, birthday_a) in enumerate(keys):
+        for b, email_b, phone_b, name_b, birthday_b in keys[i + 1:]:
+            if email_a and email_a == email_b:
+                finder.union(a, b, "email")
+            elif phone_a and phone_a == phone_b:
+                finder.union(a, b, "phone")
+            elif name_a == name_b and not (email_a and email_b or phone_a and phone_b
+                                           or birthday_a and birthday_b and birthday_a != birthday_b):
+                finder.union(a, b, "name")
+    return finder.groups()[0]
+
+
+def mixed(groups, planted: dict[int, tuple[int, str]]) -> int:
+    return sum(len({planted.get(contact_id, (contact_id,))[0] for contact_id in members}) > 1
+               for members, _ in groups)
+
+
+def found_share(groups, planted: dict[int, tuple[int, str]], ids: set[int] | None = None) -> dict[str, float]:
+    group_of = {contact_id: n for n, (members, _) in enumerate(groups) for contact_id in members}
+    found, total = dict.fromkeys(KINDS, 0), dict.fromkeys(KINDS, 0)
+    for copy, (original, kind) in planted.items():
+        if ids is not None and (copy not in ids or original not in ids):
+            continue
+        total[kind] += 1
+        found[kind] += copy in group_of and group_of[copy] == group_of.get(original)
+    return {kind: found[kind] / total[kind] if total[kind] else 0.0 for kind in KINDS}
+
+
+def report(name: str, elapsed: float, groups, planted: dict[int, tuple[int, str]], share: dict[str, float],
+           note: str = "") -> None:
+    print(f"{name:<9} {elapsed:>9.2f} {len(groups):>8} {mixed(groups, planted):>6} "
+          + " ".join(f"{share[kind]:>6.1%}" for kind in KINDS) + note)
+
+
+async def main(args):
+    rows, planted = generate(args.contacts, args.duplicate_every, args.seed)
+    print(f"{len(rows)} contacts, {len(planted)} planted copies, max block {settings.duplicates_max_block}\n")
+    print(f"{'mode':<9} {'seconds':>9} {'groups':>8} {'mixed':>6} {'email':>6} {'phone':>6} {'name':>6}")
+
+    sample = [tuple(row[name] for name in FIELDS) for row in rows[:args.pairwise_sample]]
+    started = time.perf_counter()
+    groups = pairwise(sample)
+    elapsed = time.perf_counter() - started
+    scale = (len(rows) / len(sample)) ** 2
+    report("pairwise", elapsed, groups, planted, found_share(groups, planted, {row[0] for row in sample}),
+           f"   {len(sample)} contacts; ~{elapsed * scale:.0f} s for all")
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(f"{directory}/bench.db", rows)
+        del rows
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        user = User(id=1)
+        async with session_factory() as db:
+            started = time.perf_counter()
+            groups, skipped = await find_duplicates(db, user)
+            elapsed = time.perf_counter() - started
+        report("blocking", elapsed, groups, planted, found_share(groups, planted), f"   {skipped} blocks skipped")
+
+        started = time.perf_counter()
+        for members, _ in groups[:args.merges]:
+            async with session_factory() as db:
+                await merge_contacts(members[0], members[1:], db, user)
+        elapsed = time.perf_counter() - started
+        merges = min(args.merges, len(groups))
+        print(f"\nmerge     {elapsed / max(merges, 1) * 1000:.2f} ms per group, {merges} groups")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=500_000)
+    parser.add_argument("--duplicate-every", type=int, default=20)
+    parser.add_argument("--pairwise-sample", type=int, default=5000)
+    parser.add_argument("--merges", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
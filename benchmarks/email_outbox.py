@@ -0,0 +1,130 @@
+"""
+E-mail delivery benchmark: a connection per message against the outbox worker.
+
+Sends ``--messages`` confirmation e-mails to a local stub SMTP server that answers every command
+after ``--rtt-ms`` and greets a new session after ``--handshake-ms`` more, standing in for the
+network round-trip and the TLS handshake of a real server.
+
+* ``per-message`` opens, uses and quits a session for every e-mail, ``--concurrency`` at a time,
+  as the signup background tasks did.
+* ``outbox`` enqueues the e-mails in a temporary SQLite outbox and lets :class:`OutboxWorker`
+  send them in batches of ``--batch-size`` over ``--pool-size`` kept sessions.
+
+Usage::
+
+    python -m benchmarks.email_outbox --messages 500 --rtt-ms 5 --handshake-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base
+from src.repository import outbox as repository_outbox
+from src.services.email import SMTPPool, SMTPSender, build_messages
+from src.services.outbox import OutboxWorker
+
+
+class SlowSMTPServer:
+
+    def __init__(self, rtt: float, handshake: float):
+        self.rtt = rtt
+        self.handshake = handshake
+        self.sessions = 0
+        self.messages = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.sessions += 1
+        await asyncio.sleep(self.handshake + self.rtt)
+        writer.write(b"220 stub ESMTP\r\n")
+        try:
+            while line := await reader.readline():
+                verb = line[:4].upper()
+                await asyncio.sleep(self.rtt)
+                if verb == b"EHLO":
+                    writer.write(b"250-stub\r\n250 8BITMIME\r\n")
+                elif verb == b"DATA":
+                    writer.write(b"354 Go ahead\r\n")
+                    await writer.drain()
+                    await reader.readuntil(b"\r\n.\r\n")
+                    await asyncio.sleep(self.rtt)
+                    self.messages += 1
+                    writer.write(b"250 OK\r\n")
+                elif verb == b"QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    break
+                else:
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+STUB_OPTIONS = {"hostname": "127.0.0.1", "use_tls": False, "start_tls": False}
+
+
+def recipients(count: int) -> list[tuple[str, str, str]]:
+    return [(f"user{i}@example.com", f"user{i}", "http://localhost:8000/") for i in range(count)]
+
+
+async def per_message(port: int, args) -> None:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(recipient):
+        async with semaphore:
+            smtp = SMTPSender(port=port, **STUB_OPTIONS)
+            await smtp.send_many(build_messages("confirm_email", [recipient]))
+            await smtp.close()
+
+    await asyncio.gather(*(send(recipient) for recipient in recipients(args.messages)))
+
+
+async def outbox(port: int, args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/outbox.db")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        async with session_factory() as db:
+            for email, username, host in recipients(args.messages):
+                await repository_outbox.enqueue_email("confirm_email", email, username, host, db, commit=False)
+            await db.commit()
+        worker = OutboxWorker(session_factory, SMTPPool(args.pool_size, port=port, **STUB_OPTIONS),
+                              batch_size=args.batch_size)
+        while await worker.send_batch():
+            pass
+        await worker.sender.close()
+        await engine.dispose()
+
+
+async def main(args):
+    print(f"{'mode':<12} {'sessions':>8} {'sent':>6} {'seconds':>8} {'mail/s':>8}")
+    for mode in (per_message, outbox):
+        server = SlowSMTPServer(args.rtt_ms / 1000, args.handshake_ms / 1000)
+        stub = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = stub.sockets[0].getsockname()[1]
+        started = time.perf_counter()
+        await mode(port, args)
+        elapsed = time.perf_counter() - started
+        stub.close()
+        await stub.wait_closed()
+        print(f"{mode.__name__.replace('_', '-'):<12} {server.sessions:>8} {server.messages:>6} {elapsed:>8.2f} "
+              f"{server.messages / elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10, help="Parallel sessions of per-message.")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=4, help="Kept sessions of outbox.")
+    parser.add_argument("--rtt-ms", type=float, default=5)
+    parser.add_argument("--handshake-ms", type=float, default=50)
+    asyncio.run(main(parser.parse_args()))
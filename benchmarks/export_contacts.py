@@ -0,0 +1,107 @@
+"""
+Contacts export benchmark.
+
+Seeds a SQLite database with one user owning ``--contacts`` contacts and exports them two ways:
+by loading every contact as ORM objects and ``ContactSchema`` models, as paging through
+``read_contacts`` and joining the pages does, and through the streaming ``export_contacts``.
+Reports total time, time to the first chunk and, from a second traced run, peak Python memory.
+
+Usage::
+
+    python -m benchmarks.export_contacts --contacts 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactSchema
+from src.services.contacts_export import export_contacts
+
+BATCH = 50_000
+PAGE = 1000
+
+
+def seed(path: str, contacts: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        for start in range(0, contacts, BATCH):
+            conn.execute(insert(Contact), [
+                {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+                 "phone_number": "0501234567", "additional_info": "seeded", "user_id": 1}
+                for i in range(start, min(start + BATCH, contacts))
+            ])
+    engine.dispose()
+
+
+async def materialized(db, user) -> tuple[int, float]:
+    contacts, after_id = [], None
+    while page := await repository_contacts.get_contacts_after(PAGE, after_id, db, user):
+        contacts.extend(ContactSchema.model_validate(contact) for contact in page)
+        after_id = page[-1].id
+    body = json.dumps([contact.model_dump(mode="json") for contact in contacts]).encode()
+    return len(body), time.perf_counter()
+
+
+async def streamed(db, user, fmt: str) -> tuple[int, float]:
+    size, first = 0, None
+    async for chunk in export_contacts(fmt, db, user):
+        first = first or time.perf_counter()
+        size += len(chunk)
+    return size, first
+
+
+async def run(path: str, name: str, fmt: str) -> tuple[int, float, float]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        if name == "materialized":
+            size, first = await materialized(db, User(id=1))
+        else:
+            size, first = await streamed(db, User(id=1), fmt)
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return size, elapsed, first - started
+
+
+def traced(path: str, name: str, fmt: str) -> int:
+    # A separate run: tracing slows allocation-heavy code several times over.
+    tracemalloc.start()
+    asyncio.run(run(path, name, fmt))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, args.contacts)
+        print(f"contacts={args.contacts}")
+        print(f"{'method':>18} {'MiB out':>8} {'total s':>8} {'first ms':>9} {'peak MiB':>9}")
+        for name, fmt in (("materialized", "json"), ("stream", "ndjson"), ("stream", "csv")):
+            size, elapsed, first = asyncio.run(run(path, name, fmt))
+            peak = traced(path, name, fmt)
+            print(f"{name + ' ' + fmt:>18} {size / 2 ** 20:>8.1f} {elapsed:>8.1f} {first * 1000:>9.0f} "
+                  f"{peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Synthetic users and contacts for scale testing.
+
+Appends ``--users`` users and ``--contacts`` contacts to the database at ``--url`` (the app's
+``SQLALCHEMY_DATABASE_URL`` by default). Contacts are spread over the new users with a Zipf
+distribution of exponent ``--skew``, so a few users own large address books and most own small
+ones, and their IDs interleave as if they had been added over time. Names, e-mails, phone
+numbers and birthdays are drawn from ``random.Random(--seed)``: the same arguments against the
+same database produce the same rows.
+
+Rows go in with batched ``executemany`` on SQLite and ``COPY`` on PostgreSQL, with the contact
+indexes dropped during the load and rebuilt afterwards (unless ``--keep-indexes``). On SQLite
+the full-text index is filled with one set-based insert instead of the per-row trigger.
+All users get the password ``--password``, hashed once.
+
+Usage::
+
+    python -m benchmarks.generate_data --users 100000 --contacts 10000000 --seed 42
+    python -m benchmarks.generate_data --url sqlite:///./scale.db --create-tables --contacts 1000000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+from datetime import date
+from random import Random
+from typing import Iterator
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import Connection
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.conf.config import settings
+from src.database.models import Base, Contact, User, birthday_key, CONTACTS_FTS_INSERT_TRIGGER, CONTACTS_SEARCH_DDL
+from src.services.auth import auth_service
+
+FIRST_NAMES = [
+    "Olena", "Andrii", "Iryna", "Oleksandr", "Nataliia", "Dmytro", "Tetiana", "Serhii", "Yuliia", "Volodymyr",
+    "Kateryna", "Mykola", "Oksana", "Ivan", "Mariia", "Yaroslav", "Anastasiia", "Bohdan", "Sofiia", "Taras",
+    "Viktoriia", "Roman", "Halyna", "Petro", "Liudmyla", "Maksym", "Daryna", "Artem", "Khrystyna", "Vasyl",
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Daniel", "Karen",
+    "Anna", "Piotr", "Katarzyna", "Jan", "Lukas", "Emma", "Noah", "Mia", "Liam", "Chloe",
+]
+LAST_NAMES = [
+    "Melnyk", "Shevchenko", "Kovalenko", "Bondarenko", "Boiko", "Tkachenko", "Kravchenko", "Kovalchuk",
+    "Koval", "Oliinyk", "Shevchuk", "Polishchuk", "Bondar", "Tkachuk", "Marchenko", "Lysenko", "Rudenko",
+    "Savchenko", "Petrenko", "Moroz", "Kravets", "Pavlenko", "Kuzmenko", "Levchenko", "Kharchenko",
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Wilson", "Anderson", "Taylor", "Thomas", "Moore", "Jackson", "Martin", "Lee", "Thompson", "White",
+    "Nowak", "Kowalski", "Wisniewski", "Muller", "Schmidt", "Schneider", "Fischer", "Weber", "Rossi", "Bianchi",
+]
+DOMAINS = ["gmail.com", "ukr.net", "i.ua", "outlook.com", "yahoo.com", "meta.ua", "proton.me", "icloud.com"]
+DOMAIN_WEIGHTS = list(itertools.accumulate([40, 20, 8, 10, 6, 4, 4, 8]))
+OPERATORS = ["50", "66", "95", "99", "67", "68", "96", "97", "98", "63", "73", "93"]
+NOTES = ["work", "family", "friend", "gym", "school", "neighbour", "conference", "client", "doctor"]
+
+# Birthdays between these dates, as ordinals; about one contact in ten has none.
+BIRTHDAY_RANGE = (date(1940, 1, 1).toordinal(), date(2012, 12, 31).toordinal())
+NO_BIRTHDAY_SHARE = 0.1
+NOTES_SHARE = 0.3
+
+CONTACT_COLUMNS = ("id", "first_name", "last_name", "email", "phone_number", "phone_e164", "birthday",
+                   "birthday_key", "additional_info", "version", "user_id")
+USER_COLUMNS = ("id", "username", "email", "password", "avatar", "refresh_token", "confirmed", "contacts_version")
+
+
+def owner_weights(users: int, skew: float) -> list[float]:
+    """
+    Cumulative Zipf weights of users 1..n, for ``Random.choices``.
+
+    :param users: Number of users.
+    :type users: int
+    :param skew: Zipf exponent; 0 spreads contacts evenly.
+    :type skew: float
+    :return: Cumulative weights.
+    :rtype: list[float]
+    """
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, users + 1)))
+
+
+def generate_users(rng: Random, first_id: int, count: int, password_hash: str) -> list[tuple]:
+    rows = []
+    for user_id in range(first_id, first_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append((user_id, f"{first.lower()}{user_id}"[:50], f"{first}.{last}.u{user_id}@example.com".lower(),
+                     password_hash, None, None, True, 0))
+    return rows
+
+
+def generate_contacts(rng: Random, first_id: int, count: int, user_ids: range, skew: float,
+                      batch_size: int) -> Iterator[list[tuple]]:
+    """
+    Yield batches of contact rows in ``CONTACT_COLUMNS`` order.
+
+    Every field is drawn a batch at a time with ``Random.choices`` from a precomputed pool,
+    which is several times faster than a call per field.
+
+    :param rng: Seeded random generator.
+    :type rng: Random
+    :param first_id: ID of the first contact.
+    :type first_id: int
+    :param count: Number of contacts.
+    :type count: int
+    :param user_ids: IDs of the owners.
+    :type user_ids: range
+    :param skew: Zipf exponent of contacts per user.
+    :type skew: float
+    :param batch_size: Rows per batch.
+    :type batch_size: int
+    :return: Batches of rows.
+    :rtype: Iterator[list[tuple]]
+    """
+    weights = owner_weights(len(user_ids), skew)
+    low, high = BIRTHDAY_RANGE
+    days = [(day.isoformat(), birthday_key(day)) for day in map(date.fromordinal, range(low, high + 1))]
+    birthdays = days + [(None, None)] * round(len(days) * NO_BIRTHDAY_SHARE / (1 - NO_BIRTHDAY_SHARE))
+    notes = NOTES + [None] * round(len(NOTES) * (1 - NOTES_SHARE) / NOTES_SHARE)
+    numbers = range(10_000_000)
+    for start in range(first_id, first_id + count, batch_size):
+        size = min(batch_size, first_id + count - start)
+        rows = []
+        for contact_id, owner, first, last, domain, operator, number, (birthday, key), note in zip(
+            range(start, start + size),
+            rng.choices(user_ids, cum_weights=weights, k=size),
+            rng.choices(FIRST_NAMES, k=size),
+            rng.choices(LAST_NAMES, k=size),
+            rng.choices(DOMAINS, cum_weights=DOMAIN_WEIGHTS, k=size),
+            rng.choices(OPERATORS, k=size),
+            rng.choices(numbers, k=size),
+            rng.choices(birthdays, k=size),
+            rng.choices(notes, k=size),
+        ):
+            # Numbers are drawn in E.164 already, so phone_e164 is the same string.
+            phone = f"+380{operator}{number:07d}"
+            rows.append((contact_id, first, last, f"{first}.{last}.{contact_id:x}@{domain}".lower(),
+                         phone, phone, birthday, key, note, 0, owner))
+        yield rows
+
+
+def next_id(conn: Connection, column) -> int:
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def drop_indexes(conn: Connection) -> list:
+    indexes = [index for index in Contact.__table__.indexes]
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("DROP INDEX IF EXISTS ix_contacts_search"))
+    return indexes
+
+
+def create_indexes(conn: Connection, indexes: list) -> None:
+    for index in indexes:
+        index.create(conn, checkfirst=True)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(CONTACTS_SEARCH_DDL["postgresql"][-1]))
+
+
+def insert_sqlite(conn: Connection, table: str, columns: tuple, batches) -> int:
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    total = 0
+    for rows in batches:
+        conn.exec_driver_sql(sql, rows)
+        total += len(rows)
+        progress(table, total)
+    return total
+
+
+def insert_postgresql(conn: Connection, table: str, columns: tuple, batches) -> int:
+    cursor = conn.connection.dbapi_connection.cursor()
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    for rows in batches:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        total += len(rows)
+        progress(table, total)
+    conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+    return total
+
+
+def progress(table: str, total: int) -> None:
+    print(f"\r{table}: {total:,}", end="", file=sys.stderr, flush=True)
+
+
+def generate(args) -> None:
+    engine = create_engine(args.url)
+    if args.create_tables:
+        Base.metadata.create_all(bind=engine)
+    password_hash = asyncio.run(auth_service.get_password_hash(args.password))
+    rng = Random(args.seed)
+    dialect = engine.dialect.name
+    insert = {"sqlite": insert_sqlite, "postgresql": insert_postgresql}[dialect]
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            conn.exec_driver_sql(f"PRAGMA cache_size=-{settings.import_sqlite_cache_kib}")
+            conn.exec_driver_sql("DROP TRIGGER IF EXISTS contacts_fts_insert")
+        first_user, first_contact = next_id(conn, User.id), next_id(conn, Contact.id)
+        insert(conn, "users", USER_COLUMNS, [generate_users(rng, first_user, args.users, password_hash)])
+        print(file=sys.stderr)
+        indexes = [] if args.keep_indexes else drop_indexes(conn)
+        user_ids = range(first_user, first_user + args.users)
+        insert(conn, "contacts", CONTACT_COLUMNS,
+               generate_contacts(rng, first_contact, args.contacts, user_ids, args.skew, args.batch_size))
+        print(file=sys.stderr)
+        loaded = time.perf_counter()
+        create_indexes(conn, indexes)
+        if dialect == "sqlite":
+            conn.exec_driver_sql(
+                "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+                "SELECT id, first_name, last_name, email FROM contacts WHERE id >= ?", (first_contact,)
+            )
+            conn.exec_driver_sql(CONTACTS_FTS_INSERT_TRIGGER)
+    engine.dispose()
+    finished = time.perf_counter()
+    print(f"users={args.users:,} contacts={args.contacts:,} load {loaded - started:.1f} s, "
+          f"indexes {finished - loaded:.1f} s, total {finished - started:.1f} s "
+          f"({args.contacts / (finished - started):,.0f} contacts/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.sqlalchemy_database_url, help="Synchronous database URL.")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of contacts per user.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument("--keep-indexes", action="store_true", help="Do not drop indexes during the load.")
+    args = parser.parse_args()
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
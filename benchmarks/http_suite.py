@@ -0,0 +1,332 @@
+"""
+HTTP benchmark suite for the API.
+
+Drives ``main.app`` in-process through ``httpx.ASGITransport`` against a fresh SQLite database
+and a fake (``fakeredis[lua]``) or real Redis. Every scenario sends ``--requests`` requests from
+``--concurrency`` concurrent clients and reports throughput and p50/p95/p99 latency. Scenarios
+run in order, so that delete removes the contacts create made.
+
+Signup only adds to the e-mail outbox, whose worker is not started; avatars go to a local
+directory instead of Cloudinary. Rate limits are raised so that they never reject, and are
+reconciled with Redis in the background as in production. Results are written as JSON to ``--output``; ``--compare`` prints
+the change against such a file from an earlier run.
+
+Usage::
+
+    python -m benchmarks.http_suite --concurrency 10 --requests 500 --output before.json
+    python -m benchmarks.http_suite --concurrency 10 --requests 500 --compare before.json
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import redis.asyncio as redis
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from main import app
+from src.database.connect import get_db
+from src.database.models import Base, Contact, User, birthday_key
+from src.database.pool import pool_options
+from src.services.auth import auth_service
+from src.services.avatars import LocalAvatarStorage, avatar_pipeline
+from src.services.cache import user_cache, response_cache
+from src.services.rate_limit import Limit, rate_limiter
+from src.services.refresh_tokens import refresh_tokens
+
+PASSWORD = "secret12"
+SCENARIOS = ["signup", "login", "refresh_token", "list_contacts", "search_contacts", "birthday_contacts",
+             "get_contact", "create_contact", "update_contact", "delete_contact", "update_avatar"]
+
+
+class State:
+    """
+    Seeded users and tokens shared by the scenarios.
+    """
+
+    def __init__(self, contacts: int, workers: int):
+        self.contacts = contacts
+        self.workers = workers
+        self.access = {}
+        self.refresh = {}
+        self.next_id = itertools.count(contacts + 1)
+        self.created = []
+
+    def headers(self, worker: int = 0) -> dict:
+        return {"Authorization": f"Bearer {self.access[worker]}"}
+
+
+def email(worker: int) -> str:
+    return f"bench{worker}@example.com"
+
+
+def contact_body(contact_id: int, suffix: str) -> dict:
+    return {"id": contact_id, "first_name": "Bench", "last_name": f"Contact{contact_id}",
+            "email": f"{suffix}{contact_id}@example.com", "phone_number": "0501234567",
+            "birthday": "1990-05-17", "additional_info": "benchmark"}
+
+
+async def signup(client, state, i, worker):
+    return await client.post("/api/auth/signup",
+                             json={"username": f"signup{i:06d}", "email": f"signup{i}@example.com",
+                                   "password": PASSWORD})
+
+
+async def login(client, state, i, worker):
+    response = await client.post("/api/auth/login", data={"username": email(worker), "password": PASSWORD})
+    if response.status_code == 200:
+        state.refresh[worker] = response.json()["refresh_token"]
+    return response
+
+
+async def refresh_token(client, state, i, worker):
+    # Every worker keeps its own token chain: each refresh rotates the user's token.
+    response = await client.get("/api/auth/refresh_token",
+                                headers={"Authorization": f"Bearer {state.refresh[worker]}"})
+    if response.status_code == 200:
+        state.refresh[worker] = response.json()["refresh_token"]
+    return response
+
+
+async def list_contacts(client, state, i, worker):
+    return await client.get("/api/contacts/", params={"limit": 20, "offset": i % 50 * 20}, headers=state.headers())
+
+
+async def search_contacts(client, state, i, worker):
+    return await client.get("/api/contacts/search", params={"query": f"Last{i % 100}"}, headers=state.headers())
+
+
+async def birthday_contacts(client, state, i, worker):
+    return await client.get("/api/contacts/birthday/", params={"days": 7 + i % 30}, headers=state.headers())
+
+
+async def get_contact(client, state, i, worker):
+    return await client.get(f"/api/contacts/{i % state.contacts + 1}", headers=state.headers())
+
+
+async def create_contact(client, state, i, worker):
+    contact_id = next(state.next_id)
+    response = await client.post("/api/contacts/", json=contact_body(contact_id, "new"), headers=state.headers())
+    if response.status_code == 201:
+        state.created.append(contact_id)
+    return response
+
+
+async def update_contact(client, state, i, worker):
+    contact_id = i % state.contacts + 1
+    return await client.put(f"/api/contacts/{contact_id}", json=contact_body(contact_id, f"upd{i}-"),
+                            headers=state.headers())
+
+
+async def delete_contact(client, state, i, worker):
+    contact_id = state.created.pop() if state.created else i % state.contacts + 1
+    return await client.delete(f"/api/contacts/{contact_id}", headers=state.headers())
+
+
+def avatar_png(i: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (512, 512), (i % 256, i // 256 % 256, 128)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def update_avatar(client, state, i, worker):
+    return await client.patch("/api/users/avatar", files={"file": ("avatar.png", avatar_png(i))},
+                              headers=state.headers(worker))
+
+
+def seed(path: str, contacts: int, workers: int, password_hash: str):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    start = date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": worker + 1, "username": f"bench{worker}", "email": email(worker), "password": password_hash,
+             "confirmed": True}
+            for worker in range(workers)
+        ])
+        rows = []
+        for i in range(contacts):
+            day = start + timedelta(days=i % 365)
+            birthday = date(1990, day.month, min(day.day, 28) if day.month == 2 else day.day)
+            rows.append({"id": i + 1, "first_name": f"First{i}", "last_name": f"Last{i % 1000}",
+                         "email": f"c{i}@example.com", "phone_number": "0501234567", "birthday": birthday,
+                         "birthday_key": birthday_key(birthday), "user_id": 1})
+        if rows:
+            conn.execute(insert(Contact), rows)
+    engine.dispose()
+
+
+async def tokens(path: str, state: State):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with SessionLocal() as db:
+        for worker in range(state.workers):
+            user = await db.get(User, worker + 1)
+            state.access[worker] = await auth_service.create_access_token(data={"sub": user.email})
+            state.refresh[worker] = await refresh_tokens.issue(user.email)
+    await engine.dispose()
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client, state, scenario, requests: int, concurrency: int) -> dict:
+    counter = itertools.count()
+    latencies, errors, statuses = [], 0, {}
+
+    async def worker(index: int):
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            started = time.perf_counter()
+            response = await scenario(client, state, i, index)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 4),
+        "rps": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def bench(path: str, args) -> dict:
+    if args.redis_url:
+        client_redis = redis.Redis.from_url(args.redis_url)
+        await client_redis.flushdb()
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("Install fakeredis[lua] or pass --redis-url")
+        client_redis = fakeredis.aioredis.FakeRedis()
+    user_cache.redis = response_cache.redis = refresh_tokens.redis = client_redis
+    user_cache.local.clear()
+    if args.no_response_cache:
+        response_cache.routes = set()
+    rate_limiter.redis = client_redis
+    rate_limiter.overrides = {("*", "*"): Limit(10 ** 9, 60)}
+    rate_limiter.buckets.clear()
+    rate_limiter.start()
+
+    url = make_url(f"sqlite+aiosqlite:///{path}")
+    engine = create_async_engine(url, **pool_options(url))
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    state = State(args.contacts, args.concurrency)
+    await tokens(path, state)
+    app.dependency_overrides[get_db] = override_get_db
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    avatar_pipeline._storage = LocalAvatarStorage(os.path.join(os.path.dirname(path), "avatars"), "/static/avatars")
+    avatar_pipeline.session_factory = SessionLocal
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, state, globals()[name], args.requests, args.concurrency)
+            print(format_row(name, results[name]), flush=True)
+    await avatar_pipeline.drain()
+    await rate_limiter.stop()
+    app.dependency_overrides.pop(get_db, None)
+    await engine.dispose()
+    if args.redis_url:
+        await client_redis.flushdb()
+    return results
+
+
+def format_row(name: str, result: dict, baseline: dict | None = None) -> str:
+    row = (f"{name:>18} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+           f"{result['p99_ms']:>8.2f} {result['errors']:>6}")
+    if baseline is not None:
+        row += f" {(result['rps'] / baseline['rps'] - 1) * 100:>+8.1f}% {(result['p95_ms'] / baseline['p95_ms'] - 1) * 100:>+8.1f}%"
+    return row
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+    parser.add_argument("--contacts", type=int, default=10_000, help="Contacts of the first bench user.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--redis-url", help="Real Redis to use and flush; fakeredis when omitted.")
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        password_hash = asyncio.run(auth_service.get_password_hash(PASSWORD))
+        seed(path, args.contacts, args.concurrency, password_hash)
+        print(f"concurrency={args.concurrency} requests={args.requests} contacts={args.contacts}")
+        print(f"{'scenario':>18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        results = asyncio.run(bench(path, args))
+
+    if baseline is not None:
+        print(f"\ncompared with {args.compare}")
+        print(f"{'scenario':>18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6} "
+              f"{'req/s':>9} {'p95':>9}")
+        for name, result in results.items():
+            if name in baseline:
+                print(format_row(name, result, baseline[name]))
+
+    if args.output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Bulk contact import benchmark.
+
+Writes a CSV or NDJSON file with ``--rows`` contacts and streams it through the import
+pipeline in 64 KiB chunks, the way the request body arrives, reporting rows per second and
+peak memory.
+
+Usage::
+
+    python -m benchmarks.import_contacts --rows 1000000 --format csv
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, User
+from src.services.contacts_import import import_contacts
+
+FIELDS = ["first_name", "last_name", "email", "phone_number", "birthday", "additional_info"]
+
+
+def write_file(path: str, rows: int, fmt: str):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        if fmt == "csv":
+            writer.writerow(FIELDS)
+        for i in range(rows):
+            row = [f"First{i % 997}", f"Last{i % 1009}", f"contact{i}@example.com", f"+38050{i % 10000000:07d}",
+                   f"19{50 + i % 50}-{1 + i % 12:02d}-{1 + i % 28:02d}", "imported"]
+            if fmt == "csv":
+                writer.writerow(row)
+            else:
+                file.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+
+
+async def read_chunks(path: str, size: int = 64 * 1024):
+    with open(path, "rb") as file:
+        while chunk := file.read(size):
+            yield chunk
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def bench(db_path: str, file_path: str, fmt: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        result = await import_contacts(read_chunks(file_path), fmt, db, User(id=1))
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, file_path = os.path.join(tmp, "bench.db"), os.path.join(tmp, f"contacts.{args.format}")
+        engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        engine.dispose()
+        write_file(file_path, args.rows, args.format)
+        size_mb = os.path.getsize(file_path) / 1024 / 1024
+        rss_before = max_rss_mb()
+        result, elapsed = asyncio.run(bench(db_path, file_path, args.format))
+
+    print(f"{args.format}: {args.rows} rows, {size_mb:.0f} MiB")
+    print(f"imported={result.imported} failed={result.failed} in {elapsed:.1f}s "
+          f"({result.imported / elapsed:,.0f} rows/s)")
+    print(f"peak RSS {max_rss_mb():.0f} MiB (before import {rss_before:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
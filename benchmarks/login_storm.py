@@ -0,0 +1,117 @@
+"""
+Login storm benchmark.
+
+Fires a burst of concurrent logins at ``main.app`` in-process while a second client keeps
+polling an unrelated endpoint, and reports latency percentiles for both. ``--inline`` runs
+bcrypt directly on the event loop, as the app did before the hashing pool existed.
+
+Usage::
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+    python -m benchmarks.login_storm --logins 200 --concurrency 50 --inline
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import main
+from src.database.connect import get_db
+from src.database.models import Base, User
+from src.services import hashing
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def report(name: str, values: list[float]):
+    values = [v * 1000 for v in values]
+    print(f"{name:<12} n={len(values):<6} p50={percentile(values, 50):8.1f}ms "
+          f"p99={percentile(values, 99):8.1f}ms max={max(values, default=0):8.1f}ms")
+
+
+async def bench(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        # SQLite allows one writer; a generous busy timeout keeps the stalled loop of the inline
+        # mode from turning into "database is locked" errors.
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}",
+                                     connect_args={"timeout": 120})
+        SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with SessionLocal() as db:
+            db.add(User(username="storm", email="storm@example.com", password=hashing._hash("123456"),
+                        confirmed=True))
+            await db.commit()
+
+        async def override_get_db():
+            async with SessionLocal() as db:
+                yield db
+
+        main.app.dependency_overrides[get_db] = override_get_db
+        if args.inline:
+            async def inline(self, fn, *fn_args):
+                return fn(*fn_args)
+            hashing.PasswordHasher.run = inline
+
+        login_times, other_times, statuses = [], [], {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        done = asyncio.Event()
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            await client.get("/openapi.json")
+
+            async def login():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/api/auth/login",
+                                                 data={"username": "storm@example.com", "password": "123456"})
+                    login_times.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            async def unrelated():
+                # Latency is measured from when the request was due, so time spent waiting for a
+                # blocked event loop counts against it.
+                interval, due = 0.01, time.perf_counter()
+                while not done.is_set():
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                    await client.get("/openapi.json")
+                    other_times.append(time.perf_counter() - due)
+                    due += interval
+
+            poller = asyncio.create_task(unrelated())
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(args.logins)))
+            elapsed = time.perf_counter() - started
+            done.set()
+            await poller
+
+        await engine.dispose()
+        hashing.password_hasher.shutdown()
+
+    mode = "inline (event loop)" if args.inline else \
+        f"{hashing.password_hasher.kind} pool, workers={hashing.password_hasher.workers}"
+    print(f"bcrypt: {mode}; logins={args.logins} concurrency={args.concurrency} took {elapsed:.2f}s")
+    print(f"statuses: {statuses}")
+    report("login", login_times)
+    report("unrelated", other_times)
+    print(f"unrelated mean {statistics.mean(other_times) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--inline", action="store_true", help="Run bcrypt on the event loop (old behaviour).")
+    asyncio.run(bench(parser.parse_args()))
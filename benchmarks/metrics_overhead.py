@@ -0,0 +1,73 @@
+"""
+Overhead of the request metrics middleware.
+
+Calls a minimal ASGI app directly, without a server, ``--requests`` times bare and wrapped in
+:class:`MetricsMiddleware`, and prints the difference per request. The app routes like FastAPI
+does, putting the matched route into the scope, and sends a two-message response.
+
+Usage::
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.metrics import Metrics, MetricsMiddleware
+
+ROUTES = ["/api/contacts/", "/api/contacts/search", "/api/contacts/birthday/", "/api/auth/login"]
+
+
+class Route:
+    def __init__(self, path: str):
+        self.path = path
+
+
+async def app(scope, receive, send):
+    scope["route"] = scope["matched"]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"[]"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def timed(handler, scopes) -> float:
+    started = time.perf_counter()
+    for scope in scopes:
+        await handler(scope, receive, send)
+    return time.perf_counter() - started
+
+
+async def bench(requests: int, rounds: int):
+    routes = [Route(path) for path in ROUTES]
+    wrapped = MetricsMiddleware(app, registry=Metrics())
+    best = {"bare": float("inf"), "metrics": float("inf")}
+    for _ in range(rounds):
+        for name, handler in (("bare", app), ("metrics", wrapped)):
+            scopes = [{"type": "http", "method": "GET", "path": "/", "matched": routes[i % len(routes)]}
+                      for i in range(requests)]
+            best[name] = min(best[name], await timed(handler, scopes))
+    bare, metered = (best[name] / requests * 1e6 for name in ("bare", "metrics"))
+    print(f"requests={requests} best of {rounds}")
+    print(f"bare {bare:.2f} us, with metrics {metered:.2f} us, overhead {metered - bare:.2f} us per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
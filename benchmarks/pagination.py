@@ -0,0 +1,98 @@
+"""
+Offset vs keyset pagination benchmark.
+
+Seeds a SQLite database with one user owning ``--contacts`` contacts (plus a neighbour user so
+the ``(user_id, id)`` index has something to skip) and times fetching a page at increasing
+depths with ``get_contacts`` (LIMIT/OFFSET) and ``get_contacts_after`` (keyset).
+
+Usage::
+
+    python -m benchmarks.pagination --contacts 1000000 --limit 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+
+BATCH = 50_000
+
+
+def seed(path: str, contacts: int) -> User:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": 1, "username": "bench", "email": "bench@example.com", "password": "x", "confirmed": True},
+            {"id": 2, "username": "other", "email": "other@example.com", "password": "x", "confirmed": True},
+        ])
+        for start in range(0, contacts, BATCH):
+            rows = []
+            for i in range(start, min(start + BATCH, contacts)):
+                # Interleave the two users so one user's rows are spread over the table.
+                rows.append({"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+                             "phone_number": "0501234567", "user_id": 1})
+                rows.append({"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"o{i}@example.com",
+                             "phone_number": "0501234567", "user_id": 2})
+            conn.execute(insert(Contact), rows)
+    engine.dispose()
+    return User(id=1)
+
+
+async def timed(coro_factory, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await coro_factory()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def bench(path: str, user: User, args):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    pages = [p for p in (1, 10, 100, 1_000, 10_000, 50_000) if (p - 1) * args.limit < args.contacts]
+
+    print(f"contacts per user={args.contacts} limit={args.limit}")
+    print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+    async with SessionLocal() as db:
+        for page in pages:
+            offset = (page - 1) * args.limit
+            contacts = await repository_contacts.get_contacts(args.limit, offset, db, user)
+            # The contact preceding the page is what the previous page's cursor would point at.
+            after_id = None
+            if offset:
+                after_id = (await repository_contacts.get_contacts(1, offset - 1, db, user))[0].id
+            keyset = await repository_contacts.get_contacts_after(args.limit, after_id, db, user)
+            assert [c.id for c in contacts] == [c.id for c in keyset]
+            offset_ms = await timed(lambda: repository_contacts.get_contacts(args.limit, offset, db, user),
+                                    args.repeat)
+            keyset_ms = await timed(lambda: repository_contacts.get_contacts_after(args.limit, after_id, db, user),
+                                    args.repeat)
+            print(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=1_000_000, help="Contacts per user.")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        user = seed(path, args.contacts)
+        print(f"seeded in {time.perf_counter() - started:.1f}s")
+        asyncio.run(bench(path, user, args))
+
+
+if __name__ == "__main__":
+    main()
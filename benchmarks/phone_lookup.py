@@ -0,0 +1,121 @@
+"""
+Reverse phone lookup benchmark: scanning the owner's free-form numbers against the E.164 index.
+
+Seeds a SQLite database with ``--contacts`` contacts over ``--users`` users drawn like
+``benchmarks.generate_data`` does (Zipf ``--skew``, so the first user owns the largest address
+book), then looks up ``--lookups`` numbers of the first user's contacts, written nationally as
+``0XX XXX XX XX``; every tenth one is a number nobody has.
+
+* ``scan`` is what the lookup cost without ``phone_e164``: numbers are free-form, so all of the
+  owner's numbers are read and normalized in Python. It runs ``--scan-lookups`` lookups.
+* ``index`` is :func:`repository.contacts.get_contacts_by_phone`, one probe of the
+  ``(user_id, phone_e164)`` index.
+
+Reported are the median and 95th percentile latency and the contacts found per lookup, followed
+by the query plan of the indexed lookup.
+
+Usage::
+
+    python -m benchmarks.phone_lookup --users 1000 --contacts 2000000 --lookups 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from random import Random
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.generate_data import (
+    USER_COLUMNS, CONTACT_COLUMNS, generate_users, generate_contacts, drop_indexes, create_indexes, insert_sqlite,
+)
+from src.database.models import Base, Contact, User, phone_e164
+from src.repository.contacts import get_contacts_by_phone
+
+BATCH = 50_000
+
+
+def seed(path: str, args) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = Random(args.seed)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS contacts_fts_insert")
+        insert_sqlite(conn, "users", USER_COLUMNS, [generate_users(rng, 1, args.users, "x")])
+        indexes = drop_indexes(conn)
+        insert_sqlite(conn, "contacts", CONTACT_COLUMNS,
+                      generate_contacts(rng, 1, args.contacts, range(1, args.users + 1), args.skew, BATCH))
+        create_indexes(conn, indexes)
+    print(file=sys.stderr)
+    engine.dispose()
+
+
+def national(number: str) -> str:
+    # +380501234567 -> 050 123 45 67
+    digits = "0" + number[4:]
+    return f"{digits[:3]} {digits[3:6]} {digits[6:8]} {digits[8:]}"
+
+
+async def scan(number: str, db, user: User) -> list[int]:
+    wanted = phone_e164(number)
+    rows = await db.execute(select(Contact.id, Contact.phone_number).filter(Contact.user_id == user.id))
+    return [contact_id for contact_id, phone in rows if phone_e164(phone) == wanted]
+
+
+async def index(number: str, db, user: User) -> list[int]:
+    return [contact.id for contact in await get_contacts_by_phone(phone_e164(number), db, user)]
+
+
+async def run(name: str, lookup, numbers: list[str], session_factory, user: User) -> None:
+    timings, found = [], 0
+    async with session_factory() as db:
+        for number in numbers:
+            started = time.perf_counter()
+            found += len(await lookup(number, db, user))
+            timings.append((time.perf_counter() - started) * 1000)
+            db.expunge_all()
+    timings.sort()
+    print(f"{name:<6} {len(numbers):>8} {statistics.median(timings):>9.3f} "
+          f"{timings[int(len(timings) * 0.95)]:>9.3f} {found / len(numbers):>7.2f}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/bench.db"
+        started = time.perf_counter()
+        seed(path, args)
+        print(f"seeded {args.contacts:,} contacts in {time.perf_counter() - started:.1f} s")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        user = User(id=1)
+        async with engine.connect() as conn:
+            phones = (await conn.execute(
+                select(Contact.phone_e164).filter(Contact.user_id == user.id).order_by(Contact.id)
+            )).scalars().all()
+            plan = (await conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM contacts WHERE user_id = :user_id AND phone_e164 = :phone"),
+                {"user_id": user.id, "phone": phones[0]})).all()
+        rng = Random(args.seed)
+        numbers = [national(rng.choice(phones)) if i % 10 else "099 000 00 00" for i in range(args.lookups)]
+        print(f"user {user.id} owns {len(phones):,} contacts\n")
+        print(f"{'mode':<6} {'lookups':>8} {'p50 ms':>9} {'p95 ms':>9} {'found':>7}")
+        await run("scan", scan, numbers[:args.scan_lookups], session_factory, user)
+        await run("index", index, numbers, session_factory, user)
+        print("\nget_contacts_by_phone:", "; ".join(row[-1] for row in plan))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=2_000_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of contacts per user.")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--scan-lookups", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+Connection pool sizing benchmark.
+
+Runs ``--requests`` simulated requests, ``--concurrency`` at a time, against a SQLite database
+through :class:`TimedQueuePool`. Every request checks out a connection, runs a query and keeps
+the connection for ``--hold-ms`` more, standing in for the round-trips of a real request. Prints
+throughput and the checkout waits from :data:`pool_stats` for every pool size in ``--sizes``.
+
+Usage::
+
+    python -m benchmarks.pool --concurrency 50 --hold-ms 5 --sizes 2 5 10 20 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.pool import TimedQueuePool, pool_stats
+
+
+async def request(engine, hold: float):
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            await asyncio.sleep(hold)
+    except TimeoutError:
+        pass
+
+
+async def run(path: str, size: int, args) -> tuple[float, dict]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=TimedQueuePool, pool_size=size,
+                                 max_overflow=0, pool_timeout=args.timeout)
+    pool_stats.reset()
+    pool_stats.listen(engine)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited():
+        async with semaphore:
+            await request(engine, args.hold_ms / 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    stats = pool_stats.report(engine)
+    await engine.dispose()
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hold-ms", type=float, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 5, 10, 20, 50])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"requests={args.requests} concurrency={args.concurrency} hold={args.hold_ms} ms")
+        print(f"{'size':>5} {'req/s':>8} {'wait mean':>10} {'wait max':>9} {'peak':>5} {'timeouts':>9}")
+        for size in args.sizes:
+            elapsed, stats = asyncio.run(run(path, size, args))
+            print(f"{size:>5} {args.requests / elapsed:>8.0f} {stats['wait_ms_mean']:>10.2f} "
+                  f"{stats['wait_ms_max']:>9.2f} {stats['peak_checked_out']:>5} {stats['timeouts']:>9}")
+
+
+if __name__ == "__main__":
+    main()
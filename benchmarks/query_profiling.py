@@ -0,0 +1,60 @@
+"""
+Overhead of the SQL profiling listeners.
+
+Runs ``--queries`` trivial statements on an in-memory SQLite database through two async engines,
+one bare and one with :func:`src.database.profiling.listen` and a request profile in context,
+and prints the time per statement.
+
+Usage::
+
+    python -m benchmarks.query_profiling --queries 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database import profiling
+from src.database.profiling import QueryProfile, current_profile
+
+
+async def timed(engine, queries: int) -> float:
+    statement = text("SELECT :x")
+    async with engine.connect() as connection:
+        started = time.perf_counter()
+        for i in range(queries):
+            await connection.execute(statement, {"x": i})
+        return time.perf_counter() - started
+
+
+async def bench(queries: int, rounds: int):
+    bare = create_async_engine("sqlite+aiosqlite://")
+    profiled = create_async_engine("sqlite+aiosqlite://")
+    profiling.listen(profiled)
+    current_profile.set(QueryProfile())
+    best = {"bare": float("inf"), "profiled": float("inf")}
+    for _ in range(rounds):
+        best["bare"] = min(best["bare"], await timed(bare, queries))
+        best["profiled"] = min(best["profiled"], await timed(profiled, queries))
+    plain, measured = (best[name] / queries * 1e6 for name in ("bare", "profiled"))
+    print(f"queries={queries} best of {rounds}")
+    print(f"bare {plain:.1f} us, profiled {measured:.1f} us, overhead {measured - plain:.1f} us per statement")
+    await bare.dispose()
+    await profiled.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(bench(args.queries, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Rate limiting benchmark: ``fastapi-limiter`` against :class:`HybridRateLimiter`.
+
+* ``overhead`` awaits the dependency of either limiter ``--iterations`` times, with a limit that
+  is never reached, and reports the time per check. ``fastapi-limiter`` runs a Lua script in
+  Redis for every request; the hybrid limiter only touches its local bucket.
+* ``accuracy`` simulates ``--processes`` workers, each with its own limiter and Redis
+  connection, hammering one client for ``--duration`` seconds under a ``--times`` per
+  ``--seconds`` limit, and reports how many requests were admitted in the first window, when
+  every hybrid process starts with a full bucket, and on average in the following ones.
+
+Needs a Redis server (``fastapi-limiter`` is a dev dependency).
+
+Usage::
+
+    python -m benchmarks.rate_limit --redis-url redis://localhost:6379/0 --iterations 5000 \\
+        --processes 4 --times 100 --seconds 1 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import redis.asyncio as redis
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter
+from starlette.requests import Request
+from starlette.responses import Response
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.rate_limit import HybridRateLimiter
+
+
+def make_dependency(mode: str, client: redis.Redis, times: int, seconds: int, sync_interval: float):
+    if mode == "fastapi-limiter":
+        return None, RateLimiter(times=times, seconds=seconds)
+    limiter = HybridRateLimiter(client, sync_interval=sync_interval, overrides={})
+    return limiter, limiter.limit("bench", times=times, seconds=seconds)
+
+
+def make_request(dependency) -> Request:
+    app = FastAPI()
+
+    @app.get("/", dependencies=[Depends(dependency)])
+    async def index():
+        return {}
+
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b"",
+                    "client": ("10.0.0.1", 50000), "app": app})
+
+
+async def check(dependency, request: Request) -> bool:
+    try:
+        if isinstance(dependency, RateLimiter):
+            await dependency(request, Response())
+        else:
+            await dependency(request)
+    except HTTPException:
+        return False
+    return True
+
+
+async def overhead(mode: str, args) -> None:
+    client = redis.from_url(args.redis_url)
+    await FastAPILimiter.init(client)
+    await client.flushdb()
+    limiter, dependency = make_dependency(mode, client, 10 ** 9, 60, args.sync_interval)
+    request = make_request(dependency)
+    if limiter:
+        limiter.start()
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        await check(dependency, request)
+    elapsed = time.perf_counter() - started
+    if limiter:
+        await limiter.stop()
+    await client.aclose()
+    print(f"{mode:<16} {elapsed / args.iterations * 1e6:>10.1f} us/check")
+
+
+async def accuracy(mode: str, args) -> None:
+    attempted = 0
+    windows = {}
+    clients = [redis.from_url(args.redis_url) for _ in range(args.processes)]
+    await FastAPILimiter.init(clients[0])
+    await clients[0].flushdb()
+    workers = [make_dependency(mode, client, args.times, args.seconds, args.sync_interval) for client in clients]
+    for limiter, _ in workers:
+        if limiter:
+            limiter.start()
+    deadline = time.monotonic() + args.duration
+
+    async def worker(i: int) -> None:
+        _, dependency = workers[i]
+        request = make_request(dependency)
+        nonlocal attempted
+        while time.monotonic() < deadline:
+            attempted += 1
+            if await check(dependency, request):
+                window = int(time.time() // args.seconds)
+                windows[window] = windows.get(window, 0) + 1
+            await asyncio.sleep(args.interval_ms / 1000)
+
+    await asyncio.gather(*(worker(i) for i in range(args.processes)))
+    for limiter, _ in workers:
+        if limiter:
+            await limiter.stop()
+    for client in clients:
+        await client.aclose()
+    counts = [windows[window] for window in sorted(windows)]
+    steady = counts[1:-1] or counts
+    print(f"{mode:<16} {attempted:>10} {sum(counts):>10} {counts[0]:>8} {sum(steady) / len(steady):>8.1f} "
+          f"{max(steady):>8} {args.times:>8}")
+
+
+async def main(args):
+    print("overhead")
+    for mode in ("fastapi-limiter", "hybrid"):
+        await overhead(mode, args)
+    print(f"\naccuracy: {args.processes} processes, {args.times}/{args.seconds}s for {args.duration}s")
+    print(f"{'mode':<16} {'attempted':>10} {'admitted':>10} {'first':>8} {'mean':>8} {'max':>8} {'limit':>8}")
+    for mode in ("fastapi-limiter", "hybrid"):
+        await accuracy(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--times", type=int, default=100)
+    parser.add_argument("--seconds", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--interval-ms", type=float, default=1, help="Pause between requests of a process.")
+    parser.add_argument("--sync-interval", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Redis access benchmark: one client per component against the shared pool.
+
+Every simulated request does what an authenticated, cached contacts read does in Redis: a user
+cache read and a response cache lookup, ``--concurrency`` requests at a time.
+
+* ``separate`` is how the app used Redis before: the user cache, the response cache and the
+  rate limiter each had their own client with an unbounded pool, and a lookup read the
+  generation and then the entry, two round-trips.
+* ``shared`` uses one :class:`TimedConnectionPool` of ``--pool-size`` connections for every
+  component, and a lookup is the single ``EVALSHA`` of :meth:`ResponseCache.lookup`.
+
+Every reply is delayed by ``--rtt-ms`` to stand in for the network between the app and Redis.
+Reported are requests per second, latency, and how many connections were opened.
+
+Usage::
+
+    python -m benchmarks.redis_pool --redis-url redis://localhost:6379/0 --requests 20000 --concurrency 100 \\
+        --pool-size 20 --rtt-ms 1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import redis.asyncio as redis
+from fastapi import Response
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.redis_pool import TimedConnectionPool
+from src.services.cache import LOOKUP_SCRIPT, ResponseCache, UserCache
+
+USERS = 100
+
+
+class DelayedConnection(redis.Connection):
+    rtt = 0.0
+
+    async def read_response(self, *args, **kwargs):
+        await asyncio.sleep(self.rtt)
+        return await super().read_response(*args, **kwargs)
+
+
+def connections(*pools: redis.ConnectionPool) -> int:
+    return sum(len(pool._available_connections) + len(pool._in_use_connections) for pool in pools)
+
+
+async def seed(client: redis.Redis) -> None:
+    await client.flushdb()
+    await client.script_load(LOOKUP_SCRIPT)
+    cache = ResponseCache(client, ttl=600, routes=["read_contacts"])
+    response = Response(content=b'[{"id": 1, "first_name": "Wade"}]', media_type="application/json")
+    for user_id in range(USERS):
+        await client.set(UserCache.key(f"user{user_id}@example.com"), b'{"id": %d}' % user_id)
+        await client.set(cache.generation_key(user_id), b"1")
+        await client.set(cache.key("read_contacts", user_id, b"1", {"limit": 10}), cache.encode(response))
+
+
+async def run(mode: str, args) -> None:
+    if mode == "separate":
+        pools = [redis.ConnectionPool.from_url(args.redis_url, connection_class=DelayedConnection)
+                 for _ in range(3)]
+        user_client, response_client, _ = (redis.Redis(connection_pool=pool) for pool in pools)
+    else:
+        pools = [TimedConnectionPool.from_url(args.redis_url, connection_class=DelayedConnection,
+                                              max_connections=args.pool_size, timeout=5)]
+        user_client = response_client = redis.Redis(connection_pool=pools[0])
+    await seed(user_client)
+    cache = ResponseCache(response_client, ttl=600, routes=["read_contacts"])
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def request(i: int) -> None:
+        user_id = i % USERS
+        async with semaphore:
+            started = time.perf_counter()
+            await user_client.get(UserCache.key(f"user{user_id}@example.com"))
+            if mode == "separate":
+                generation = await response_client.get(cache.generation_key(user_id))
+                data = await response_client.get(cache.key("read_contacts", user_id, generation, {"limit": 10}))
+            else:
+                _, data = await cache.lookup(user_id, *cache.key_parts("read_contacts", user_id, {"limit": 10}))
+            assert data is not None
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    opened = connections(*pools)
+    for pool in pools:
+        await pool.disconnect()
+    latencies.sort()
+    print(f"{mode:<9} {args.requests / elapsed:>9.0f} {statistics.median(latencies) * 1000:>8.2f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.2f} {opened:>12}")
+
+
+async def main(args):
+    DelayedConnection.rtt = args.rtt_ms / 1000
+    print(f"{'mode':<9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12}")
+    for mode in ("separate", "shared"):
+        await run(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=1, help="Network round-trip time to Redis.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""
+Refresh token benchmark: the ``users.refresh_token`` column against token families in Redis.
+
+Runs ``--refreshes`` token refreshes for ``--users`` users, ``--concurrency`` at a time, each
+user refreshing its own chain.
+
+* ``database`` does what the route did before: read the user, compare the stored token, write
+  the new one and commit.
+* ``redis`` rotates the token with :meth:`RefreshTokenStore.rotate`, one script call.
+
+Reported are refreshes per second, latency, and the ``UPDATE`` statements sent to the database.
+Uses a SQLite file database and an in-process ``fakeredis[lua]`` unless ``--redis-url`` is given.
+
+Usage::
+
+    python -m benchmarks.refresh_tokens --refreshes 2000 --concurrency 20 --users 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import redis.asyncio as redis
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, User
+from src.services.auth import auth_service
+from src.services.refresh_tokens import RefreshTokenStore
+
+
+async def run(mode: str, args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        updates = 0
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            nonlocal updates
+            updates += statement.startswith("UPDATE")
+
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        if args.redis_url:
+            client = redis.from_url(args.redis_url)
+            await client.flushdb()
+        else:
+            import fakeredis
+            client = fakeredis.FakeAsyncRedis()
+        store = RefreshTokenStore(client, ttl=3600)
+        emails = [f"user{i}@example.com" for i in range(args.users)]
+        tokens = {}
+        async with session_factory() as db:
+            for email in emails:
+                if mode == "database":
+                    tokens[email] = await auth_service.create_refresh_token(data={"sub": email})
+                else:
+                    tokens[email] = await store.issue(email)
+                db.add(User(username=email, email=email, password="x", refresh_token=tokens[email]))
+            await db.commit()
+        updates = 0
+        locks = {email: asyncio.Lock() for email in emails}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def refresh(i: int) -> None:
+            email = emails[i % len(emails)]
+            async with semaphore, locks[email]:
+                started = time.perf_counter()
+                claims = auth_service.decode_refresh_claims(tokens[email])
+                if mode == "database":
+                    async with session_factory() as db:
+                        user = (await db.execute(select(User).filter(User.email == email))).scalar_one()
+                        assert user.refresh_token == tokens[email]
+                        token = await auth_service.create_refresh_token(data={"sub": email})
+                        user.refresh_token = token
+                        await db.commit()
+                else:
+                    token = await store.rotate(claims)
+                    assert token is not None
+                tokens[email] = token
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(refresh(i) for i in range(args.refreshes)))
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+        await engine.dispose()
+    latencies.sort()
+    print(f"{mode:<9} {args.refreshes / elapsed:>10.1f} {statistics.median(latencies) * 1000:>8.2f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.2f} {updates:>8}")
+
+
+async def main(args):
+    print(f"{'mode':<9} {'refresh/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'UPDATEs':>8}")
+    for mode in ("database", "redis"):
+        await run(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refreshes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--redis-url", help="Real Redis instead of fakeredis; the database is flushed.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Response cache benchmark for the contact list, search and birthday reads.
+
+Seeds a SQLite database with one user owning ``--contacts`` contacts and times the
+``read_contacts``, ``search_contacts`` and ``get_contacts_birthday`` handlers with the response
+cache off and with a warm cache, then once more right after a write has invalidated it.
+Needs a Redis server at ``--redis-url``; the benchmark uses and flushes that database.
+
+Usage::
+
+    python -m benchmarks.response_cache --contacts 100000 --limit 100 --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import redis.asyncio as redis
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User, birthday_key
+from src.repository import contacts as repository_contacts
+from src.routes.contacts import read_contacts, search_contacts, get_contacts_birthday
+from src.services.cache import response_cache
+
+BATCH = 50_000
+
+
+def seed(path: str, contacts: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    start = date.today() - timedelta(days=180)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        for offset in range(0, contacts, BATCH):
+            rows = []
+            for i in range(offset, min(offset + BATCH, contacts)):
+                birthday = (start + timedelta(days=i % 365)).replace(year=1990)
+                rows.append({"first_name": f"First{i}", "last_name": f"Last{i % 1000}", "email": f"c{i}@example.com",
+                             "phone_number": "0501234567", "birthday": birthday,
+                             "birthday_key": birthday_key(birthday), "user_id": 1})
+            conn.execute(insert(Contact), rows)
+    engine.dispose()
+
+
+async def timed(handler, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await handler()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def bench(path: str, args):
+    response_cache.redis = redis.Redis.from_url(args.redis_url)
+    await response_cache.redis.flushdb()
+    routes = set(response_cache.routes)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    user = User(id=1)
+    async with SessionLocal() as db:
+        cases = {
+            "read_contacts": lambda: read_contacts(args.limit, 0, None, None, db, user),
+            "search_contacts": lambda: search_contacts("Last7", args.limit, None, db, user),
+            "get_contacts_birthday": lambda: get_contacts_birthday(30, db, user),
+        }
+        print(f"contacts={args.contacts} limit={args.limit}")
+        print(f"{'route':>22} {'off ms':>8} {'warm ms':>8} {'after write ms':>15}")
+        for removed, (name, handler) in enumerate(cases.items(), start=1):
+            response_cache.routes = set()
+            off = await timed(handler, args.repeat)
+            response_cache.routes = routes
+            await handler()
+            warm = await timed(handler, args.repeat)
+            await repository_contacts.remove_contact(removed, db, user)
+            after_write = await timed(handler, 1)
+            print(f"{name:>22} {off:>8.2f} {warm:>8.2f} {after_write:>15.2f}")
+    print(response_cache.report())
+    await response_cache.redis.flushdb()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, args.contacts)
+        asyncio.run(bench(path, args))
+
+
+if __name__ == "__main__":
+    main()
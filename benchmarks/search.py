@@ -0,0 +1,98 @@
+"""
+Contact search benchmark.
+
+Seeds one user with ``--contacts`` contacts and compares the old unindexed
+``LIKE '%q%'`` search with the full-text index used by ``search_contacts``.
+
+Usage::
+
+    python -m benchmarks.search --contacts 300000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select, and_
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+
+FIRST_NAMES = ["Olena", "Andrii", "Iryna", "Taras", "Oksana", "Dmytro", "Natalia", "Serhii", "Yulia", "Maksym",
+               "John", "Mary", "James", "Linda", "Robert", "Patricia", "Michael", "Jennifer", "David", "Elizabeth"]
+LAST_NAMES = ["Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boyko", "Oliynyk",
+              "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Wilson", "Moore"]
+DOMAINS = ["gmail.com", "ukr.net", "example.com", "outlook.com", "i.ua"]
+QUERIES = ["olena", "shev", "john smith", "kravchenko", "mar", "ukr", "zzz", "dmytro melnyk"]
+BATCH = 50_000
+
+
+def seed(path: str, contacts: int) -> User:
+    rnd = random.Random(42)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        for start in range(0, contacts, BATCH):
+            rows = []
+            for i in range(start, min(start + BATCH, contacts)):
+                first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+                rows.append({"first_name": first, "last_name": last,
+                             "email": f"{first.lower()}.{last.lower()}{i}@{rnd.choice(DOMAINS)}",
+                             "phone_number": "0501234567", "user_id": 1})
+            conn.execute(insert(Contact), rows)
+    engine.dispose()
+    return User(id=1)
+
+
+async def like_search(query: str, limit: int, db, user: User):
+    # The search as it was before the index: unpaginated substring match on three columns.
+    stmt = select(Contact).filter(and_(
+        Contact.user_id == user.id,
+        Contact.first_name.contains(query) | Contact.last_name.contains(query) | Contact.email.contains(query)
+    ))
+    return (await db.execute(stmt)).scalars().all()
+
+
+async def bench(path: str, user: User, args):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    print(f"contacts={args.contacts} limit={args.limit}")
+    print(f"{'query':<16} {'LIKE ms':>10} {'rows':>8} {'index ms':>10} {'rows':>6}")
+    async with SessionLocal() as db:
+        for query in QUERIES:
+            timings = {}
+            for name, fn in (("like", like_search), ("index", repository_contacts.search_contacts)):
+                args_ = (query, args.limit, db, user) if name == "like" else (query, args.limit, None, db, user)
+                rows = await fn(*args_)
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    await fn(*args_)
+                timings[name] = ((time.perf_counter() - started) / args.repeat * 1000, len(rows))
+            print(f"{query:<16} {timings['like'][0]:>10.2f} {timings['like'][1]:>8} "
+                  f"{timings['index'][0]:>10.2f} {timings['index'][1]:>6}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=300_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        user = seed(path, args.contacts)
+        print(f"seeded in {time.perf_counter() - started:.1f}s")
+        asyncio.run(bench(path, user, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Sign-up benchmark: check-then-insert against an ``INSERT ... RETURNING`` on the unique e-mail index.
+
+Runs ``--signups`` sign-ups, ``--concurrency`` at a time, against a SQLite file database, the
+password hash and the outbox left out so that only the user's round-trips are measured. Every
+``--duplicate-every``-th sign-up reuses an earlier address in upper case, concurrently with
+the original.
+
+* ``before`` does what the route did: look the e-mail up, insert, commit and refresh. The
+  lookup is case-sensitive, so with the new index an upper-cased duplicate fails on commit
+  with ``IntegrityError``, a 500, as do concurrent duplicates that both pass the lookup.
+* ``after`` is :func:`repository.users.create_user` with the case-insensitive index.
+
+Reported are sign-ups per second, statements per sign-up, and the outcome of the duplicates,
+followed by the query plan of :func:`repository.users.get_user_by_email`.
+
+Usage::
+
+    python -m benchmarks.signup --signups 2000 --concurrency 20 --duplicate-every 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.database.models import Base, User
+from src.repository.users import create_user
+from src.schemas import UserModel
+
+
+async def before(body: UserModel, db) -> str:
+    exist_user = (await db.execute(select(User).filter(User.email == body.email))).scalar_one_or_none()
+    if exist_user:
+        return "409"
+    new_user = User(**body.model_dump())
+    db.add(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        return "500"
+    await db.refresh(new_user)
+    return "201"
+
+
+async def after(body: UserModel, db) -> str:
+    return "409" if await create_user(body, db) is None else "201"
+
+
+async def run(mode: str, args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        statements = 0
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            nonlocal statements
+            statements += 1
+
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        signup = before if mode == "before" else after
+        outcomes = {}
+
+        async def one(i: int, email: str) -> None:
+            body = UserModel(username=f"user{i}", email=email, password="x" * 8)
+            async with semaphore, session_factory() as db:
+                outcome = await signup(body, db)
+            if i % args.duplicate_every == 0:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        jobs = []
+        for i in range(args.signups):
+            jobs.append(one(i, f"user{i}@example.com"))
+            if i % args.duplicate_every == 0:
+                jobs.append(one(i, f"USER{i}@example.com"))
+        statements = 0
+        started = time.perf_counter()
+        await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - started
+        async with engine.connect() as connection:
+            users = (await connection.execute(text("SELECT count(*) FROM users"))).scalar_one()
+            plan = (await connection.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM users WHERE lower(email) = lower(:email)"),
+                {"email": "User1@example.com"})).all()
+        await engine.dispose()
+    print(f"{mode:<7} {len(jobs) / elapsed:>9.1f} {statements / len(jobs):>11.2f} {users:>7}  "
+          + " ".join(f"{code}:{n}" for code, n in sorted(outcomes.items())))
+    if mode == "after":
+        print("\nget_user_by_email:", "; ".join(row[-1] for row in plan))
+
+
+async def main(args):
+    print(f"{'mode':<7} {'signup/s':>9} {'statements':>11} {'users':>7}  duplicate pairs by status")
+    for mode in ("before", "after"):
+        await run(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duplicate-every", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
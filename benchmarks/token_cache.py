@@ -0,0 +1,56 @@
+"""
+Authentication overhead per request, with and without the verified-token cache.
+
+Awaits :meth:`Auth.get_current_user` ``--iterations`` times with ``--tokens`` distinct access
+tokens used in turn, the user being a local hit of the user cache, so the time is the token
+check and the cache lookups alone.
+
+Usage::
+
+    python -m benchmarks.token_cache --iterations 100000 --tokens 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.schemas import CurrentUser
+from src.services.auth import auth_service
+from src.services.cache import TokenCache, user_cache
+
+
+async def run(tokens: list[str], iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        await auth_service.get_current_user(tokens[i % len(tokens)], db=None)
+    return (time.perf_counter() - started) / iterations
+
+
+async def main(args):
+    tokens = []
+    for i in range(args.tokens):
+        email = f"user{i}@example.com"
+        user_cache.local.set(email, CurrentUser(id=i + 1, username=f"user{i}", email=email, avatar=None,
+                                                confirmed=True), ttl=3600)
+        tokens.append(await auth_service.create_access_token(data={"sub": email}))
+    results = {}
+    for name, maxsize in (("no cache", 0), ("token cache", args.tokens)):
+        cache = TokenCache(maxsize)
+        with patch("src.services.auth.token_cache", cache):
+            await run(tokens, min(1000, args.iterations))
+            cache.stats = {"hits": 0, "misses": 0}
+            results[name] = await run(tokens, args.iterations)
+        report = cache.report()
+        print(f"{name:<12} {results[name] * 1e6:>8.2f} us/request  hit ratio {report['hit_ratio']}")
+    print(f"saved {(results['no cache'] - results['token cache']) * 1e6:.2f} us/request "
+          f"({results['no cache'] / results['token cache']:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=100, help="Distinct tokens, used in turn.")
+    asyncio.run(main(parser.parse_args()))
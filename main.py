@@ -1,13 +1,17 @@
-import redis.asyncio as redis
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 import uvicorn
 
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
-
-from src.routes import contacts, auth, users
+from src.routes import contacts, auth, users, stats, metrics
 from src.conf.config import settings
+from src.services.avatars import avatar_pipeline
+from src.services.hashing import password_hasher
+from src.services.metrics import MetricsMiddleware
+from src.services.outbox import outbox_worker
+from src.services.rate_limit import rate_limiter
+from src.database.profiling import QueryProfilerMiddleware
+from src.database.redis_pool import close_redis
 
 app = FastAPI()
 
@@ -21,20 +25,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(contacts.router, prefix='/api')
 app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
+app.include_router(stats.router, prefix='/api')
+app.include_router(metrics.router)
+if settings.avatar_storage == "local":
+    app.mount(settings.avatar_local_url, StaticFiles(directory=settings.avatar_local_dir, check_dir=False),
+              name="avatars")
 
 @app.on_event("startup")
 async def startup():
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding="utf-8", decode_responses=True)
-    await FastAPILimiter.init(r)
+    rate_limiter.start()
+    if settings.outbox_worker_enabled:
+        outbox_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await rate_limiter.stop()
+    await outbox_worker.stop()
+    await avatar_pipeline.drain()
+    avatar_pipeline.shutdown()
+    password_hasher.shutdown()
+    await close_redis()
 
 
-@app.get("/", dependencies=[Depends(RateLimiter(times=2, seconds=5))])
+@app.get("/", dependencies=[Depends(rate_limiter.limit("index", times=2, seconds=5))])
 async def index():
     return {"msg": "Hello World"}
 
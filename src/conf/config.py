@@ -5,16 +5,72 @@ class Settings(BaseSettings):
     sqlalchemy_database_url: str
     secret_key: str
     algorithm: str
+    internal_token: str | None = None
     mail_username: str
     mail_password: str
     mail_from: str
     mail_port: int
     mail_server: str
+    mail_from_name: str = "Example email"
+    mail_ssl_tls: bool = True
+    mail_starttls: bool = False
+    mail_use_credentials: bool = True
+    mail_validate_certs: bool = True
+    smtp_idle_timeout: float = 60
+    smtp_pool_size: int = 4
+    outbox_worker_enabled: bool = True
+    outbox_batch_size: int = 50
+    outbox_poll_interval: float = 1
+    outbox_lease: int = 300
+    outbox_max_attempts: int = 8
+    outbox_backoff_base: int = 30
+    outbox_backoff_max: int = 3600
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    debug: bool = False
+    sql_slow_query_ms: float = 100
+    sql_repeat_threshold: int = 10
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    redis_db: int = 0
+    redis_password: str | None = None
+    redis_pool_size: int = 50
+    redis_pool_timeout: float = 5
+    redis_socket_timeout: float = 5
+    rate_limit_sync_interval: float = 1
+    rate_limits: str = ''
+    rate_limit_max_buckets: int = 100000
+    trusted_proxies: str = ''
     cloudinary_name: str
     cloudinary_api_key: str
     cloudinary_api_secret: str
+    avatar_storage: str = 'cloudinary'
+    avatar_sizes: str = '250,100,50'
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_pool_size: int = 2
+    avatar_max_pending: int = 32
+    avatar_local_dir: str = 'static/avatars'
+    avatar_local_url: str = '/static/avatars'
+    hash_pool_kind: str = 'thread'
+    hash_pool_size: int = 4
+    hash_queue_size: int = 64
+    user_cache_size: int = 10000
+    user_cache_local_ttl: int = 30
+    user_cache_ttl: int = 900
+    refresh_token_ttl: int = 7 * 24 * 3600
+    token_cache_size: int = 10000
+    import_batch_size: int = 5000
+    import_max_errors: int = 1000
+    import_sqlite_cache_kib: int = 65536
+    export_batch_size: int = 1000
+    phone_country_code: str = '380'
+    duplicates_batch_size: int = 5000
+    duplicates_max_block: int = 50
+    response_cache_ttl: int = 300
+    response_cache_routes: str = "read_contacts,search_contacts,get_contacts_birthday,find_duplicates"
 
     class Config:
         env_file = ".env"
@@ -1 +1,8 @@
-USER_EXISTS_ERROR = "Account already exists"
\ No newline at end of file
+USER_EXISTS_ERROR = "Account already exists"
+SERVER_BUSY_ERROR = "Server is busy, try again later"
+INVALID_CURSOR_ERROR = "Invalid cursor"
+INVALID_IMAGE_ERROR = "File is not a supported image"
+AVATAR_TOO_LARGE_ERROR = "Avatar file is too large"
+TOKEN_STORE_UNAVAILABLE_ERROR = "Token store is unavailable, try again later"
+INVALID_REFRESH_TOKEN_ERROR = "Invalid refresh token"
+INVALID_PHONE_ERROR = "Invalid phone number"
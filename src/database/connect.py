@@ -1,26 +1,61 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from src.conf.config import settings
+from src.database import profiling
+from src.database.pool import pool_options, pool_stats
+
+
+# Async drivers used in place of the synchronous ones from SQLALCHEMY_DATABASE_URL.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_url(url: str) -> str:
+    """
+    Convert synchronous database URL to its async driver counterpart.
+
+    :param url: Database URL, e.g. "postgresql+psycopg2://...".
+    :type url: str
+    :return: URL with an async driver, e.g. "postgresql+asyncpg://...".
+    :rtype: str
+    """
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() in ("asyncpg", "aiosqlite"):
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
 
 
 # "postgresql+psycopg2://<username>:<password>@<host>:<port>/<database_name>"
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+ASYNC_DATABASE_URL = get_async_url(SQLALCHEMY_DATABASE_URL)
+engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(make_url(ASYNC_DATABASE_URL)))
+pool_stats.listen(engine)
+profiling.listen(engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
 
 if __name__=="__main__":
-    try:
-        with engine.connect() as connection:
-            print("Connection successful!")
-    except Exception as e:
-        print(f"Connection failed: {e}")
\ No newline at end of file
+    async def check_connection():
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                print("Connection successful!")
+        except Exception as e:
+            print(f"Connection failed: {e}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(check_connection())
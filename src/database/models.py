@@ -1,10 +1,79 @@
-from sqlalchemy import Column, Integer, String, Date, Text, Boolean
+import re
+from datetime import date
+
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, Text, Boolean, Index, DDL, event, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.schema import ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+
+from src.conf.config import settings
 
 Base = declarative_base()
 
+# Days before each month in a leap year, indexed by month number.
+_DAYS_BEFORE_MONTH = [0, 0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335]
+
+
+def birthday_key(value: date | str | None) -> int | None:
+    """
+    Day of a leap year (1-366) the birthday falls on, so that upcoming birthdays are a range scan.
+
+    :param value: Birthday.
+    :type value: date | str | None
+    :return: Birthday key or None if there is no birthday.
+    :rtype: int | None
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return _DAYS_BEFORE_MONTH[value.month] + value.day
+
+
+def _birthday_key_default(context):
+    return birthday_key(context.get_current_parameters().get('birthday'))
+
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def phone_e164(value: str | None, country_code: str | None = None) -> str | None:
+    """
+    Phone number in E.164 form, such as ``+380501234567``, so that every way of writing a number
+    is stored and looked up the same.
+
+    A number starting with ``+`` or ``00`` is international. Otherwise a leading ``0`` is the
+    trunk prefix of a national number and is replaced by the country code, and a number that
+    does not start with the country code already is taken as national without the prefix.
+
+    :param value: Phone number as written.
+    :type value: str | None
+    :param country_code: Country code of national numbers, ``PHONE_COUNTRY_CODE`` by default.
+    :type country_code: str | None
+    :return: E.164 number, or None if the value cannot be one.
+    :rtype: str | None
+    """
+    if not value:
+        return None
+    country_code = country_code or settings.phone_country_code
+    value = value.strip()
+    digits = _NON_DIGITS.sub('', value)
+    if value.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]
+    elif not digits.startswith(country_code):
+        digits = country_code + digits
+    if not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return None
+    return '+' + digits
+
+
+def _phone_e164_default(context):
+    return phone_e164(context.get_current_parameters().get('phone_number'))
+
 
 class Contact(Base):
     __tablename__ = 'contacts'
@@ -12,13 +81,35 @@ class Contact(Base):
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(50), nullable=False, index=True)
     last_name = Column(String(50), nullable=False, index=True)
-    email = Column(String(50), unique=True, index=True)
+    # Unique per user through ix_contacts_user_id_email.
+    email = Column(String(50))
     phone_number = Column(String(15))
+    # phone_number in E.164 for lookups by number; None when it is not a valid number.
+    phone_e164 = Column(String(16), default=_phone_e164_default)
     birthday = Column(Date)
+    birthday_key = Column(SmallInteger, default=_birthday_key_default)
     additional_info = Column(Text)
+    # Owner's contacts_version after the last write to this contact; unique per user even if IDs are reused.
+    version = Column(Integer, nullable=False, default=0, server_default='0')
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref="tags")
-    
+
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_birthday_key', 'user_id', 'birthday_key'),
+        Index('ix_contacts_user_id_email', 'user_id', 'email', unique=True),
+        Index('ix_contacts_user_id_phone_e164', 'user_id', 'phone_e164'),
+    )
+
+    @validates('birthday')
+    def _update_birthday_key(self, key, value):
+        self.birthday_key = birthday_key(value)
+        return value
+
+    @validates('phone_number')
+    def _update_phone_e164(self, key, value):
+        self.phone_e164 = phone_e164(value)
+        return value
 
 
 class User(Base):
@@ -26,8 +117,74 @@ class User(Base):
     
     id = Column(Integer, primary_key=True)
     username = Column(String(50))
-    email = Column(String(250), nullable=False, unique=True)
+    # Unique regardless of case through ix_users_email_lower, which also serves every lookup.
+    email = Column(String(250), nullable=False)
     password = Column(String(255), nullable=False)
     avatar = Column(String(255), nullable=True)
+    # Only read to adopt refresh tokens issued before token families moved to Redis.
     refresh_token = Column(String(255), nullable=True)
-    confirmed = Column(Boolean, default=False)
\ No newline at end of file
+    confirmed = Column(Boolean, default=False)
+    # Bumped with every change to the user's contacts, for collection ETags.
+    contacts_version = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        Index('ix_users_email_lower', func.lower(email), unique=True),
+    )
+
+
+class EmailOutbox(Base):
+    """
+    E-mail waiting to be sent by the outbox worker. Rows are deleted once the mail is sent.
+    """
+    __tablename__ = 'email_outbox'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)
+    recipient = Column(String(250), nullable=False)
+    username = Column(String(50))
+    host = Column(String(255))
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    # Also pushed forward when a worker claims the row, so that other workers skip it meanwhile.
+    next_attempt_at = Column(DateTime, nullable=False, index=True)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+
+
+# Kept separate so offline bulk loads can swap the per-row trigger for one set-based insert.
+CONTACTS_FTS_INSERT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END"
+)
+
+# Full-text search index over contact names and e-mail, maintained by the database itself so it
+# stays in sync with every write path. PostgreSQL gets a generated tsvector column with a
+# (user_id, search_vector) GIN index, SQLite an external-content FTS5 table kept up by triggers.
+CONTACTS_SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || "
+        "coalesce(email, '') || ' ' || regexp_replace(coalesce(email, ''), '[@._+-]', ' ', 'g'))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_contacts_search ON contacts USING gin (user_id, search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+        "first_name, last_name, email, content='contacts', content_rowid='id', prefix='2 3')",
+        CONTACTS_FTS_INSERT_TRIGGER,
+        "CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN "
+        "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email) "
+        "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); END",
+        "CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE ON contacts BEGIN "
+        "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email) "
+        "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+        "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+        "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+        "INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')",
+    ],
+}
+
+for dialect, statements in CONTACTS_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Contact.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+event.listen(Contact.__table__, "after_drop", DDL("DROP TABLE IF EXISTS contacts_fts").execute_if(dialect="sqlite"))
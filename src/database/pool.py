@@ -0,0 +1,147 @@
+import bisect
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.conf.config import settings
+
+# Upper bounds in milliseconds of the checkout wait histogram; the last bucket is open.
+WAIT_BUCKETS_MS = (1, 10, 100, 1000)
+
+
+class PoolStats:
+    """
+    Counters of connection pool usage.
+
+    Checkouts, new connections and invalidations come from pool event listeners. How long a
+    checkout waited and whether it timed out come from :class:`TimedQueuePool`, because the pool
+    has no event that fires before a checkout starts waiting.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.wait_ms_total += ms
+        self.wait_ms_max = max(self.wait_ms_max, ms)
+        self.wait_buckets[bisect.bisect_right(WAIT_BUCKETS_MS, ms)] += 1
+
+    def listen(self, engine: AsyncEngine) -> None:
+        """
+        Register the pool event listeners of the engine.
+
+        :param engine: Engine.
+        :type engine: AsyncEngine
+        """
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "checkout")
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            pool = sync_engine.pool
+            self.checkouts += 1
+            if isinstance(pool, AsyncAdaptedQueuePool):
+                self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+                self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+        @event.listens_for(sync_engine, "connect")
+        def connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(sync_engine, "invalidate")
+        def invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations += 1
+
+    def report(self, engine: AsyncEngine) -> dict:
+        """
+        Pool settings, current usage and counters.
+
+        :param engine: Engine whose pool is reported.
+        :type engine: AsyncEngine
+        :return: Stats.
+        :rtype: dict
+        """
+        pool = engine.sync_engine.pool
+        report = {"pool": type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            report.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        waits = sum(self.wait_buckets)
+        labels = [f"<{bound}ms" for bound in WAIT_BUCKETS_MS] + [f">={WAIT_BUCKETS_MS[-1]}ms"]
+        report.update({
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": max(self.peak_overflow, 0),
+            "wait_ms_mean": round(self.wait_ms_total / waits, 3) if waits else None,
+            "wait_ms_max": round(self.wait_ms_max, 3),
+            "wait_ms_histogram": dict(zip(labels, self.wait_buckets)),
+        })
+        return report
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records in :data:`pool_stats` how long every checkout waited for a
+    connection, including opening a new one, and how many gave up after ``pool_timeout``.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+def pool_options(url: URL) -> dict:
+    """
+    Engine keyword arguments for the pool, taken from the settings.
+
+    In-memory SQLite keeps the default single-connection pool: every new connection would be
+    a new, empty database.
+
+    :param url: Async database URL.
+    :type url: URL
+    :return: Keyword arguments for ``create_async_engine``.
+    :rtype: dict
+    """
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
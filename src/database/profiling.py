@@ -0,0 +1,123 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.services.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfile:
+    """
+    Queries issued while handling one request.
+    """
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        Statements that ran at least ``threshold`` times, most frequent first.
+
+        :param threshold: Minimum number of runs.
+        :type threshold: int
+        :return: Statement and number of runs.
+        :rtype: list[tuple[str, int]]
+        """
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar("current_profile", default=None)
+
+
+def parameters_shape(parameters, executemany: bool) -> str:
+    """
+    Describe bound parameters by their types only, so that logs carry no user data.
+
+    :param parameters: DBAPI parameters of the statement.
+    :param executemany: Whether the parameters are a list of parameter sets.
+    :type executemany: bool
+    :return: E.g. ``(int, str)`` or ``500 x (str, str, NoneType)``.
+    :rtype: str
+    """
+    if executemany:
+        return f"{len(parameters)} x {parameters_shape(parameters[0], False)}" if parameters else "0 x ()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+def listen(engine: AsyncEngine) -> None:
+    """
+    Time every statement of the engine, add it to the profile of the current request and log it
+    when it takes at least ``SQL_SLOW_QUERY_MS``.
+
+    :param engine: Engine.
+    :type engine: AsyncEngine
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.profiling_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.profiling_started
+        profile = current_profile.get()
+        if profile is not None:
+            profile.count += 1
+            profile.seconds += elapsed
+            profile.statements[statement] += 1
+        if elapsed * 1000 >= settings.sql_slow_query_ms:
+            logger.warning("Slow query, %.1f ms: %s; parameters %s", elapsed * 1000, statement,
+                           parameters_shape(parameters, executemany))
+
+
+class QueryProfilerMiddleware:
+    """
+    Pure ASGI middleware that collects a :class:`QueryProfile` for every HTTP request.
+
+    Statements run ``SQL_REPEAT_THRESHOLD`` times or more within one request are logged as a
+    likely N+1. With ``DEBUG`` on, the response gets a ``Server-Timing`` header with the number
+    of queries and their total time up to the start of the response.
+
+    :param app: Wrapped application.
+    :type app: ASGIApp
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.debug:
+                timing = f'db;dur={profile.seconds * 1000:.1f};desc="{profile.count} queries"'
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            route = route_template(scope)
+            for statement, count in profile.repeated(settings.sql_repeat_threshold):
+                logger.warning("%s %s ran the same statement %d times: %s", scope["method"], route, count, statement)
+            logger.debug("%s %s: %d queries in %.1f ms", scope["method"], route, profile.count,
+                         profile.seconds * 1000)
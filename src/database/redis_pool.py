@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError
+
+from src.conf.config import settings
+
+
+class TimedConnectionPool(redis.BlockingConnectionPool):
+    """
+    Bounded Redis connection pool shared by every component of the process.
+
+    A command that finds all ``max_connections`` connections in use waits up to ``timeout``
+    seconds for one to be released instead of opening another. Checkouts, how long they waited
+    and how many gave up are counted for :meth:`report`.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = {"checkouts": 0, "timeouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(*args, **kwargs)
+        except ConnectionError as err:
+            if isinstance(err.__cause__, asyncio.TimeoutError):
+                self.stats["timeouts"] += 1
+            raise
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.stats["checkouts"] += 1
+            self.stats["wait_ms_total"] += ms
+            self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], ms)
+
+    def report(self) -> dict:
+        """
+        Pool settings, current usage and counters.
+
+        :return: Stats.
+        :rtype: dict
+        """
+        stats = self.stats
+        return {
+            "max_connections": self.max_connections,
+            "timeout": self.timeout,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "checkouts": stats["checkouts"],
+            "timeouts": stats["timeouts"],
+            "wait_ms_mean": round(stats["wait_ms_total"] / stats["checkouts"], 3) if stats["checkouts"] else None,
+            "wait_ms_max": round(stats["wait_ms_max"], 3),
+        }
+
+
+redis_pool = TimedConnectionPool(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=settings.redis_db,
+    password=settings.redis_password,
+    max_connections=settings.redis_pool_size,
+    timeout=settings.redis_pool_timeout,
+    socket_timeout=settings.redis_socket_timeout,
+    socket_connect_timeout=settings.redis_socket_timeout,
+    health_check_interval=30,
+)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+
+async def close_redis() -> None:
+    """
+    Close the shared client and disconnect every pooled connection.
+    """
+    await redis_client.aclose()
+    await redis_pool.disconnect()
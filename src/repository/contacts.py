@@ -1,70 +1,263 @@
+import re
 from datetime import date, timedelta
+from typing import AsyncIterator, Sequence
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import extract
+from sqlalchemy import and_, or_, select, update, delete, bindparam, func, literal, literal_column, table, column, Row
+from sqlalchemy import String, type_coerce
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from src.database.models import Contact, User
-from src.schemas import ContactSchema, ContactBirthday
+from src.database.models import Contact, User, birthday_key, phone_e164
+from src.schemas import ContactSchema, ContactBirthday, ContactBatchItemResult
+from src.services.cache import response_cache
 
 
-async def create_contact(body: ContactSchema, db: Session, user: User):
+async def get_contacts_version(db: AsyncSession, user: User) -> int:
+    """
+    Return the version of the user's contacts, bumped by every write to them.
+
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Contacts version.
+    :rtype: int
+    """
+    result = await db.execute(select(User.contacts_version).filter(User.id == user.id))
+    return result.scalar_one()
+
+
+async def _bump_contacts_version(db: AsyncSession, user: User) -> int:
+    result = await db.execute(
+        update(User).filter(User.id == user.id).values(contacts_version=User.contacts_version + 1)
+        .returning(User.contacts_version)
+    )
+    return result.scalar_one()
+
+
+async def create_contact(body: ContactSchema, db: AsyncSession, user: User):
     """
     Create contact
 
     :param body: Contact body.
     :type body: ContactSchema
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
     :return: Created contact.
     :rtype: Contact
     """
-    contact = Contact(**body.dict(), user_id=user.id)
+    version = await _bump_contacts_version(db, user)
+    contact = Contact(**body.dict(), user_id=user.id, version=version)
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    await db.commit()
+    await response_cache.invalidate(user.id)
+    await db.refresh(contact)
     return contact
 
 
-async def get_contacts(limit: int, offset: int, db: Session, user: User):
+def _sqlite_contact_row(row: dict, user_id: int, version: int) -> tuple:
+    birthday = row["birthday"]
+    return (
+        row["first_name"], row["last_name"], row["email"], row["phone_number"], phone_e164(row["phone_number"]),
+        birthday and birthday.isoformat(), birthday_key(birthday), row["additional_info"], user_id, version,
+    )
+
+
+async def _insert_sqlite_bulk(rows: list[dict], db: AsyncSession, user: User):
+    """
+    Insert rows on SQLite with one driver-level ``executemany``.
+
+    Rows go to the driver as tuples, skipping SQLAlchemy's per-row parameter processing, so dates
+    are bound in the ISO format the SQLite Date type stores. The search index trigger stays in
+    place and indexes every row as it is inserted.
+    """
+    version = await _bump_contacts_version(db, user)
+    conn = await db.connection()
+    await conn.exec_driver_sql(
+        "INSERT INTO contacts (first_name, last_name, email, phone_number, phone_e164, birthday, birthday_key, "
+        "additional_info, user_id, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [_sqlite_contact_row(row, user.id, version) for row in rows],
+    )
+
+
+async def create_contacts_bulk(rows: list[dict], db: AsyncSession, user: User) -> dict[int, str]:
+    """
+    Insert many contacts with one batched statement in one transaction.
+
+    Rows whose e-mail the user already has are skipped up front with a single lookup. If the batch
+    still hits a constraint, it is retried row by row in savepoints to find the culprits.
+
+    :param rows: Validated contact fields.
+    :type rows: list[dict]
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Error message by index of every row that was not inserted.
+    :rtype: dict[int, str]
+    """
+    errors = {}
+    emails = {}
+    for index, row in enumerate(rows):
+        email = row.get("email")
+        if email is None:
+            continue
+        if email in emails:
+            errors[index] = "Duplicate email in upload"
+        else:
+            emails[email] = index
+    if emails:
+        existing = await db.execute(
+            select(Contact.email).filter(Contact.user_id == user.id, Contact.email.in_(list(emails)))
+        )
+        for email in existing.scalars():
+            errors[emails[email]] = "Email already exists"
+
+    valid = {index: row for index, row in enumerate(rows) if index not in errors}
+    if not valid:
+        return errors
+    # Core insert: the ORM bulk path costs more per row than the database does.
+    stmt = Contact.__table__.insert().values(user_id=user.id)
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            await _insert_sqlite_bulk(list(valid.values()), db, user)
+        else:
+            version = await _bump_contacts_version(db, user)
+            await db.execute(stmt.values(version=version), list(valid.values()))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        version = await _bump_contacts_version(db, user)
+        for index, row in valid.items():
+            try:
+                async with db.begin_nested():
+                    await db.execute(stmt.values(version=version), [row])
+            except IntegrityError as err:
+                errors[index] = str(err.orig)
+        await db.commit()
+    await response_cache.invalidate(user.id)
+    return errors
+
+
+async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User):
     """
     Return all user's contacts
 
     :param limit: The maximum number of notes to return.
     :type limit: int
-    :param offset: Offset.
+    :param offset: Offset. Prefer :func:`get_contacts_after` for deep pages.
     :type offset: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
     :return: Contacts.
     :rtype: List[Contact]
     """
-    contacts = db.query(Contact).filter(and_(Contact.user_id == user.id)).limit(limit).offset(offset).all()
-    return contacts
+    stmt = select(Contact).filter(and_(Contact.user_id == user.id)).order_by(Contact.id).limit(limit).offset(offset)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
 
 
-async def get_contact(contact_id: int, db: Session, user: User):
+async def get_contacts_after(limit: int, after_id: int | None, db: AsyncSession, user: User):
+    """
+    Return user's contacts following the given contact ID (keyset pagination).
+
+    Served by the ``(user_id, id)`` index, so every page costs the same no matter how deep it is.
+
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param after_id: ID of the last contact of the previous page, or None for the first page.
+    :type after_id: int | None
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Contacts ordered by ID.
+    :rtype: List[Contact]
+    """
+    stmt = select(Contact).filter(Contact.user_id == user.id)
+    if after_id is not None:
+        stmt = stmt.filter(Contact.id > after_id)
+    stmt = stmt.order_by(Contact.id).limit(limit)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def stream_contacts(db: AsyncSession, user: User, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+    """
+    Stream all user's contacts, ordered by ID, in batches from a server-side cursor.
+
+    Rows are plain column tuples in ``ContactSchema`` field order, not ORM objects, so memory use
+    is bounded by ``batch_size`` however many contacts there are.
+
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :param batch_size: Rows fetched per round trip.
+    :type batch_size: int
+    :return: Batches of rows.
+    :rtype: AsyncIterator[Sequence[Row]]
+    """
+    stmt = select(*(Contact.__table__.c[name] for name in ContactSchema.model_fields)).filter(
+        Contact.user_id == user.id
+    ).order_by(Contact.id).execution_options(yield_per=batch_size)
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def stream_contact_keys(db: AsyncSession, user: User, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+    """
+    Stream the fields duplicates are matched on of all user's contacts, like :func:`stream_contacts`.
+
+    Rows are ``(id, first_name, last_name, email, phone_e164, birthday)``. The birthday is only
+    compared, so it is passed on as the database returns it: an ISO string on SQLite, where
+    parsing it into a date would double the time. The statement runs on the session's connection,
+    skipping the ORM result layer, which costs as much again for half a million rows.
+
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :param batch_size: Rows fetched per round trip.
+    :type batch_size: int
+    :return: Batches of rows.
+    :rtype: AsyncIterator[Sequence[Row]]
+    """
+    stmt = select(
+        Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone_e164,
+        type_coerce(Contact.birthday, String),
+    ).filter(Contact.user_id == user.id).order_by(Contact.id).execution_options(yield_per=batch_size)
+    conn = await db.connection()
+    result = await conn.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_contact(contact_id: int, db: AsyncSession, user: User):
     """
     Get contact by ID
 
     :param contact_id: Contact's ID.
     :type contact_id: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
     :return: The contact with the specified ID, or None if it does not exist.
     :rtype: Contact | None
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
-    return contact
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    contact = await db.execute(stmt)
+    return contact.scalar_one_or_none()
 
 
-async def update_contact(body: ContactSchema, contact_id: int, db: Session, user: User):
+async def update_contact(body: ContactSchema, contact_id: int, db: AsyncSession, user: User):
     """
     Update contact by ID
 
@@ -73,13 +266,15 @@ async def update_contact(body: ContactSchema, contact_id: int, db: Session, user
     :param contact_id: Contact's ID.
     :type contact_id: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
     :return: Update contact with the specified ID, or None if it does not exist.
     :rtype: Contact | None
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
     if contact:
         contact.first_name = body.first_name
         contact.last_name = body.last_name
@@ -87,73 +282,304 @@ async def update_contact(body: ContactSchema, contact_id: int, db: Session, user
         contact.phone_number = body.phone_number
         contact.birthday = body.birthday
         contact.additional_info = body.additional_info
-        db.commit()
+        contact.version = await _bump_contacts_version(db, user)
+        await db.commit()
+        await response_cache.invalidate(user.id)
     return contact
 
 
-async def remove_contact(contact_id: int, db: Session, user: User):
+async def remove_contact(contact_id: int, db: AsyncSession, user: User):
     """
     Remove contact by ID
 
     :param contact_id: Contact's ID.
     :type contact_id: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
     :return: Contact.
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
     if contact:
-        db.delete(contact)
-        db.commit()
+        await db.delete(contact)
+        await _bump_contacts_version(db, user)
+        await db.commit()
+        await response_cache.invalidate(user.id)
+    return contact
+
+
+async def batch_contacts(updates: list[ContactSchema], deletes: list[int], db: AsyncSession,
+                         user: User) -> list[ContactBatchItemResult]:
+    """
+    Update and delete many contacts in one transaction.
+
+    One lookup finds which IDs belong to the user and which new e-mails are taken by the user's
+    other contacts; then all updates run as one executemany UPDATE and all deletes as one
+    DELETE ... WHERE id IN. If an update still hits a constraint, updates are retried one by one
+    in savepoints to find the culprits.
+
+    :param updates: New contact data, matched by ``id``.
+    :type updates: list[ContactSchema]
+    :param deletes: IDs of contacts to delete.
+    :type deletes: list[int]
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Result of every item, updates first, in request order.
+    :rtype: list[ContactBatchItemResult]
+    """
+    ids = [body.id for body in updates] + deletes
+    owned = set((await db.execute(
+        select(Contact.id).filter(Contact.user_id == user.id, Contact.id.in_(ids))
+    )).scalars()) if ids else set()
+
+    statuses = {}
+    emails = {}
+    for body in updates:
+        if body.id not in owned:
+            statuses[body.id] = "not_found"
+        elif body.email is None:
+            continue
+        elif body.email in emails:
+            statuses[body.id] = "conflict"
+        else:
+            emails[body.email] = body.id
+    if emails:
+        taken = await db.execute(
+            select(Contact.id, Contact.email).filter(Contact.user_id == user.id, Contact.email.in_(list(emails)))
+        )
+        for contact_id, email in taken:
+            if emails[email] != contact_id:
+                statuses[emails[email]] = "conflict"
+
+    removed = [contact_id for contact_id in deletes if contact_id in owned]
+    valid = [body for body in updates if body.id not in statuses]
+    version = await _bump_contacts_version(db, user) if valid or removed else None
+    values = [
+        {**body.model_dump(exclude={"id"}), "birthday_key": birthday_key(body.birthday),
+         "phone_e164": phone_e164(body.phone_number), "version": version, "contact_id": body.id}
+        for body in valid
+    ]
+    stmt = Contact.__table__.update().where(
+        Contact.__table__.c.id == bindparam("contact_id"), Contact.__table__.c.user_id == user.id
+    )
+    try:
+        if values:
+            await db.execute(stmt, values)
+    except IntegrityError:
+        await db.rollback()
+        version = await _bump_contacts_version(db, user)
+        for value in values:
+            value["version"] = version
+            try:
+                async with db.begin_nested():
+                    await db.execute(stmt, [value])
+            except IntegrityError:
+                statuses[value["contact_id"]] = "conflict"
+    if removed:
+        await db.execute(
+            delete(Contact).filter(Contact.user_id == user.id, Contact.id.in_(removed)),
+            execution_options={"synchronize_session": False},
+        )
+    await db.commit()
+    if version is not None:
+        await response_cache.invalidate(user.id)
+
+    return [
+        ContactBatchItemResult(id=body.id, action="update", status=statuses.get(body.id, "updated"))
+        for body in updates
+    ] + [
+        ContactBatchItemResult(id=contact_id, action="delete",
+                               status="deleted" if contact_id in owned else "not_found")
+        for contact_id in deletes
+    ]
+
+
+async def get_contacts_by_phone(phone: str, db: AsyncSession, user: User):
+    """
+    Get the user's contacts with the given phone number, from one probe of the
+    ``(user_id, phone_e164)`` index.
+
+    :param phone: Phone number in E.164 form.
+    :type phone: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Contacts with the number, ordered by ID.
+    :rtype: List[Contact]
+    """
+    stmt = select(Contact).filter(Contact.user_id == user.id, Contact.phone_e164 == phone).order_by(Contact.id)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def get_contacts_by_ids(contact_ids: list[int], db: AsyncSession, user: User):
+    """
+    Get user's contacts by IDs
+
+    :param contact_ids: Contact IDs.
+    :type contact_ids: list[int]
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Contacts ordered by ID; IDs of other users' contacts are left out.
+    :rtype: List[Contact]
+    """
+    if not contact_ids:
+        return []
+    stmt = select(Contact).filter(Contact.user_id == user.id, Contact.id.in_(contact_ids)).order_by(Contact.id)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def merge_contacts(contact_id: int, duplicate_ids: list[int], db: AsyncSession, user: User):
+    """
+    Fold duplicates into a contact in one transaction.
+
+    The contact keeps its own fields; the empty ones are filled from the duplicates in ID order,
+    and distinct additional info of all of them is joined. The duplicates are deleted before the
+    contact is updated, so it can take over the e-mail of one of them.
+
+    :param contact_id: ID of the contact to keep.
+    :type contact_id: int
+    :param duplicate_ids: IDs of the contacts to fold into it.
+    :type duplicate_ids: list[int]
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Merged contact, or None if any of the contacts does not exist.
+    :rtype: Contact | None
+    """
+    stmt = select(Contact).filter(
+        Contact.user_id == user.id, Contact.id.in_([contact_id, *duplicate_ids])
+    ).order_by(Contact.id).with_for_update()
+    contacts = (await db.execute(stmt)).scalars().all()
+    if len(contacts) != len(duplicate_ids) + 1:
+        await db.rollback()
+        return None
+    contact = next(contact for contact in contacts if contact.id == contact_id)
+    duplicates = [duplicate for duplicate in contacts if duplicate is not contact]
+    await db.execute(
+        delete(Contact).filter(Contact.user_id == user.id, Contact.id.in_(duplicate_ids)),
+        execution_options={"synchronize_session": False},
+    )
+    for duplicate in duplicates:
+        db.expunge(duplicate)
+    for name in ("email", "phone_number", "birthday"):
+        if not getattr(contact, name):
+            setattr(contact, name, next(
+                (getattr(duplicate, name) for duplicate in duplicates if getattr(duplicate, name)), getattr(contact, name)
+            ))
+    info = [contact.additional_info] + [duplicate.additional_info for duplicate in duplicates]
+    contact.additional_info = "\n".join(dict.fromkeys(text for text in info if text)) or None
+    contact.version = await _bump_contacts_version(db, user)
+    await db.commit()
+    await response_cache.invalidate(user.id)
     return contact
 
+def _search_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())
+
 
-async def search_contacts(query: str, db: Session, user: User):
+def _search_statement(dialect: str, terms: list[str], user: User):
+    """
+    Build the matching query with a relevance column for the database dialect.
+
+    Higher ``rank`` means a better match.
+    """
+    if dialect == "postgresql":
+        vector = literal_column("contacts.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        return select(Contact, func.ts_rank(vector, tsquery).label("rank")).filter(
+            Contact.user_id == user.id, vector.op("@@")(tsquery)
+        )
+    if dialect == "sqlite":
+        fts = table("contacts_fts", column("rowid"))
+        return select(Contact, (-func.bm25(literal_column("contacts_fts"))).label("rank")).join(
+            fts, fts.c.rowid == Contact.id
+        ).filter(
+            Contact.user_id == user.id, literal_column("contacts_fts").match(" ".join(f'"{term}"*' for term in terms))
+        )
+    # No search index for other dialects: fall back to scanning the user's contacts.
+    return select(Contact, literal(0.0).label("rank")).filter(
+        Contact.user_id == user.id,
+        and_(*(
+            Contact.first_name.contains(term) | Contact.last_name.contains(term) | Contact.email.contains(term)
+            for term in terms
+        ))
+    )
+
+
+async def search_contacts(query: str, limit: int, after: tuple[float, int] | None, db: AsyncSession, user: User):
     """
     Search contact by some text
 
+    Every word of the query must prefix-match a word of the first name, last name or e-mail.
+    Results are ordered by relevance, best first.
+
     :param query: String for search
     :type query: str
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param after: ``(rank, id)`` of the last contact of the previous page, or None for the first page.
+    :type after: tuple[float, int] | None
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
-    :return: List founded contacts.
-    :rtype: List[Contact]
+    :return: Rows of founded contact and its rank.
+    :rtype: List[Row[Contact, float]]
     """
-    contacts = db.query(Contact).filter(
-        and_(
-            Contact.user_id == user.id,
-            (
-                (Contact.first_name.contains(query)) |
-                (Contact.last_name.contains(query)) |
-                (Contact.email.contains(query))
-            )
-        )
-    ).all()
-    return contacts
+    terms = _search_terms(query)
+    if not terms:
+        return []
+    matches = _search_statement(db.get_bind().dialect.name, terms, user).subquery()
+    found = aliased(Contact, matches)
+    stmt = select(found, matches.c.rank)
+    if after is not None:
+        rank, contact_id = after
+        stmt = stmt.filter(or_(matches.c.rank < rank, and_(matches.c.rank == rank, matches.c.id > contact_id)))
+    stmt = stmt.order_by(matches.c.rank.desc(), matches.c.id).limit(limit)
+    contacts = await db.execute(stmt)
+    return contacts.all()
 
 
-async def get_birthdays_week(db: Session, user: User):
+async def get_birthdays_week(db: AsyncSession, user: User, days: int = 7):
     """
-    List of contacts who have a birthday in the next 7 days.
+    List of contacts who have a birthday in the next ``days`` days, nearest first.
+
+    Uses the precomputed ``birthday_key`` so the lookup is an index range scan; a window that
+    crosses the end of the year is split into two ranges.
 
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: Current user.
     :type user: User
+    :param days: Size of the window in days, today included.
+    :type days: int
     :return: List founded contacts.
-    :rtype: List[Contact]
+    :rtype: List[ContactBirthday]
     """
     today = date.today()
-    end_date = today + timedelta(days=7)
-    contacts = db.query(Contact).filter(
-        (Contact.user_id == user.id) &
-        (extract('month', Contact.birthday) == today.month) & (extract('day', Contact.birthday) >= today.day)
-        & (extract('month', Contact.birthday) == end_date.month) & (extract('day', Contact.birthday) <= end_date.day)
-    ).all()
+    start_key = birthday_key(today)
+    end_key = birthday_key(today + timedelta(days=days))
+    if days >= 365:
+        in_window = Contact.birthday_key.is_not(None)
+    elif start_key <= end_key:
+        in_window = Contact.birthday_key.between(start_key, end_key)
+    else:
+        in_window = or_(Contact.birthday_key >= start_key, Contact.birthday_key <= end_key)
+    stmt = select(Contact.id, Contact.first_name, Contact.last_name, Contact.birthday).filter(
+        Contact.user_id == user.id, in_window
+    ).order_by(Contact.birthday_key < start_key, Contact.birthday_key)
+    contacts = await db.execute(stmt)
     return [
         ContactBirthday(
             id=contact.id,
@@ -161,5 +587,5 @@ async def get_birthdays_week(db: Session, user: User):
             last_name=contact.last_name,
             birthday=contact.birthday
         )
-        for contact in contacts
-    ]
\ No newline at end of file
+        for contact in contacts.all()
+    ]
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import EmailOutbox
+
+
+def backoff(attempts: int) -> timedelta:
+    """
+    Delay before the next attempt to send an e-mail, doubling with every failed attempt.
+
+    :param attempts: Failed attempts so far, at least 1.
+    :type attempts: int
+    :return: Delay, at most ``OUTBOX_BACKOFF_MAX`` seconds.
+    :rtype: timedelta
+    """
+    return timedelta(seconds=min(settings.outbox_backoff_base * 2 ** (attempts - 1), settings.outbox_backoff_max))
+
+
+async def enqueue_email(kind: str, recipient: str, username: str | None, host: str | None, db: AsyncSession,
+                        commit: bool = True) -> EmailOutbox:
+    """
+    Add an e-mail to the outbox.
+
+    :param kind: Kind of e-mail, a key of ``EMAIL_KINDS``.
+    :type kind: str
+    :param recipient: Recipient address.
+    :type recipient: str
+    :param username: Username shown in the e-mail.
+    :type username: str | None
+    :param host: Base URL of the links in the e-mail.
+    :type host: str | None
+    :param db: Database session.
+    :type db: AsyncSession
+    :param commit: Commit now; pass ``False`` to commit together with the caller's changes.
+    :type commit: bool
+    :return: Outbox entry.
+    :rtype: EmailOutbox
+    """
+    now = datetime.utcnow()
+    entry = EmailOutbox(kind=kind, recipient=recipient, username=username, host=host, attempts=0,
+                        next_attempt_at=now, created_at=now)
+    db.add(entry)
+    if commit:
+        await db.commit()
+    return entry
+
+
+async def claim_batch(limit: int, db: AsyncSession) -> list[EmailOutbox]:
+    """
+    Take due e-mails for sending.
+
+    Claimed entries are leased for ``OUTBOX_LEASE`` seconds, so that other workers skip them and
+    a worker that dies mid-batch leaves them to be retried. On PostgreSQL concurrent workers do
+    not wait on each other's rows (``FOR UPDATE SKIP LOCKED``).
+
+    :param limit: Maximum number of e-mails.
+    :type limit: int
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: Claimed entries in the order they were enqueued.
+    :rtype: list[EmailOutbox]
+    """
+    now = datetime.utcnow()
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.next_attempt_at <= now, EmailOutbox.attempts < settings.outbox_max_attempts)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=settings.outbox_lease))
+        .returning(EmailOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    entries = list((await db.scalars(stmt)).all())
+    await db.commit()
+    return sorted(entries, key=lambda entry: entry.id)
+
+
+async def mark_sent(ids: list[int], db: AsyncSession) -> None:
+    """
+    Remove sent e-mails from the outbox.
+
+    :param ids: Outbox entry IDs.
+    :type ids: list[int]
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: Not return result.
+    """
+    if ids:
+        await db.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(ids)))
+        await db.commit()
+
+
+async def mark_failed(entries: list[EmailOutbox], errors: list[Exception], db: AsyncSession) -> None:
+    """
+    Record failed attempts and schedule the next ones with :func:`backoff`.
+
+    After ``OUTBOX_MAX_ATTEMPTS`` failures an entry is no longer claimed; it stays in the
+    outbox with its last error.
+
+    :param entries: Claimed entries that failed.
+    :type entries: list[EmailOutbox]
+    :param errors: Error of every entry.
+    :type errors: list[Exception]
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: Not return result.
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+    await db.execute(update(EmailOutbox), [
+        {"id": entry.id, "attempts": entry.attempts + 1, "next_attempt_at": now + backoff(entry.attempts + 1),
+         "last_error": str(error)[:1000]}
+        for entry, error in zip(entries, errors)
+    ])
+    await db.commit()
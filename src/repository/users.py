@@ -1,24 +1,42 @@
 from libgravatar import Gravatar
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas import UserModel
+from src.services.cache import user_cache
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
+    """
+    Get user by e-mail, ignoring case: one probe of ``ix_users_email_lower``.
+
+    :param email: User's e-mail.
+    :type email: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: User or None.
+    :rtype: User
+    """
+    stmt = select(User).filter(func.lower(User.email) == email.lower())
+    user = await db.execute(stmt)
+    return user.scalar_one_or_none()
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User | None:
     """
-    Create user.
+    Create user with a single ``INSERT ... RETURNING``, committing whatever else the session holds.
+
+    The unique index on the lower-cased e-mail is the existence check, so two concurrent
+    sign-ups for one address cannot both succeed.
 
     :param body: User body.
     :type body: UserModel
     :param db: Database session.
-    :type db: Session
-    :return: Created user.
-    :rtype: User
+    :type db: AsyncSession
+    :return: Created user, or None if the e-mail is taken; the session is then rolled back.
+    :rtype: User | None
     """
     avatar = None
     try:
@@ -26,44 +44,33 @@ async def create_user(body: UserModel, db: Session) -> User:
         avatar = g.get_image()
     except Exception as e:
         print(e)
-    new_user = User(**body.dict(), avatar=avatar)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    stmt = insert(User).values(**body.model_dump(), avatar=avatar).returning(User)
+    try:
+        new_user = (await db.execute(stmt)).scalar_one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
-    """
-    Update user token
-
-    :param user: Current user.
-    :type user: User
-    :param token: User's token.
-    :type token: str
-    :param db: Database session.
-    :type db: Session
-    :return: Not return result.
-    """
-    user.refresh_token = token
-    db.commit()
-    
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
     Set user's e-mail confirmed.
 
     :param email: User's e-mail
     :type email: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Not return result.
     """
 
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
-async def update_avatar(email, url: str, db: Session) -> User:
+async def update_avatar(email, url: str, db: AsyncSession) -> User:
     """
     Update user's avatar
 
@@ -72,12 +79,13 @@ async def update_avatar(email, url: str, db: Session) -> User:
     :param url: User avatar link.
     :type url: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Updated user.
     :rtype: User
 
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
     return user
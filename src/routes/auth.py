@@ -1,52 +1,59 @@
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Depends, status, Security, Request
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf import messages
 from src.database.connect import get_db
 from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from src.repository import users as repository_users
+from src.repository import outbox as repository_outbox
 from src.services.auth import auth_service
-from src.services.email import send_email
+from src.services.outbox import outbox_worker
+from src.services.refresh_tokens import refresh_tokens
 
 router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel, request: Request, db: AsyncSession = Depends(get_db)):
     """
     User sign-up method
 
+    The confirmation e-mail is added to the outbox in the same transaction as the user, and an
+    e-mail already taken in any case is reported by the insert itself.
+
     :param body: New user data.
     :type body: UserModel
-    :param background_tasks: Background tasks.
-    :type background_tasks: BackgroundTasks
     :param request: Request.
     :type request: Request
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Sign-up result
     :rtype: dict
     """
-    exist_user = await repository_users.get_user_by_email(body.email, db)
-    if exist_user:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
+    await repository_outbox.enqueue_email("confirm_email", body.email, body.username, str(request.base_url), db,
+                                          commit=False)
     new_user = await repository_users.create_user(body, db)
-    background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
+    if new_user is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=messages.USER_EXISTS_ERROR)
+    outbox_worker.wake()
     return {"user": new_user, "detail": "User successfully created. Check your email for confirmation."}
 
 
 @router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
     Login user
 
+    Starts a refresh token family in Redis; the ``users`` row is only read.
+
     :param body: Login data
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Tokens.
     :rtype: dict
     """
@@ -55,46 +62,53 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
     access_token = await auth_service.create_access_token(data={"sub": user.email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    refresh_token = await refresh_tokens.issue(user.email)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_db)):
     """
     Refresh user's token
 
+    The refresh token is rotated within its family in Redis, without touching the database. A
+    refresh token reused after rotation revokes its whole family. Tokens issued before families
+    existed are checked against ``users.refresh_token`` once and swapped for a new family.
+
     :param credentials: Credentials
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Tokens.
     :rtype: dict
     """
     token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    claims = auth_service.decode_refresh_claims(token)
+    email = claims["sub"]
+    if "fam" in claims:
+        refresh_token = await refresh_tokens.rotate(claims)
+    else:
+        user = await repository_users.get_user_by_email(email, db)
+        refresh_token = None
+        if user is not None and user.refresh_token == token:
+            refresh_token = await refresh_tokens.adopt(token, claims)
+    if refresh_token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_REFRESH_TOKEN_ERROR)
 
     access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     """
     Confirm user's e-mail
 
     :param token: Confirm token.
     :type token: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Confirm result.
     :rtype: dict
     """
@@ -108,12 +122,12 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
     return {"message": "Email confirmed"}
 
 @router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     user = await repository_users.get_user_by_email(body.email, db)
 
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, request.base_url)
+        await repository_outbox.enqueue_email("confirm_email", user.email, user.username, str(request.base_url), db)
+        outbox_worker.wake()
     return {"message": "Check your email for confirmation."}
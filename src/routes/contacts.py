@@ -1,115 +1,309 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-import redis.asyncio as redis
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
-from sqlalchemy.orm import Session
-from fastapi_limiter.depends import RateLimiter
-from fastapi_limiter import FastAPILimiter
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf import messages
 from src.database.connect import get_db
-from src.database.models import User
+from src.database.models import User, phone_e164
 from src.services.auth import auth_service
-from src.schemas import ContactSchema, ContactBirthday
+from src.schemas import (
+    ContactSchema, ContactBirthday, ContactImportResult, ContactBatchSchema, ContactBatchResult, ContactMergeSchema,
+    DuplicateGroup, DuplicateGroups,
+)
 from src.repository import contacts as repository_contacts
+from src.services.pagination import encode_cursor, decode_cursor
+from src.services import contacts_import, contacts_export, duplicates
+from src.services.etag import make_etag, parse_if_none_match, not_modified, set_etag
+from src.services.cache import response_cache
+from src.services.rate_limit import rate_limiter
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 
-@router.on_event("startup")
-async def startup():
+contacts_adapter = TypeAdapter(List[ContactSchema])
+birthdays_adapter = TypeAdapter(List[ContactBirthday])
+
+
+def json_response(adapter: TypeAdapter, items: list, headers: dict | None = None) -> Response:
     """
-    Start up event
+    Render items as FastAPI would for the route's ``response_model``.
 
-    :return: Nothing
+    :param adapter: Adapter of the response model.
+    :type adapter: TypeAdapter
+    :param items: ORM objects or models.
+    :type items: list
+    :param headers: Extra headers.
+    :type headers: dict | None
+    :return: JSON response.
+    :rtype: Response
     """
-    r = await redis.Redis(host='localhost', port=6379, db=0, encoding='utf-8', decode_responses=True)
-    await FastAPILimiter.init(r)
+    body = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
-@router.get("/", response_model=List[ContactSchema], dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def read_contacts(limit: int = Query(10, le=1000), offset: int = 0, db: Session = Depends(get_db),
-                        current_user: User = Depends(auth_service.get_current_user)) -> List[ContactSchema]:
+@router.get("/", response_model=List[ContactSchema], dependencies=[Depends(rate_limiter.limit("read_contacts", times=20, seconds=60))])
+async def read_contacts(limit: int = Query(10, ge=1, le=1000), offset: int = Query(0, ge=0),
+                        cursor: Optional[str] = None, if_none_match: Optional[str] = Header(None),
+                        db: AsyncSession = Depends(get_db),
+                        current_user: User = Depends(auth_service.get_current_user)) -> Response:
     """
     Read contacts method
 
+    Contacts are ordered by ID. When there are more contacts the ``X-Next-Cursor`` header holds
+    a cursor for the next page; pass it back as ``cursor`` instead of ``offset``.
+
+    The ``ETag`` is the version of the user's contacts. If it matches ``If-None-Match`` the answer
+    is an empty 304, checked before the contacts table is read. Full responses go through the
+    response cache.
+
     :param limit: The maximum number of notes to return.
     :type limit: int
-    :param offset: Offset.
+    :param offset: Offset. Ignored when cursor is given.
     :type offset: int
+    :param cursor: Opaque cursor from the ``X-Next-Cursor`` header of the previous page.
+    :type cursor: str
+    :param if_none_match: Entity tags the client already has.
+    :type if_none_match: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return: Contacts.
-    :rtype: List[Contact]
+    :rtype: Response
     """
-    contacts = await repository_contacts.get_contacts(limit, offset, db, current_user)
-    return contacts
+    # Read the version first: a write landing in between then only costs the client a full reply.
+    version = await repository_contacts.get_contacts_version(db, current_user)
+    etag = make_etag(version)
+    tags = parse_if_none_match(if_none_match)
+    if etag in tags or "*" in tags:
+        return not_modified(etag)
+    after_id = decode_cursor(cursor, int)[0] if cursor is not None else None
 
+    async def render() -> Response:
+        if after_id is not None:
+            contacts = await repository_contacts.get_contacts_after(limit + 1, after_id, db, current_user)
+        else:
+            contacts = await repository_contacts.get_contacts(limit + 1, offset, db, current_user)
+        headers = {}
+        if len(contacts) > limit:
+            contacts = contacts[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(contacts[-1].id)
+        return json_response(contacts_adapter, contacts, headers)
 
-@router.get("/search", response_model=List[ContactSchema], dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def search_contacts(query: str = Query(default='', min_length=1), db: Session = Depends(get_db),
-                          current_user: User = Depends(auth_service.get_current_user)):
+    # The version is part of the key so that a cached body never goes out with a newer ETag.
+    params = {"limit": limit, "offset": offset, "after_id": after_id, "version": version}
+    response = await response_cache.get_or_render("read_contacts", current_user.id, params, render)
+    set_etag(response, etag)
+    return response
+
+
+@router.get("/search", response_model=List[ContactSchema], dependencies=[Depends(rate_limiter.limit("search_contacts", times=20, seconds=60))])
+async def search_contacts(query: str = Query(default='', min_length=1),
+                          limit: int = Query(10, ge=1, le=1000), cursor: Optional[str] = None,
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)) -> Response:
     """
     Search contact by some text
 
+    Contacts are ordered by relevance. When there are more matches the ``X-Next-Cursor`` header
+    holds a cursor for the next page. Responses go through the response cache.
+
     :param query: String for search
     :type query: str
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param cursor: Opaque cursor from the ``X-Next-Cursor`` header of the previous page.
+    :type cursor: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return: List founded contacts.
-    :rtype: List[Contact]
+    :rtype: Response
     """
-    contacts = await repository_contacts.search_contacts(query, db, current_user)
-    return contacts
+    after = decode_cursor(cursor, (int, float), int) if cursor is not None else None
+
+    async def render() -> Response:
+        rows = await repository_contacts.search_contacts(query, limit + 1, after, db, current_user)
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(rows[-1].rank, rows[-1][0].id)
+        return json_response(contacts_adapter, [row[0] for row in rows], headers)
 
+    params = {"query": query, "limit": limit, "after": after}
+    return await response_cache.get_or_render("search_contacts", current_user.id, params, render)
 
-@router.get("/birthday/", response_model=List[ContactBirthday], dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def get_contacts_birthday(db: Session = Depends(get_db),
-                                current_user: User = Depends(auth_service.get_current_user)):
+
+@router.get("/birthday/", response_model=List[ContactBirthday], dependencies=[Depends(rate_limiter.limit("get_contacts_birthday", times=20, seconds=60))])
+async def get_contacts_birthday(days: int = Query(7, ge=0, le=366), db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(auth_service.get_current_user)) -> Response:
     """
-    Get list of contacts who have a birthday in the next 7 days.
+    Get list of contacts who have a birthday in the next days (7 by default).
+
+    Responses go through the response cache.
 
+    :param days: Size of the window in days.
+    :type days: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return: List founded contacts.
-    :rtype: List[Contact]
+    :rtype: Response
+    """
+    async def render() -> Response:
+        birthdays = await repository_contacts.get_birthdays_week(db, current_user, days)
+        return json_response(birthdays_adapter, birthdays)
+
+    # The window moves at midnight, so the date is part of the key.
+    params = {"days": days, "today": date.today().isoformat()}
+    return await response_cache.get_or_render("get_contacts_birthday", current_user.id, params, render)
+
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(rate_limiter.limit("export_contacts", times=5, seconds=60))])
+async def export_contacts(format: str = Query("ndjson", pattern="^(csv|ndjson)$"), db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)) -> StreamingResponse:
+    """
+    Export all contacts as NDJSON (default) or CSV
+
+    The body is streamed from a server-side cursor, so it starts right away and the size of the
+    address book is not limited by memory. Contacts are ordered by ID.
+
+    :param format: ``ndjson`` or ``csv``.
+    :type format: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current user.
+    :type current_user: User
+    :return: Streaming response with the contacts.
+    :rtype: StreamingResponse
+    """
+    return StreamingResponse(
+        contacts_export.export_contacts(format, db, current_user),
+        media_type=contacts_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+
+@router.get("/duplicates", response_model=DuplicateGroups, dependencies=[Depends(rate_limiter.limit("find_duplicates", times=5, seconds=60))])
+async def find_duplicates(limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)) -> Response:
+    """
+    Find groups of likely duplicate contacts
+
+    Contacts are grouped when they share a normalized e-mail or phone number, or when their
+    names sound alike and no e-mail, phone or birthday contradicts it; ``reasons`` says which.
+    Each contact is looked at once, not compared with every other one. Groups are ordered by
+    their first contact ID. Responses go through the response cache.
+
+    :param limit: The maximum number of groups to return.
+    :type limit: int
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current user.
+    :type current_user: User
+    :return: Duplicate groups.
+    :rtype: Response
+    """
+    async def render() -> Response:
+        groups, skipped = await duplicates.find_duplicates(db, current_user)
+        shown = groups[:limit]
+        contacts = await repository_contacts.get_contacts_by_ids(
+            [contact_id for ids, _ in shown for contact_id in ids], db, current_user
+        )
+        by_id = {contact.id: contact for contact in contacts}
+        result = DuplicateGroups(
+            groups=[
+                DuplicateGroup(reasons=reasons, contacts=[
+                    ContactSchema.model_validate(by_id[contact_id]) for contact_id in ids if contact_id in by_id
+                ])
+                for ids, reasons in shown
+            ],
+            total_groups=len(groups),
+            skipped_blocks=skipped,
+        )
+        return Response(content=result.model_dump_json(), media_type="application/json")
+
+    return await response_cache.get_or_render("find_duplicates", current_user.id, {"limit": limit}, render)
+
+
+@router.get("/by-phone/{number}", response_model=List[ContactSchema], dependencies=[Depends(rate_limiter.limit("get_contacts_by_phone", times=60, seconds=60))])
+async def get_contacts_by_phone(number: str = Path(..., max_length=32), db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(auth_service.get_current_user)) -> List[ContactSchema]:
+    """
+    Get contacts by phone number
+
+    The number may be written in any form, such as ``+380501234567`` or ``050 123-45-67``; it is
+    normalized to E.164 like the stored numbers and looked up in the ``(user_id, phone_e164)``
+    index. Several contacts may share a number.
+
+    :param number: Phone number.
+    :type number: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current user.
+    :type current_user: User
+    :return: Contacts with the number, ordered by ID.
+    :rtype: List[ContactSchema]
     """
-    birthdays = await repository_contacts.get_birthdays_week(db, current_user)
-    return birthdays
+    phone = phone_e164(number)
+    if phone is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=messages.INVALID_PHONE_ERROR)
+    return await repository_contacts.get_contacts_by_phone(phone, db, current_user)
 
 
-@router.get("/{contact_id}", response_model=ContactSchema, dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def get_contact(contact_id: int = Path(..., ge=0), db: Session = Depends(get_db),
+@router.get("/{contact_id}", response_model=ContactSchema, dependencies=[Depends(rate_limiter.limit("get_contact", times=20, seconds=60))])
+async def get_contact(response: Response, contact_id: int = Path(..., ge=0),
+                      if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db),
                       current_user: User = Depends(auth_service.get_current_user)) -> ContactSchema:
     """
     Get contact by ID
 
+    The ``ETag`` is ``"<contacts version>.<contact ID>.<contact version>"``. A tag from
+    ``If-None-Match`` for this contact with the current contacts version gets a 304 without
+    reading the contacts table; otherwise the contact is read and a tag for it with its current
+    version also gets a 304.
+
+    :param response: Response.
+    :type response: Response
     :param contact_id: Contact ID.
     :type contact_id: int
+    :param if_none_match: Entity tags the client already has.
+    :type if_none_match: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return:
     """
+    version = await repository_contacts.get_contacts_version(db, current_user)
+    tags = parse_if_none_match(if_none_match)
+    for tag in tags:
+        if tag.startswith(f'"{version}.{contact_id}.'):
+            return not_modified(tag)
     contact = await repository_contacts.get_contact(contact_id, db, current_user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    etag = make_etag(version, contact.id, contact.version)
+    if "*" in tags or any(tag.endswith(f'.{contact.id}.{contact.version}"') for tag in tags):
+        return not_modified(etag)
+    set_etag(response, etag)
     return contact
 
 
-@router.post("/", response_model=ContactSchema, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def create_contact(body: ContactSchema, db: Session = Depends(get_db),
+@router.post("/", response_model=ContactSchema, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limiter.limit("create_contact", times=20, seconds=60))])
+async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)) -> ContactSchema:
     """
     Create new contact
 
     :param body: Contact body
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return: Contact.
@@ -118,8 +312,85 @@ async def create_contact(body: ContactSchema, db: Session = Depends(get_db),
     return contact
 
 
-@router.put("/{contact_id}", response_model=ContactSchema, dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def update_contact(body: ContactSchema, contact_id: int = Path(..., ge=0), db: Session = Depends(get_db),
+@router.post("/import", response_model=ContactImportResult, dependencies=[Depends(rate_limiter.limit("import_contacts", times=5, seconds=60))])
+async def import_contacts(request: Request, format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)) -> ContactImportResult:
+    """
+    Import contacts from a CSV or NDJSON request body
+
+    The body is read as a stream and inserted in batches, so the file size is not limited by memory.
+    CSV needs a header row with the contact field names. The format is taken from the ``format``
+    parameter or else from the ``Content-Type`` header (``text/csv`` or ``application/x-ndjson``).
+
+    :param request: Request.
+    :type request: Request
+    :param format: ``csv`` or ``ndjson``.
+    :type format: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current user.
+    :type current_user: User
+    :return: Number of imported and failed rows with per-row errors.
+    :rtype: ContactImportResult
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        format = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}.get(content_type)
+    if format is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Send text/csv or application/x-ndjson")
+    return await contacts_import.import_contacts(request.stream(), format, db, current_user)
+
+
+@router.post("/batch", response_model=ContactBatchResult, dependencies=[Depends(rate_limiter.limit("batch_contacts", times=20, seconds=60))])
+async def batch_contacts(body: ContactBatchSchema, db: AsyncSession = Depends(get_db),
+                         current_user: User = Depends(auth_service.get_current_user)) -> ContactBatchResult:
+    """
+    Update and delete many contacts at once
+
+    All items are applied in one transaction. Every item gets a result: ``updated``, ``deleted``,
+    ``not_found``, or ``conflict`` when the new e-mail belongs to another contact.
+
+    :param body: Contacts to update (matched by ``id``) and IDs to delete.
+    :type body: ContactBatchSchema
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current user.
+    :type current_user: User
+    :return: Per-item results, updates first.
+    :rtype: ContactBatchResult
+    """
+    results = await repository_contacts.batch_contacts(body.update, body.delete, db, current_user)
+    return ContactBatchResult(results=results)
+
+
+@router.post("/merge", response_model=ContactSchema, dependencies=[Depends(rate_limiter.limit("merge_contacts", times=20, seconds=60))])
+async def merge_contacts(body: ContactMergeSchema, db: AsyncSession = Depends(get_db),
+                         current_user: User = Depends(auth_service.get_current_user)) -> ContactSchema:
+    """
+    Merge duplicates into a contact
+
+    The contact keeps its fields and gets the empty ones from the duplicates, which are deleted,
+    all in one transaction.
+
+    :param body: ID of the contact to keep and IDs of its duplicates.
+    :type body: ContactMergeSchema
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current user.
+    :type current_user: User
+    :return: Merged contact.
+    :rtype: ContactSchema
+    """
+    contact = await repository_contacts.merge_contacts(body.id, body.duplicates, db, current_user)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return contact
+
+
+@router.put("/{contact_id}", response_model=ContactSchema, dependencies=[Depends(rate_limiter.limit("update_contact", times=20, seconds=60))])
+async def update_contact(body: ContactSchema, contact_id: int = Path(..., ge=0), db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)) -> ContactSchema:
     """
     Update contact data
@@ -128,7 +399,7 @@ async def update_contact(body: ContactSchema, contact_id: int = Path(..., ge=0),
     :param contact_id: Contact ID.
     :type contact_id: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return: Contact.
@@ -139,8 +410,8 @@ async def update_contact(body: ContactSchema, contact_id: int = Path(..., ge=0),
     return contact
 
 
-@router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(RateLimiter(times=20, seconds=60))])
-async def remove_contact(contact_id: int = Path(..., ge=0), db: Session = Depends(get_db),
+@router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(rate_limiter.limit("remove_contact", times=20, seconds=60))])
+async def remove_contact(contact_id: int = Path(..., ge=0), db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     """
     Delete contact by ID
@@ -148,7 +419,7 @@ async def remove_contact(contact_id: int = Path(..., ge=0), db: Session = Depend
     :param contact_id: Contact ID.
     :type contact_id: int
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: Current user.
     :type current_user: User
     :return: Contact.
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from src.services.auth import auth_service
+from src.services.metrics import metrics
+
+# Gated like the stats router; Prometheus sends the token with ``authorization: {credentials: ...}``.
+router = APIRouter(tags=["stats"], dependencies=[Depends(auth_service.verify_internal_token)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def read_metrics():
+    """
+    Request latency histograms, status code counters and in-flight gauge by route
+
+    :return: Metrics in the Prometheus text format.
+    :rtype: PlainTextResponse
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends
+
+from src.database.connect import engine
+from src.database.pool import pool_stats
+from src.database.redis_pool import redis_pool
+from src.services.cache import user_cache, response_cache, token_cache
+from src.services.outbox import outbox_worker
+from src.services.auth import auth_service
+from src.services.rate_limit import rate_limiter
+from src.services.refresh_tokens import refresh_tokens
+
+# Internal diagnostics: only with the INTERNAL_TOKEN bearer token, and not served at all without one.
+router = APIRouter(prefix='/stats', tags=["stats"], dependencies=[Depends(auth_service.verify_internal_token)])
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Hit/miss counters of the user cache tiers, of the verified-token cache and of the response cache
+
+    :return: Counters of the local and Redis tiers, of tokens, and counters with hit ratio by cached route.
+    :rtype: dict
+    """
+    return {"user": {**user_cache.stats, "local_size": len(user_cache.local)}, "tokens": token_cache.report(),
+            "responses": response_cache.report()}
+
+
+@router.get("/pool")
+async def pool_usage():
+    """
+    Database connection pool settings, usage and checkout waits
+
+    Compare ``peak_checked_out`` and the wait histogram with the number of workers to size
+    ``DB_POOL_SIZE`` and ``DB_MAX_OVERFLOW``.
+
+    :return: Pool stats.
+    :rtype: dict
+    """
+    return pool_stats.report(engine)
+
+
+@router.get("/redis")
+async def redis_pool_usage():
+    """
+    Shared Redis connection pool settings, usage and checkout waits
+
+    Timeouts mean ``REDIS_POOL_SIZE`` connections were not enough for the concurrent commands.
+
+    :return: Pool stats.
+    :rtype: dict
+    """
+    return redis_pool.report()
+
+
+@router.get("/outbox")
+async def outbox_stats():
+    """
+    Counters of the e-mail outbox worker of this process
+
+    :return: Batches, sent and failed e-mails, and SMTP sessions opened.
+    :rtype: dict
+    """
+    return {**outbox_worker.stats, "smtp_sessions": outbox_worker.sender.sessions}
+
+
+@router.get("/rate_limit")
+async def rate_limit_stats():
+    """
+    Counters of the rate limiter of this process
+
+    :return: Allowed and rejected requests, reconciliations with Redis and their failures, and live buckets.
+    :rtype: dict
+    """
+    return rate_limiter.report()
+
+
+@router.get("/refresh_tokens")
+async def refresh_token_stats():
+    """
+    Counters of the refresh token families of this process
+
+    :return: Families started, tokens rotated, legacy tokens adopted, reused tokens and unknown families.
+    :rtype: dict
+    """
+    return refresh_tokens.stats
@@ -1,14 +1,9 @@
 from fastapi import APIRouter, Depends, status, UploadFile, File
-from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
 
-from src.database.connect import get_db
 from src.database.models import User
-from src.repository import users as repository_users
 from src.services.auth import auth_service
-from src.conf.config import settings
-from src.schemas import UserDb
+from src.services.avatars import avatar_pipeline
+from src.schemas import AvatarJob, UserDb
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -24,27 +19,18 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
     return current_user
 
 
-@router.patch('/avatar', response_model=UserDb)
-async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+@router.patch('/avatar', response_model=AvatarJob, status_code=status.HTTP_202_ACCEPTED)
+async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user)):
     """
     Update user's avatar
 
+    Returns once the upload is stored and checked to be an image. It is resized and uploaded
+    in the background; ``avatar`` is the URL the user's avatar will have when that is done.
+
     :param file: Avatar file data
     :param current_user: Current user
-    :param db: Database session.
-    :type db: Session
-    :return: User
+    :return: Accepted job.
+    :rtype: dict
     """
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
-    r = cloudinary.uploader.upload(file.file, public_id=f'NotesApp/{current_user.username}', overwrite=True)
-    src_url = cloudinary.CloudinaryImage(f'NotesApp/{current_user.username}')\
-                        .build_url(width=250, height=250, crop='fill', version=r.get('version'))
-    user = await repository_users.update_avatar(current_user.email, src_url, db)
-    return user
+    digest = await avatar_pipeline.accept(file, current_user.email)
+    return {"id": digest, "status": "accepted", "avatar": avatar_pipeline.url(digest)}
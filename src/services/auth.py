@@ -1,33 +1,30 @@
+import secrets
 from typing import Optional
-import pickle
 
 from jose import JWTError, jwt
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Header
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-import redis
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.connect import get_db
 from src.repository import users as repository_users
 from src.conf.config import settings
+from src.services.hashing import password_hasher
+from src.services.cache import user_cache, token_cache
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    
-    r = redis.Redis(host='localhost', port=6379, db=0)
 
     # Перевіряє, чи відповідає простий текстовий пароль хешованому паролю.
-    def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password):
+        return await password_hasher.verify(plain_password, hashed_password)
 
     # Хешує пароль за допомогою алгоритму bcrypt.
-    def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str):
+        return await password_hasher.hash(password)
 
     # Створює веб-токен JWT з областю дії scope
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -51,47 +48,64 @@ class Auth:
         encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_refresh_token
 
-    # Метод декодує токен оновлення refresh_token
-    async def decode_refresh_token(self, refresh_token: str):
+    # Метод декодує токен оновлення refresh_token і повертає його claims
+    def decode_refresh_claims(self, refresh_token: str) -> dict:
         try:
             payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
+        if payload.get('scope') != 'refresh_token' or payload.get('sub') is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
+        return payload
+
+    # Метод декодує токен оновлення refresh_token
+    async def decode_refresh_token(self, refresh_token: str):
+        return self.decode_refresh_claims(refresh_token)['sub']
+
+    # Перевіряє токен доступу access_token; перевірені claims кешуються до закінчення строку дії токена.
+    def access_claims(self, token: str) -> dict | None:
+        claims = token_cache.get(token)
+        if claims is None:
+            try:
+                # Decode JWT
+                claims = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            except JWTError:
+                return None
+            token_cache.set(token, claims)
+        if claims.get('scope') != 'access_token' or claims.get("sub") is None:
+            return None
+        return claims
 
     # Aвторизує користувача, розшифровуючи токен доступу access_token та, перевіряючи, чи існує користувач у базі даних.
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError as e:
+        claims = self.access_claims(token)
+        if claims is None:
             raise credentials_exception
-        user = self.r.get(f"user:{email}")
+        email = claims["sub"]
+        user = await user_cache.get(email)
         if user is None:
             user = await repository_users.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
-            self.r.set(f"user:{email}", pickle.dumps(user))
-            self.r.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
+            user = await user_cache.set(user)
         return user
 
+    # Пускає до внутрішніх маршрутів (статистика, метрики) лише з заголовком "Authorization: Bearer <INTERNAL_TOKEN>";
+    # без INTERNAL_TOKEN ці маршрути вимкнені й відповідають 404.
+    async def verify_internal_token(self, authorization: Optional[str] = Header(None)):
+        if not settings.internal_token:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.internal_token.encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials",
+                                headers={"WWW-Authenticate": "Bearer"})
+
     # створюємо токен JWT для верифікації електронної пошти
     def create_email_token(self, data: dict):
         to_encode = data.copy()
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cloudinary
+import cloudinary.uploader
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.conf import messages
+from src.conf.config import settings
+from src.database.connect import SessionLocal
+from src.repository import users as repository_users
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Larger images are refused before decoding: a small file can expand to gigabytes of pixels.
+MAX_PIXELS = 40_000_000
+
+
+def probe_image(path: str) -> tuple[str, int, int]:
+    """
+    Read the format and dimensions of an image from its header, without decoding it.
+
+    :param path: Image file.
+    :type path: str
+    :return: Format, width and height.
+    :rtype: tuple[str, int, int]
+    :raises HTTPException: 400 if the file is not an image Pillow can read, or is too large.
+    """
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            image_format = image.format
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_IMAGE_ERROR)
+    if width * height > MAX_PIXELS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_IMAGE_ERROR)
+    return image_format, width, height
+
+
+# Module level so that it can run in a worker pool.
+def render_avatars(path: str, sizes: tuple[int, ...]) -> dict[int, bytes]:
+    """
+    Crop an image to a centred square and scale it to every size, as JPEG.
+
+    JPEGs are decoded at the smallest scale that still covers the largest size.
+
+    :param path: Image file.
+    :type path: str
+    :param sizes: Side lengths in pixels.
+    :type sizes: tuple[int, ...]
+    :return: JPEG bytes by size.
+    :rtype: dict[int, bytes]
+    """
+    largest = max(sizes)
+    with Image.open(path) as image:
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image = ImageOps.fit(image, (largest, largest), Image.Resampling.LANCZOS)
+    avatars = {}
+    for size in sizes:
+        resized = image if size == largest else image.resize((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, "JPEG", quality=85, optimize=True)
+        avatars[size] = buffer.getvalue()
+    return avatars
+
+
+def _append(file, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    file.write(chunk)
+
+
+def avatar_key(digest: str, size: int) -> str:
+    return f"{digest}_{size}.jpg"
+
+
+class LocalAvatarStorage:
+    """
+    Avatars as files in ``root``, served from ``base_url``.
+
+    :param root: Directory of the files.
+    :type root: str | Path
+    :param base_url: URL prefix of the files.
+    :type base_url: str
+    """
+
+    def __init__(self, root: str | Path, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread((self.root / key).exists)
+
+    async def save(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, self.root / key, data)
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        partial.write_bytes(data)
+        partial.replace(path)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class CloudinaryAvatarStorage:
+    """
+    Avatars in Cloudinary under ``folder``. The blocking SDK calls run in threads.
+
+    :param folder: Folder of the avatars.
+    :type folder: str
+    """
+
+    def __init__(self, folder: str = "NotesApp/avatars"):
+        self.folder = folder
+        cloudinary.config(
+            cloud_name=settings.cloudinary_name,
+            api_key=settings.cloudinary_api_key,
+            api_secret=settings.cloudinary_api_secret,
+            secure=True
+        )
+
+    def public_id(self, key: str) -> str:
+        return f"{self.folder}/{key.rsplit('.', 1)[0]}"
+
+    async def exists(self, key: str) -> bool:
+        # Looking the resource up would spend the hourly Admin API quota on every upload; saving
+        # with ``overwrite=False`` leaves content that is already there as it is.
+        return False
+
+    async def save(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(cloudinary.uploader.upload, data, public_id=self.public_id(key), overwrite=False,
+                                format="jpg")
+
+    def url(self, key: str) -> str:
+        return cloudinary.CloudinaryImage(self.public_id(key)).build_url(format="jpg")
+
+
+def storage_from_settings() -> LocalAvatarStorage | CloudinaryAvatarStorage:
+    """
+    Storage backend selected by ``AVATAR_STORAGE``: ``cloudinary`` or ``local``.
+
+    :return: Storage backend.
+    :rtype: LocalAvatarStorage | CloudinaryAvatarStorage
+    """
+    if settings.avatar_storage == "local":
+        return LocalAvatarStorage(settings.avatar_local_dir, settings.avatar_local_url)
+    if settings.avatar_storage == "cloudinary":
+        return CloudinaryAvatarStorage()
+    raise ValueError(f"Unknown avatar storage: {settings.avatar_storage}")
+
+
+class AvatarPipeline:
+    """
+    Accepts avatar uploads and processes them in the background.
+
+    An upload is streamed to a temporary file while its SHA-256 is computed, checked to be an
+    image and handed to a background job; the request does not wait for the job. The job
+    resizes the image to every size in a worker pool, saves the results to the storage under
+    keys derived from the hash and points the user's avatar at the first size. Content being
+    processed for another upload, or already in a storage that can tell cheaply, is not resized
+    or saved again.
+
+    At most ``max_pending`` uploads are spooled or waiting for their job at once, each holding
+    a temporary file; more are rejected with 503 instead of filling the disk.
+
+    :param storage: Storage backend, the one of :func:`storage_from_settings` when ``None``.
+    :type storage: LocalAvatarStorage | CloudinaryAvatarStorage | None
+    :param session_factory: Factory of database sessions.
+    :type session_factory: async_sessionmaker[AsyncSession]
+    :param sizes: Side lengths in pixels; the first one is the user's avatar.
+    :type sizes: tuple[int, ...]
+    :param workers: Size of the resizing pool.
+    :type workers: int
+    :param max_bytes: Largest accepted upload.
+    :type max_bytes: int
+    :param max_pending: The most uploads being spooled or processed at once.
+    :type max_pending: int
+    """
+
+    def __init__(self, storage: LocalAvatarStorage | CloudinaryAvatarStorage | None,
+                 session_factory: async_sessionmaker[AsyncSession], sizes: tuple[int, ...], workers: int,
+                 max_bytes: int, max_pending: int = 32):
+        self._storage = storage
+        self.session_factory = session_factory
+        self.sizes = sizes
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self.rendering: dict[str, asyncio.Task] = {}
+        # Jobs are referenced until they finish: the event loop only keeps weak references to tasks.
+        self.jobs: set[asyncio.Task] = set()
+        self.stats = {"accepted": 0, "rendered": 0, "deduplicated": 0, "failed": 0, "rejected": 0}
+
+    @property
+    def storage(self) -> LocalAvatarStorage | CloudinaryAvatarStorage:
+        if self._storage is None:
+            self._storage = storage_from_settings()
+        return self._storage
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="avatar")
+        return self._executor
+
+    def url(self, digest: str) -> str:
+        return self.storage.url(avatar_key(digest, self.sizes[0]))
+
+    async def spool(self, file: UploadFile) -> tuple[str, str]:
+        """
+        Copy an upload to a temporary file in chunks, hashing it on the way.
+
+        :param file: Upload.
+        :type file: UploadFile
+        :return: Path of the temporary file and SHA-256 of the content.
+        :rtype: tuple[str, str]
+        :raises HTTPException: 413 if the upload is larger than ``max_bytes``.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, path = tempfile.mkstemp(prefix="avatar-")
+        try:
+            with os.fdopen(fd, "wb") as spooled:
+                while chunk := await file.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                            detail=messages.AVATAR_TOO_LARGE_ERROR)
+                    # Hashing and writing release the GIL, so they overlap with the event loop.
+                    await asyncio.to_thread(_append, spooled, digest, chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path, digest.hexdigest()
+
+    async def accept(self, file: UploadFile, email: str) -> str:
+        """
+        Spool and check an upload, then start its job.
+
+        :param file: Upload.
+        :type file: UploadFile
+        :param email: E-mail of the user whose avatar it is.
+        :type email: str
+        :return: SHA-256 of the content, which identifies the job and the stored avatars.
+        :rtype: str
+        :raises HTTPException: 400 if the upload is not an image, 413 if it is too large, 503 if
+            ``max_pending`` uploads are already pending.
+        """
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.SERVER_BUSY_ERROR,
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            path, digest = await self.spool(file)
+            try:
+                await asyncio.to_thread(probe_image, path)
+            except BaseException:
+                os.unlink(path)
+                raise
+        except BaseException:
+            self.pending -= 1
+            raise
+        self.stats["accepted"] += 1
+        job = asyncio.create_task(self.process(path, digest, email))
+        self.jobs.add(job)
+        job.add_done_callback(self._finished)
+        return digest
+
+    def _finished(self, job: asyncio.Task) -> None:
+        self.jobs.discard(job)
+        self.pending -= 1
+
+    async def process(self, path: str, digest: str, email: str) -> None:
+        try:
+            rendering = self.rendering.get(digest)
+            if rendering is None:
+                rendering = self.rendering[digest] = asyncio.create_task(self.store(path, digest))
+                rendering.add_done_callback(lambda _: self.rendering.pop(digest, None))
+            else:
+                self.stats["deduplicated"] += 1
+            await asyncio.shield(rendering)
+            async with self.session_factory() as db:
+                await repository_users.update_avatar(email, self.url(digest), db)
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Avatar %s of %s failed", digest, email)
+        finally:
+            await asyncio.to_thread(os.unlink, path)
+
+    async def store(self, path: str, digest: str) -> None:
+        if await self.storage.exists(avatar_key(digest, self.sizes[0])):
+            self.stats["deduplicated"] += 1
+            return
+        loop = asyncio.get_running_loop()
+        avatars = await loop.run_in_executor(self.executor, render_avatars, path, self.sizes)
+        self.stats["rendered"] += 1
+        # The first size is saved last: once it exists, so do the others.
+        await asyncio.gather(*(self.storage.save(avatar_key(digest, size), avatars[size]) for size in self.sizes[1:]))
+        await self.storage.save(avatar_key(digest, self.sizes[0]), avatars[self.sizes[0]])
+
+    async def drain(self) -> None:
+        """
+        Wait for the running jobs.
+        """
+        while self.jobs:
+            await asyncio.gather(*self.jobs, return_exceptions=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+avatar_pipeline = AvatarPipeline(None, SessionLocal, tuple(int(size) for size in settings.avatar_sizes.split(",")),
+                                 settings.avatar_pool_size, settings.avatar_max_bytes, settings.avatar_max_pending)
@@ -0,0 +1,358 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+import redis.asyncio as redis
+from fastapi import Response
+from redis.exceptions import NoScriptError, RedisError
+
+from src.conf.config import settings
+from src.database.redis_pool import redis_client
+from src.schemas import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Bounded in-process cache with least-recently-used eviction and per-entry expiry.
+
+    :param maxsize: Maximum number of entries.
+    :type maxsize: int
+    :param ttl: Default time to live of an entry in seconds.
+    :type ttl: float
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Two-tier cache of the authenticated user: an in-process LRU in front of Redis.
+
+    Only the fields the routes need are cached, as JSON of :class:`CurrentUser`. The local tier
+    keeps a short TTL because other workers learn about invalidations only through Redis.
+    Redis errors are logged and treated as misses so that an outage degrades to database reads.
+    """
+
+    def __init__(self, client: redis.Redis, maxsize: int, local_ttl: float, ttl: int):
+        self.redis = client
+        self.local = LRUCache(maxsize, local_ttl)
+        self.ttl = ttl
+        self.stats = {"local_hits": 0, "local_misses": 0, "redis_hits": 0, "redis_misses": 0, "redis_errors": 0}
+
+    @staticmethod
+    def key(email: str) -> str:
+        return f"user:{email}"
+
+    async def get(self, email: str) -> CurrentUser | None:
+        """
+        Get cached user.
+
+        :param email: User's e-mail.
+        :type email: str
+        :return: Cached user or None on miss in both tiers.
+        :rtype: CurrentUser | None
+        """
+        user = self.local.get(email)
+        if user is not None:
+            self.stats["local_hits"] += 1
+            return user
+        self.stats["local_misses"] += 1
+        try:
+            data = await self.redis.get(self.key(email))
+        except RedisError as err:
+            self.stats["redis_errors"] += 1
+            logger.warning("User cache read failed: %s", err)
+            return None
+        if data is None:
+            self.stats["redis_misses"] += 1
+            return None
+        self.stats["redis_hits"] += 1
+        user = CurrentUser.model_validate_json(data)
+        self.local.set(email, user)
+        return user
+
+    async def set(self, user) -> CurrentUser:
+        """
+        Put user into both tiers.
+
+        :param user: User loaded from the database.
+        :type user: User
+        :return: Cached representation of the user.
+        :rtype: CurrentUser
+        """
+        cached = CurrentUser.model_validate(user)
+        self.local.set(cached.email, cached)
+        try:
+            await self.redis.set(self.key(cached.email), cached.model_dump_json(), ex=self.ttl)
+        except RedisError as err:
+            self.stats["redis_errors"] += 1
+            logger.warning("User cache write failed: %s", err)
+        return cached
+
+    async def invalidate(self, email: str) -> None:
+        """
+        Drop user from both tiers.
+
+        :param email: User's e-mail.
+        :type email: str
+        """
+        self.local.pop(email)
+        try:
+            await self.redis.delete(self.key(email))
+        except RedisError as err:
+            self.stats["redis_errors"] += 1
+            logger.warning("User cache invalidation failed: %s", err)
+
+
+class TokenCache:
+    """
+    In-process cache of verified JWT claims, so that a token reused by its client is checked
+    once rather than on every request.
+
+    Entries are keyed by the SHA-256 of the token, so the cache holds no usable credentials, and
+    expire at the token's own ``exp``. Only tokens that passed verification are stored; a token
+    that is no longer cached is verified again.
+
+    :param maxsize: Maximum number of tokens.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize: int):
+        self.local = LRUCache(maxsize, 0)
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Get verified claims of a token.
+
+        :param token: Encoded JWT.
+        :type token: str
+        :return: Claims, or None if the token is not cached or has expired.
+        :rtype: dict | None
+        """
+        claims = self.local.get(self.key(token))
+        if claims is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        """
+        Cache verified claims until the token expires.
+
+        :param token: Encoded JWT.
+        :type token: str
+        :param claims: Claims returned by verification; not cached without ``exp``.
+        :type claims: dict
+        """
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl > 0:
+            self.local.set(self.key(token), claims, ttl)
+
+    def report(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                "size": len(self.local)}
+
+
+# KEYS[1] is the generation key, ARGV the entry key around the generation and a new generation.
+LOOKUP_SCRIPT = """
+local generation = redis.call('GET', KEYS[1])
+if not generation then
+    redis.call('SET', KEYS[1], ARGV[3], 'NX')
+    return {}
+end
+return {generation, redis.call('GET', ARGV[1] .. generation .. ARGV[2])}
+"""
+LOOKUP_SHA = hashlib.sha1(LOOKUP_SCRIPT.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Redis cache of rendered JSON responses, keyed by route, user and query parameters.
+
+    Every key embeds the user's generation, a token in Redis that the contact write paths replace
+    after commit. Replacing it is a single ``SET`` however many responses are cached; the orphaned
+    entries are never read again and expire by TTL. The generation is the time of the last write in
+    nanoseconds rather than an ``INCR`` counter, so a generation key lost to eviction cannot come
+    back with a value that old entries were stored under.
+
+    A lookup is one round-trip: :data:`LOOKUP_SCRIPT` reads the generation and the entry stored
+    under it, or creates the generation when there is none.
+
+    Only the routes listed in ``routes`` are cached. Redis errors are logged and treated as misses.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, routes: Iterable[str]):
+        self.redis = client
+        self.ttl = ttl
+        self.routes = set(routes)
+        self.stats = {route: {"hits": 0, "misses": 0, "errors": 0} for route in self.routes}
+
+    @staticmethod
+    def generation_key(user_id: int) -> str:
+        return f"contacts:generation:{user_id}"
+
+    @staticmethod
+    def key_parts(route: str, user_id: int, params: dict) -> tuple[str, str]:
+        query = json.dumps(params, sort_keys=True, default=str)
+        return f"response:{user_id}:", f":{route}:{hashlib.sha256(query.encode()).hexdigest()}"
+
+    @classmethod
+    def key(cls, route: str, user_id: int, generation: bytes, params: dict) -> str:
+        prefix, suffix = cls.key_parts(route, user_id, params)
+        return f"{prefix}{generation.decode()}{suffix}"
+
+    async def lookup(self, user_id: int, prefix: str, suffix: str) -> list[bytes]:
+        """
+        Run :data:`LOOKUP_SCRIPT`, sending its source if Redis does not have it cached yet.
+
+        :param user_id: Owner of the response.
+        :type user_id: int
+        :param prefix: Entry key before the generation.
+        :type prefix: str
+        :param suffix: Entry key after the generation.
+        :type suffix: str
+        :return: Nothing if the generation was missing, otherwise the generation and the entry,
+            the entry missing on a miss.
+        :rtype: list[bytes]
+        """
+        args = (1, self.generation_key(user_id), prefix, suffix, time.time_ns())
+        try:
+            return await self.redis.evalsha(LOOKUP_SHA, *args)
+        except NoScriptError:
+            return await self.redis.eval(LOOKUP_SCRIPT, *args)
+
+    @staticmethod
+    def encode(response: Response) -> bytes:
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+        return json.dumps(headers).encode() + b"\n" + response.body
+
+    @staticmethod
+    def decode(data: bytes) -> Response:
+        headers, body = data.split(b"\n", 1)
+        return Response(content=body, headers=json.loads(headers))
+
+    async def get_or_render(self, route: str, user_id: int, params: dict,
+                            render: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Return the cached response or render, cache and return it.
+
+        :param route: Route name, one of ``routes`` to use the cache.
+        :type route: str
+        :param user_id: Owner of the response.
+        :type user_id: int
+        :param params: Everything besides the user's contacts the response depends on.
+        :type params: dict
+        :param render: Builds the response from the database.
+        :type render: Callable[[], Awaitable[Response]]
+        :return: Response.
+        :rtype: Response
+        """
+        if route not in self.routes:
+            return await render()
+        stats = self.stats[route]
+        prefix, suffix = self.key_parts(route, user_id, params)
+        try:
+            # Read the generation before rendering: a write landing in between then replaces it,
+            # and the response stored under the old one is never served.
+            found = await self.lookup(user_id, prefix, suffix)
+        except RedisError as err:
+            stats["errors"] += 1
+            logger.warning("Response cache read failed: %s", err)
+            return await render()
+        if not found:
+            stats["misses"] += 1
+            return await render()
+        data = found[1] if len(found) > 1 else None
+        if data is not None:
+            stats["hits"] += 1
+            return self.decode(data)
+        stats["misses"] += 1
+        response = await render()
+        try:
+            await self.redis.set(f"{prefix}{found[0].decode()}{suffix}", self.encode(response), ex=self.ttl)
+        except RedisError as err:
+            stats["errors"] += 1
+            logger.warning("Response cache write failed: %s", err)
+        return response
+
+    async def invalidate(self, user_id: int) -> None:
+        """
+        Orphan every cached response of the user by replacing the generation.
+
+        :param user_id: User ID.
+        :type user_id: int
+        """
+        try:
+            await self.redis.set(self.generation_key(user_id), time.time_ns())
+        except RedisError as err:
+            logger.warning("Response cache invalidation failed: %s", err)
+
+    def report(self) -> dict:
+        """
+        Counters and hit ratio of every cached route.
+
+        :return: Counters by route.
+        :rtype: dict
+        """
+        report = {}
+        for route, stats in self.stats.items():
+            lookups = stats["hits"] + stats["misses"]
+            report[route] = {**stats, "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None}
+        return report
+
+
+user_cache = UserCache(
+    redis_client,
+    maxsize=settings.user_cache_size,
+    local_ttl=settings.user_cache_local_ttl,
+    ttl=settings.user_cache_ttl,
+)
+
+response_cache = ResponseCache(
+    redis_client,
+    ttl=settings.response_cache_ttl,
+    routes=[route.strip() for route in settings.response_cache_routes.split(",") if route.strip()],
+)
+
+token_cache = TokenCache(settings.token_cache_size)
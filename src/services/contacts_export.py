@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactSchema
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+FIELDS = list(ContactSchema.model_fields)
+
+
+def encode_csv(rows, header: bool = False) -> bytes:
+    """
+    Render rows as CSV lines.
+
+    :param rows: Column tuples in ``FIELDS`` order.
+    :param header: Whether to start with the header row.
+    :type header: bool
+    :return: Encoded CSV.
+    :rtype: bytes
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(rows) -> bytes:
+    """
+    Render rows as newline-delimited JSON objects.
+
+    :param rows: Column tuples in ``FIELDS`` order.
+    :return: Encoded NDJSON.
+    :rtype: bytes
+    """
+    return "".join(json.dumps(dict(zip(FIELDS, row)), default=str) + "\n" for row in rows).encode()
+
+
+async def export_contacts(fmt: str, db: AsyncSession, user: User) -> AsyncIterator[bytes]:
+    """
+    Stream all user's contacts as CSV or NDJSON.
+
+    Every batch of ``EXPORT_BATCH_SIZE`` rows from the cursor becomes one chunk of the response,
+    so the first bytes go out after the first batch and memory use does not grow with the
+    address book. The body outlives the request handler, so the session is closed here once the
+    stream ends or the client goes away.
+
+    :param fmt: ``csv`` or ``ndjson``.
+    :type fmt: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Response body chunks.
+    :rtype: AsyncIterator[bytes]
+    """
+    header = fmt == "csv"
+    try:
+        async for rows in repository_contacts.stream_contacts(db, user, settings.export_batch_size):
+            yield encode_csv(rows, header) if fmt == "csv" else encode_ndjson(rows)
+            header = False
+        if header:
+            yield encode_csv([], header)
+    finally:
+        await db.close()
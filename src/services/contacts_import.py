@@ -0,0 +1,150 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactImportSchema, ContactImportResult, ImportRowError
+
+contact_adapter = TypeAdapter(ContactImportSchema)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """
+    Split a byte stream into lines, one list of complete lines per received chunk.
+
+    :param chunks: Request body chunks.
+    :return: Lists of lines without line endings.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        if lines:
+            yield [line.rstrip("\r") for line in lines]
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield [tail.rstrip("\r")]
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[dict | str]]:
+    """
+    Parse CSV with a header row into dicts. Quoted fields may span lines.
+
+    :param chunks: Request body chunks.
+    :return: Lists of rows; a row is a dict of fields or an error message.
+    """
+    header = None
+    pending = ""
+    async for lines in iter_lines(chunks):
+        records = []
+        for line in lines:
+            record = pending + line
+            # An odd number of quotes means a quoted field continues on the next line.
+            if record.count('"') % 2:
+                pending = record + "\n"
+                continue
+            pending = ""
+            if record:
+                records.append(record)
+        rows = []
+        for values in csv.reader(records):
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                continue
+            if len(values) != len(header):
+                rows.append(f"Expected {len(header)} fields, got {len(values)}")
+                continue
+            rows.append({name: value or None for name, value in zip(header, values)})
+        if rows:
+            yield rows
+    if pending:
+        yield ["Unterminated quoted field"]
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[dict | str]]:
+    """
+    Parse newline-delimited JSON objects.
+
+    :param chunks: Request body chunks.
+    :return: Lists of rows; a row is a dict of fields or an error message.
+    """
+    async for lines in iter_lines(chunks):
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as err:
+                rows.append(f"Invalid JSON: {err}")
+                continue
+            rows.append(row if isinstance(row, dict) else "Expected a JSON object")
+        if rows:
+            yield rows
+
+
+async def import_contacts(chunks: AsyncIterator[bytes], fmt: str, db: AsyncSession,
+                          user: User) -> ContactImportResult:
+    """
+    Stream contacts from an upload into the database.
+
+    Rows are validated as they arrive and inserted in batches of ``IMPORT_BATCH_SIZE``, each
+    batch in its own transaction, so memory use does not depend on the file size. Only the
+    first ``IMPORT_MAX_ERRORS`` row errors are reported.
+
+    :param chunks: Request body chunks.
+    :param fmt: ``csv`` or ``ndjson``.
+    :type fmt: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Import summary.
+    :rtype: ContactImportResult
+    """
+    result = ContactImportResult()
+    batch, batch_rows = [], []
+    row_number = 0
+
+    def fail(row: int, errors: list[str]):
+        result.failed += 1
+        if len(result.errors) < settings.import_max_errors:
+            result.errors.append(ImportRowError(row=row, errors=errors))
+        else:
+            result.errors_truncated = True
+
+    async def flush():
+        errors = await repository_contacts.create_contacts_bulk(batch, db, user)
+        result.imported += len(batch) - len(errors)
+        for index, message in sorted(errors.items()):
+            fail(batch_rows[index], [message])
+        batch.clear()
+        batch_rows.clear()
+
+    reader = iter_csv if fmt == "csv" else iter_ndjson
+    async for rows in reader(chunks):
+        for row in rows:
+            row_number += 1
+            if isinstance(row, str):
+                fail(row_number, [row])
+                continue
+            try:
+                contact = contact_adapter.validate_python(row)
+            except ValidationError as err:
+                fail(row_number, [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in err.errors()])
+                continue
+            batch.append(contact.model_dump())
+            batch_rows.append(row_number)
+            if len(batch) >= settings.import_batch_size:
+                await flush()
+    if batch:
+        await flush()
+    result.errors.sort(key=lambda error: error.row)
+    return result
@@ -0,0 +1,296 @@
+import itertools
+import re
+from functools import lru_cache
+from typing import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6", **dict.fromkeys("hw", ""),
+}
+_DOTLESS_DOMAINS = {"gmail.com", "googlemail.com"}
+_NON_LETTERS = re.compile(r"[\W\d_]")
+_EMPTY = frozenset()
+
+
+def normalize_email(email: str | None) -> str | None:
+    """
+    Blocking key of an e-mail: lower case, without a ``+tag``, and without dots for Gmail.
+
+    :param email: E-mail.
+    :type email: str | None
+    :return: Normalized e-mail, or None if there is none.
+    :rtype: str | None
+    """
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in _DOTLESS_DOMAINS:
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}" if local else None
+
+
+@lru_cache(maxsize=65536)
+def soundex(word: str) -> str:
+    """
+    American Soundex of a word. Words with letters outside of a-z are returned casefolded.
+
+    :param word: Word.
+    :type word: str
+    :return: Phonetic code.
+    :rtype: str
+    """
+    word = _NON_LETTERS.sub("", word).casefold()
+    if not word or not word.isascii():
+        return word
+    code = word[0].upper()
+    last = _SOUNDEX_CODES.get(word[0], "")
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter)
+        if digit is None:
+            # Vowels separate equal codes; h and w do not.
+            last = ""
+        elif digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+            last = digit
+    return code.ljust(4, "0")
+
+
+def name_key(first_name: str | None, last_name: str | None) -> str | None:
+    """
+    Phonetic blocking key of a name: Soundex of the last name and of the first name.
+
+    :param first_name: First name.
+    :type first_name: str | None
+    :param last_name: Last name.
+    :type last_name: str | None
+    :return: Name key, or None if both names are empty.
+    :rtype: str | None
+    """
+    last, first = soundex(last_name or ""), soundex(first_name or "")
+    return f"{last}:{first}" if last or first else None
+
+
+class DuplicateFinder:
+    """
+    Groups likely duplicate contacts by blocking keys instead of comparing every pair.
+
+    Contacts are fed in batches and only their keys are kept. Contacts with the same normalized
+    e-mail or E.164 phone are joined in a union-find. Contacts with the same phonetic name key are only
+    candidates: they are joined when no other field contradicts it, that is neither both e-mails,
+    both phones nor both birthdays are set and different (see :meth:`join_names`).
+
+    A key shared by more than ``max_block`` contacts, such as an office switchboard or a common
+    name with the same birthday, does not identify anybody; it is skipped, which also bounds the
+    pairs compared per contact, so the work grows linearly with the number of contacts.
+
+    :param max_block: The largest number of contacts a blocking key may join.
+    :type max_block: int
+    """
+
+    def __init__(self, max_block: int):
+        self.max_block = max_block
+        self.parent: dict[int, int] = {}
+        self.reasons: dict[int, set[str]] = {}
+        self.emails: dict[str, int] = {}
+        self.phones: dict[str, int] = {}
+        self.blocks: dict[tuple[str, str], list[int]] = {}
+        self.names: dict[str, list[int]] = {}
+        self.fields: dict[int, tuple] = {}
+        self.members: dict[int, list[int]] = {}
+        self.profiles: dict[int, tuple[set, set, set]] = {}
+
+    def find(self, contact_id: int) -> int:
+        # Only joined contacts are in ``parent``; any other contact is its own root.
+        parent = self.parent
+        root = contact_id
+        while root in parent:
+            root = parent[root]
+        while contact_id != root:
+            parent[contact_id], contact_id = root, parent[contact_id]
+        return root
+
+    def union(self, a: int, b: int, reason: str) -> None:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            if b < a:
+                a, b = b, a
+            self.parent[b] = a
+            self.reasons[a] = self.reasons.get(a, set()) | self.reasons.pop(b, set())
+        self.reasons.setdefault(a, set()).add(reason)
+
+    def profile(self, root: int) -> tuple[set, set, set]:
+        """
+        E-mails, phones and birthdays of the group with the given root.
+        """
+        profile = self.profiles.get(root)
+        if profile is not None:
+            return profile
+        if root not in self.members:
+            return tuple({value} if value else _EMPTY for value in self.fields[root])
+        profile = self.profiles[root] = (set(), set(), set())
+        for contact_id in self.members[root]:
+            for values, value in zip(profile, self.fields[contact_id]):
+                if value:
+                    values.add(value)
+        return profile
+
+    def birthday(self, root: int):
+        """
+        The birthday of the group with the given root, or None if it has none or several.
+        """
+        if root in self.members or root in self.profiles:
+            birthdays = self.profile(root)[2]
+            return next(iter(birthdays)) if len(birthdays) == 1 else None
+        return self.fields[root][2]
+
+    @staticmethod
+    def agree(a: tuple[set, set, set], b: tuple[set, set, set]) -> bool:
+        return not any(x and y and x.isdisjoint(y) for x, y in zip(a, b))
+
+    def join_names(self, block: list[int]) -> int:
+        """
+        Join the groups of a name block that agree with each other.
+
+        Contacts already joined by e-mail or phone are compared as one, with the fields of all of
+        them. Groups are linked when they agree pairwise, and a linked set is only joined when
+        every one of them agrees with every other: a contact with empty fields between two that
+        disagree could be either, and joining it would chain two people together.
+
+        Groups with different birthdays disagree, so the block is split by birthday and each
+        birthday is compared with itself and with the groups without one (or with several).
+        Those sets are capped at ``max_block`` rather than the whole name block.
+
+        :param block: IDs of the contacts with the same name key.
+        :type block: list[int]
+        :return: Number of skipped sets.
+        :rtype: int
+        """
+        roots = list(dict.fromkeys(self.find(contact_id) for contact_id in block))
+        if len(roots) < 2:
+            return 0
+        by_birthday: dict = {}
+        for index, root in enumerate(roots):
+            by_birthday.setdefault(self.birthday(root), []).append(index)
+        wild = by_birthday.pop(None, [])
+        skipped = 0
+        if len(wild) > self.max_block:
+            wild, skipped = [], 1
+        pairs = [itertools.combinations(wild, 2)]
+        for same in by_birthday.values():
+            if len(same) + len(wild) > self.max_block:
+                skipped += 1
+            elif len(same) + len(wild) > 1:
+                pairs += [itertools.combinations(same, 2), itertools.product(same, wild)]
+
+        # A union-find of the indices of roots that agree with some other, with the number of
+        # agreeing pairs in each set.
+        parent: dict[int, int] = {}
+        links: dict[int, int] = {}
+
+        def find(index: int) -> int:
+            while index in parent:
+                index = parent[index]
+            return index
+
+        profiles: dict[int, tuple] = {}
+        for i, j in itertools.chain(*pairs):
+            if i not in profiles:
+                profiles[i] = self.profile(roots[i])
+            if j not in profiles:
+                profiles[j] = self.profile(roots[j])
+            if self.agree(profiles[i], profiles[j]):
+                a, b = find(i), find(j)
+                if a != b:
+                    parent[b] = a
+                    links[a] = links.get(a, 0) + links.pop(b, 0)
+                links[a] = links.get(a, 0) + 1
+        linked: dict[int, list[int]] = {}
+        for index in links:
+            linked[index] = [roots[index]]
+        for index in parent:
+            linked[find(index)].append(roots[index])
+        for key, group in linked.items():
+            if links[key] != len(group) * (len(group) - 1) // 2:
+                continue
+            profile = tuple(set().union(*values) for values in zip(*(self.profile(root) for root in group)))
+            for root in group[1:]:
+                self.union(group[0], root, "name")
+            self.profiles[self.find(group[0])] = profile
+        return skipped
+
+    def add(self, rows: Iterable[tuple]) -> None:
+        """
+        Take the blocking keys of a batch of contacts.
+
+        :param rows: ``(id, first_name, last_name, email, phone_e164, birthday)`` tuples.
+        """
+        emails, phones, blocks, names, fields = self.emails, self.phones, self.blocks, self.names, self.fields
+        for contact_id, first_name, last_name, email, phone, birthday in rows:
+            email = normalize_email(email)
+            fields[contact_id] = (email, phone, birthday)
+            # Most e-mails and phones are unique: a block list is only made for the second contact.
+            if email is not None and emails.setdefault(email, contact_id) != contact_id:
+                blocks.setdefault(("email", email), [emails[email]]).append(contact_id)
+            if phone is not None and phones.setdefault(phone, contact_id) != contact_id:
+                blocks.setdefault(("phone", phone), [phones[phone]]).append(contact_id)
+            name = name_key(first_name, last_name)
+            if name is not None:
+                names.setdefault(name, []).append(contact_id)
+
+    def groups(self) -> tuple[list[tuple[list[int], list[str]]], int]:
+        """
+        Join the blocks and return the groups.
+
+        :return: Groups of contact IDs with the matched key kinds, ordered by their first ID,
+            and the number of skipped blocks.
+        :rtype: tuple[list[tuple[list[int], list[str]]], int]
+        """
+        skipped = 0
+        for (kind, _), block in self.blocks.items():
+            if len(block) > self.max_block:
+                skipped += 1
+            else:
+                for contact_id in block[1:]:
+                    self.union(block[0], contact_id, kind)
+        self.members = self.collect()
+        for block in self.names.values():
+            if len(block) > 1:
+                skipped += self.join_names(block)
+        members = self.collect()
+        return [(sorted(members[root]), sorted(self.reasons[root])) for root in sorted(members)], skipped
+
+    def collect(self) -> dict[int, list[int]]:
+        members = {root: [root] for root in self.reasons}
+        for contact_id in list(self.parent):
+            members[self.find(contact_id)].append(contact_id)
+        return members
+
+
+async def find_duplicates(db: AsyncSession, user: User) -> tuple[list[tuple[list[int], list[str]]], int]:
+    """
+    Find groups of likely duplicates among all user's contacts.
+
+    Contacts are read from a server-side cursor in batches of ``DUPLICATES_BATCH_SIZE``; only
+    their blocking keys are kept in memory.
+
+    :param db: Database session.
+    :type db: AsyncSession
+    :param user: Current user.
+    :type user: User
+    :return: Groups of contact IDs with the matched key kinds, and the number of skipped blocks.
+    :rtype: tuple[list[tuple[list[int], list[str]]], int]
+    """
+    finder = DuplicateFinder(settings.duplicates_max_block)
+    async for rows in repository_contacts.stream_contact_keys(db, user, settings.duplicates_batch_size):
+        finder.add(rows)
+    return finder.groups()
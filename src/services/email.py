@@ -1,39 +1,210 @@
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
 from pathlib import Path
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
-from pydantic import EmailStr
+from aiosmtplib import SMTP, SMTPConnectError, SMTPException, SMTPServerDisconnected, SMTPTimeoutError
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 
 from src.services.auth import auth_service
 from src.conf.config import settings
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Example email",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
-
-
-async def send_email(email: EmailStr, username: str, host: str):
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
+logger = logging.getLogger(__name__)
 
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+# Compiled templates are cached by the environment, so every one is parsed once per process.
+templates = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), autoescape=select_autoescape(["html"]))
+
+# Errors after which the rest of a batch is not attempted.
+CONNECTION_ERRORS = (SMTPConnectError, SMTPServerDisconnected, SMTPTimeoutError, OSError)
+
+# Subject and template of every kind of outbox e-mail.
+EMAIL_KINDS = {
+    "confirm_email": ("Confirm your email ", "email_template.html"),
+}
+
+
+def build_message(template: Template, subject: str, recipient: str, context: dict) -> EmailMessage:
+    """
+    Render an HTML e-mail from a compiled template.
+
+    :param template: Compiled template.
+    :type template: Template
+    :param subject: Subject.
+    :type subject: str
+    :param recipient: Recipient address.
+    :type recipient: str
+    :param context: Template variables.
+    :type context: dict
+    :return: Message ready to send.
+    :rtype: EmailMessage
+    """
+    message = EmailMessage()
+    message["From"] = formataddr((settings.mail_from_name, settings.mail_from))
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(template.render(**context), subtype="html")
+    return message
+
+
+def build_messages(kind: str, recipients: list[tuple[str, str | None, str | None]]) -> list[EmailMessage]:
+    """
+    Render a batch of e-mails of one kind, fetching its template once.
+
+    :param kind: Key of :data:`EMAIL_KINDS`.
+    :type kind: str
+    :param recipients: Address, username and host of every recipient.
+    :type recipients: list[tuple[str, str | None, str | None]]
+    :return: Messages in the order of ``recipients``.
+    :rtype: list[EmailMessage]
+    """
+    subject, template_name = EMAIL_KINDS[kind]
+    template = templates.get_template(template_name)
+    return [
+        build_message(template, subject, email, {
+            "host": host, "username": username, "token": auth_service.create_email_token({"sub": email}),
+        })
+        for email, username, host in recipients
+    ]
+
+
+class SMTPSender:
+    """
+    Sends messages over one SMTP session that is kept open between batches.
+
+    The session is reopened when the server drops it and closed after ``idle_timeout`` seconds
+    without use, before servers time it out themselves. Meant for a single task: batches must
+    not be sent concurrently.
+
+    :param idle_timeout: Seconds after which an unused session is not reused.
+    :type idle_timeout: float
+    :param options: ``aiosmtplib.SMTP`` arguments, from the ``MAIL_*`` settings by default.
+    """
+
+    def __init__(self, idle_timeout: float = settings.smtp_idle_timeout, **options):
+        self.idle_timeout = idle_timeout
+        self.options = options or {
+            "hostname": settings.mail_server,
+            "port": settings.mail_port,
+            "username": settings.mail_username if settings.mail_use_credentials else None,
+            "password": settings.mail_password if settings.mail_use_credentials else None,
+            "use_tls": settings.mail_ssl_tls,
+            "start_tls": settings.mail_starttls,
+            "validate_certs": settings.mail_validate_certs,
+        }
+        self.smtp: SMTP | None = None
+        self.last_used = 0.0
+        self.sessions = 0
+
+    async def connect(self) -> SMTP:
+        if self.smtp is not None and self.smtp.is_connected:
+            if time.monotonic() - self.last_used < self.idle_timeout:
+                return self.smtp
+            await self.close()
+        smtp = SMTP(**self.options)
+        await smtp.connect()
+        self.smtp = smtp
+        self.sessions += 1
+        return smtp
+
+    async def close(self) -> None:
+        smtp, self.smtp = self.smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except (SMTPException, OSError):
+                smtp.close()
+
+    async def close_idle(self) -> None:
+        if self.smtp is not None and time.monotonic() - self.last_used >= self.idle_timeout:
+            await self.close()
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Send one message, reconnecting once if the kept session turns out to be closed.
+
+        :param message: Message.
+        :type message: EmailMessage
+        """
+        for retry in (False, True):
+            smtp = await self.connect()
+            try:
+                await smtp.send_message(message)
+                break
+            except SMTPServerDisconnected:
+                self.smtp = None
+                if retry:
+                    raise
+        self.last_used = time.monotonic()
+
+    async def send_many(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """
+        Send messages one after another over the same session.
+
+        A message refused by the server does not stop the batch. When the server cannot be
+        reached, the remaining messages fail with the same error without further attempts.
+
+        :param messages: Messages.
+        :type messages: list[EmailMessage]
+        :return: Error of every message, ``None`` for the sent ones.
+        :rtype: list[Exception | None]
+        """
+        errors: list[Exception | None] = []
+        for message in messages:
+            try:
+                await self.send(message)
+                errors.append(None)
+            except CONNECTION_ERRORS as err:
+                logger.warning("SMTP server unavailable: %s", err)
+                errors += [err] * (len(messages) - len(errors))
+                await self.close()
+                break
+            except SMTPException as err:
+                errors.append(err)
+        return errors
+
+
+class SMTPPool:
+    """
+    A fixed number of :class:`SMTPSender` sessions that a batch is split across, so that the
+    round-trips of one session overlap with those of the others.
+
+    :param size: Number of sessions.
+    :type size: int
+    :param options: :class:`SMTPSender` arguments.
+    """
+
+    def __init__(self, size: int = settings.smtp_pool_size, **options):
+        self.senders = [SMTPSender(**options) for _ in range(size)]
+
+    @property
+    def sessions(self) -> int:
+        return sum(sender.sessions for sender in self.senders)
+
+    async def send_many(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """
+        Send messages, every session taking an equal share.
+
+        :param messages: Messages.
+        :type messages: list[EmailMessage]
+        :return: Error of every message, ``None`` for the sent ones.
+        :rtype: list[Exception | None]
+        """
+        size = len(self.senders)
+        shares = await asyncio.gather(*(sender.send_many(messages[i::size]) for i, sender in enumerate(self.senders)
+                                        if messages[i::size]))
+        errors: list[Exception | None] = [None] * len(messages)
+        for i, share in enumerate(shares):
+            errors[i::size] = share
+        return errors
+
+    async def close_idle(self) -> None:
+        for sender in self.senders:
+            await sender.close_idle()
+
+    async def close(self) -> None:
+        for sender in self.senders:
+            await sender.close()
@@ -0,0 +1,54 @@
+from fastapi import Response, status
+
+# Clients may keep per-user responses but must revalidate them on every use.
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong entity tag from version numbers and other parts.
+
+    :param parts: Values the response body depends on.
+    :return: Quoted entity tag.
+    :rtype: str
+    """
+    return '"' + ".".join(str(part) for part in parts) + '"'
+
+
+def parse_if_none_match(header: str | None) -> set[str]:
+    """
+    Split an ``If-None-Match`` header into entity tags, weak or not.
+
+    :param header: Header value.
+    :type header: str | None
+    :return: Quoted entity tags without the ``W/`` prefix, or ``{"*"}``.
+    :rtype: set[str]
+    """
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Empty 304 response carrying the current entity tag.
+
+    :param etag: Entity tag.
+    :type etag: str
+    :return: Response.
+    :rtype: Response
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """
+    Attach the entity tag and revalidation policy to a full response.
+
+    :param response: Response.
+    :type response: Response
+    :param etag: Entity tag.
+    :type etag: str
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
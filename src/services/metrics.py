@@ -0,0 +1,140 @@
+import bisect
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Upper bounds in seconds of the latency buckets, Prometheus client defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label of requests that matched no route, so that scanners cannot grow the series without bound.
+UNMATCHED = "<unmatched>"
+
+
+class RouteMetrics:
+    """
+    Latency histogram and status code counters of one method and route.
+    """
+
+    __slots__ = ("buckets", "sum", "count", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.statuses: dict[int, int] = {}
+
+
+class Metrics:
+    """
+    In-process request metrics rendered in the Prometheus text format.
+
+    Series are keyed by method and route path template, not by the raw URL. Counters are plain
+    attributes: the event loop runs one request step at a time, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        metrics.sum += seconds
+        metrics.count += 1
+        metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+
+    def render(self) -> str:
+        """
+        Render all series in the Prometheus text exposition format.
+
+        :return: Exposition text.
+        :rtype: str
+        """
+        lines = [
+            "# HELP http_requests_in_flight Requests being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Finished requests by method, route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        routes = sorted(self.routes.items())
+        for (method, route), metrics in routes:
+            for status_code, count in sorted(metrics.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",'
+                             f'status="{status_code}"}} {count}')
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by method and route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+        return "\n".join(lines) + "\n"
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the route that handled the request, e.g. ``/api/contacts/{contact_id}``.
+
+    :param scope: ASGI scope after the request was routed.
+    :type scope: Scope
+    :return: Path template, or :data:`UNMATCHED`.
+    :rtype: str
+    """
+    return getattr(scope.get("route"), "path", UNMATCHED)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that records latency, status code and in-flight count of HTTP requests.
+
+    Latency runs until the handler returns, so a streamed body is included. A request that
+    raises is counted as 500.
+
+    :param app: Wrapped application.
+    :type app: ASGIApp
+    :param registry: Where to record, the module-level :data:`metrics` by default.
+    :type registry: Metrics
+    """
+
+    def __init__(self, app: ASGIApp, registry: Metrics = metrics):
+        self.app = app
+        self.metrics = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry = self.metrics
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight -= 1
+            registry.observe(scope["method"], route_template(scope), status_code, elapsed)
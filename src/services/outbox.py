@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from itertools import groupby
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.conf.config import settings
+from src.database.connect import SessionLocal
+from src.repository import outbox as repository_outbox
+from src.services.email import SMTPPool, SMTPSender, build_messages
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """
+    Background task that sends the e-mails of the outbox table in batches over kept SMTP sessions.
+
+    The worker polls every ``poll_interval`` seconds, or right away after :meth:`wake`, and keeps
+    claiming batches while they come back full. Failed e-mails are retried with backoff by the
+    repository. Every process may run its own worker: claimed rows are leased.
+
+    :param session_factory: Factory of database sessions.
+    :type session_factory: async_sessionmaker[AsyncSession]
+    :param sender: SMTP sender or pool of senders.
+    :type sender: SMTPSender | SMTPPool
+    :param batch_size: Maximum e-mails per batch.
+    :type batch_size: int
+    :param poll_interval: Seconds between polls of an empty outbox.
+    :type poll_interval: float
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], sender: SMTPSender | SMTPPool,
+                 batch_size: int = settings.outbox_batch_size, poll_interval: float = settings.outbox_poll_interval):
+        self.session_factory = session_factory
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.task: asyncio.Task | None = None
+        self.wakeup: asyncio.Event | None = None
+        self.stats = {"batches": 0, "sent": 0, "failed": 0}
+
+    async def send_batch(self) -> int:
+        """
+        Claim one batch of due e-mails, send it and record the outcome.
+
+        :return: Number of claimed e-mails.
+        :rtype: int
+        """
+        async with self.session_factory() as db:
+            entries = await repository_outbox.claim_batch(self.batch_size, db)
+            if not entries:
+                return 0
+            sent, failed, errors = [], [], []
+            for kind, group in groupby(sorted(entries, key=lambda entry: entry.kind), key=lambda entry: entry.kind):
+                group = list(group)
+                try:
+                    messages = build_messages(kind, [(entry.recipient, entry.username, entry.host) for entry in group])
+                except Exception as err:
+                    logger.exception("Cannot render %s e-mails", kind)
+                    failed += group
+                    errors += [err] * len(group)
+                    continue
+                for entry, error in zip(group, await self.sender.send_many(messages)):
+                    if error is None:
+                        sent.append(entry.id)
+                    else:
+                        failed.append(entry)
+                        errors.append(error)
+            await repository_outbox.mark_sent(sent, db)
+            await repository_outbox.mark_failed(failed, errors, db)
+        self.stats["batches"] += 1
+        self.stats["sent"] += len(sent)
+        self.stats["failed"] += len(failed)
+        if failed:
+            logger.warning("%d of %d e-mails failed, first error: %s", len(failed), len(entries), errors[0])
+        return len(entries)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                claimed = await self.send_batch()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            await self.sender.close_idle()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def wake(self) -> None:
+        """
+        Make a running worker poll now instead of at the next interval.
+        """
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.wakeup = None
+        await self.sender.close()
+
+
+outbox_worker = OutboxWorker(SessionLocal, SMTPPool())
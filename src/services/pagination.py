@@ -0,0 +1,40 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, status
+
+from src.conf import messages
+
+
+def encode_cursor(*values) -> str:
+    """
+    Pack the sort key of the last returned row into an opaque cursor.
+
+    :param values: Sort key values, e.g. contact ID.
+    :return: URL-safe cursor string.
+    :rtype: str
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """
+    Unpack a cursor made by :func:`encode_cursor`.
+
+    :param cursor: Cursor string from the client.
+    :type cursor: str
+    :param types: Expected type (or tuple of types) of every value in the cursor.
+    :return: Sort key values.
+    :rtype: list
+    :raises HTTPException: 400 if the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(types) \
+            or not all(isinstance(value, type_) for value, type_ in zip(values, types)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_CURSOR_ERROR)
+    return values
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+import redis.asyncio as redis
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.redis_pool import redis_client
+from src.services.auth import auth_service
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS = "anonymous"
+USER = "user"
+
+
+@dataclass(frozen=True)
+class Limit:
+    times: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.times / self.seconds
+
+
+def parse_limits(spec: str) -> dict[tuple[str, str], Limit]:
+    """
+    Parse ``RATE_LIMITS`` overrides, e.g. ``search_contacts=50/60,export_contacts.anonymous=0/60``.
+
+    Every entry is ``route[.tier]=times/seconds``; ``route`` may be ``*`` and a missing tier
+    means every tier.
+
+    :param spec: Comma-separated entries.
+    :type spec: str
+    :return: Limit by route and tier, ``*`` standing for any.
+    :rtype: dict[tuple[str, str], Limit]
+    """
+    limits = {}
+    for entry in filter(None, (entry.strip() for entry in spec.split(","))):
+        target, value = entry.split("=")
+        route, _, tier = target.strip().partition(".")
+        times, seconds = value.split("/")
+        limits[(route, tier or "*")] = Limit(int(times), float(seconds))
+    return limits
+
+
+class Bucket:
+    """
+    Token bucket of one route and client, plus what it consumed since the last reconciliation.
+
+    The bucket starts with the whole limit; reconciliation scales its size and refill rate to
+    this process' share of the cluster-wide count of the current window.
+    """
+
+    __slots__ = ("limit", "tokens", "updated", "pending", "capacity", "rate", "window", "counted",
+                 "blocked_until")
+
+    def __init__(self, limit: Limit, now: float):
+        self.limit = limit
+        self.tokens = self.capacity = float(limit.times)
+        self.rate = limit.rate
+        self.updated = now
+        self.pending = 0
+        self.window = -1
+        self.counted = 0
+        self.blocked_until = 0.0
+
+    def take(self, now: float) -> float:
+        """
+        Take a token.
+
+        :param now: Monotonic time.
+        :type now: float
+        :return: 0 if a token was taken, otherwise seconds until one is available.
+        :rtype: float
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.pending += 1
+            return 0
+        return (1 - self.tokens) / self.rate if self.rate else self.limit.seconds
+
+    def idle(self, now: float) -> bool:
+        return not self.pending and self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+    def reconcile(self, total: int, now: float, window_left: float) -> None:
+        """
+        Apply the cluster-wide count of the current window.
+
+        :param total: Requests counted in the window by every process.
+        :type total: int
+        :param now: Monotonic time.
+        :type now: float
+        :param window_left: Seconds until the window ends.
+        :type window_left: float
+        """
+        limit = self.limit
+        share = min(1.0, self.counted / total) if total else 1.0
+        self.capacity = max(1.0, limit.times * share)
+        self.rate = limit.rate * share
+        self.tokens = min(self.tokens, self.capacity, limit.times - total)
+        if total >= limit.times:
+            self.tokens = 0
+            self.updated = self.blocked_until = now + window_left
+
+
+class HybridRateLimiter:
+    """
+    Rate limiter that decides every request from in-process token buckets and reconciles with
+    Redis in the background, so requests pay no network round-trip.
+
+    Every ``sync_interval`` seconds the tokens each bucket consumed are added in one pipeline
+    to a Redis counter of the bucket's current window, shared by all processes. The bucket is
+    then left with no more tokens than the limit minus that cluster-wide count, so across
+    processes a client gets about ``times`` requests per window. Between reconciliations each
+    process may admit up to a full bucket on its own. When Redis is unavailable the consumed
+    counts are kept for the next reconciliation and requests are still limited per process.
+
+    At most ``max_buckets`` buckets are kept; the least recently used one is evicted first,
+    with its unreconciled count, so neither many clients nor a long Redis outage grow the
+    process without bound.
+
+    Clients are users, identified by the ``sub`` of a valid access token (tier ``user``), or
+    otherwise IP addresses (tier ``anonymous``), see :func:`identify`. Limits declared on routes
+    can be overridden per route and tier with ``RATE_LIMITS``.
+
+    :param client: Redis client.
+    :type client: redis.Redis
+    :param sync_interval: Seconds between reconciliations.
+    :type sync_interval: float
+    :param overrides: Limits that replace the declared ones, see :func:`parse_limits`.
+    :type overrides: dict[tuple[str, str], Limit]
+    :param max_buckets: The most buckets kept.
+    :type max_buckets: int
+    :param trusted_proxies: Addresses of the proxies whose ``X-Forwarded-For`` is trusted.
+    :type trusted_proxies: frozenset[str]
+    """
+
+    def __init__(self, client: redis.Redis, sync_interval: float, overrides: dict[tuple[str, str], Limit],
+                 max_buckets: int = 100_000, trusted_proxies: frozenset[str] = frozenset()):
+        self.redis = client
+        self.sync_interval = sync_interval
+        self.overrides = overrides
+        self.max_buckets = max_buckets
+        self.trusted_proxies = trusted_proxies
+        self.buckets: OrderedDict[tuple[str, str], Bucket] = OrderedDict()
+        self.task: asyncio.Task | None = None
+        self.stats = {"allowed": 0, "rejected": 0, "syncs": 0, "sync_errors": 0, "evicted": 0}
+
+    def resolve(self, route: str, tier: str, declared: Limit) -> Limit:
+        overrides = self.overrides
+        for key in ((route, tier), (route, "*"), ("*", tier), ("*", "*")):
+            limit = overrides.get(key)
+            if limit is not None:
+                return limit
+        return declared
+
+    def hit(self, route: str, tier: str, client: str, declared: Limit) -> float:
+        """
+        Count a request against its bucket.
+
+        :param route: Route name.
+        :type route: str
+        :param tier: ``user`` or ``anonymous``.
+        :type tier: str
+        :param client: User or IP address.
+        :type client: str
+        :param declared: Limit declared on the route.
+        :type declared: Limit
+        :return: 0 if allowed, otherwise seconds to wait.
+        :rtype: float
+        """
+        key = (route, f"{tier}:{client}")
+        now = time.monotonic()
+        buckets = self.buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = Bucket(self.resolve(route, tier, declared), now)
+            if len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+                self.stats["evicted"] += 1
+        else:
+            buckets.move_to_end(key)
+        retry_after = bucket.take(now)
+        self.stats["allowed" if retry_after == 0 else "rejected"] += 1
+        return retry_after
+
+    def limit(self, route: str, times: int, seconds: float) -> Callable:
+        """
+        Dependency that limits a route.
+
+        :param route: Route name, used in ``RATE_LIMITS`` and in the Redis keys.
+        :type route: str
+        :param times: Requests allowed per ``seconds`` for every client.
+        :type times: int
+        :param seconds: Length of the window.
+        :type seconds: float
+        :return: Dependency raising 429 with ``Retry-After`` when the limit is reached.
+        :rtype: Callable
+        """
+        declared = Limit(times, seconds)
+
+        async def dependency(request: Request) -> None:
+            tier, client = identify(request, self.trusted_proxies)
+            retry_after = self.hit(route, tier, client, declared)
+            if retry_after:
+                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests",
+                                    headers={"Retry-After": str(math.ceil(retry_after))})
+
+        return dependency
+
+    async def sync(self) -> None:
+        """
+        Reconcile the consumed tokens of every bucket with Redis and drop idle full buckets.
+        """
+        now = time.monotonic()
+        wall = time.time()
+        active = []
+        for key, bucket in list(self.buckets.items()):
+            if bucket.pending:
+                active.append((key, bucket, bucket.pending))
+            elif bucket.idle(now):
+                del self.buckets[key]
+        if not active:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for (route, client), bucket, pending in active:
+                    window = int(wall // bucket.limit.seconds)
+                    counter = f"ratelimit:{route}:{client}:{window}"
+                    pipe.incrby(counter, pending)
+                    pipe.expire(counter, math.ceil(bucket.limit.seconds) + 1)
+                results = await pipe.execute()
+        except RedisError as err:
+            self.stats["sync_errors"] += 1
+            logger.warning("Rate limit reconciliation failed: %s", err)
+            return
+        self.stats["syncs"] += 1
+        now = time.monotonic()
+        for (_, bucket, pending), total in zip(active, results[::2]):
+            seconds = bucket.limit.seconds
+            window = int(wall // seconds)
+            if bucket.window != window:
+                bucket.window, bucket.counted = window, 0
+            bucket.counted += pending
+            bucket.pending -= pending
+            bucket.reconcile(total, now, seconds - wall % seconds)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Rate limit reconciliation failed")
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            await self.sync()
+
+    def report(self) -> dict:
+        return {**self.stats, "buckets": len(self.buckets)}
+
+
+def identify(request: Request, trusted_proxies: frozenset[str] = frozenset()) -> tuple[str, str]:
+    """
+    Tier and client of a request: the user of a valid bearer access token, otherwise the IP
+    address.
+
+    ``X-Forwarded-For`` is only read when the request comes from a trusted proxy, since any
+    client can send it. The address is then the last one in the header that is not a trusted
+    proxy, the one the outermost trusted proxy saw.
+
+    :param request: Request.
+    :type request: Request
+    :param trusted_proxies: Addresses of trusted proxies.
+    :type trusted_proxies: frozenset[str]
+    :return: Tier and client.
+    :rtype: tuple[str, str]
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer":
+        claims = auth_service.access_claims(token)
+        if claims is not None:
+            return USER, claims["sub"]
+    # Some ASGI servers and test transports leave the client address unset.
+    address = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and address in trusted_proxies:
+        for hop in reversed(forwarded.split(",")):
+            address = hop.strip()
+            if address not in trusted_proxies:
+                break
+    return ANONYMOUS, address
+
+
+rate_limiter = HybridRateLimiter(
+    redis_client,
+    sync_interval=settings.rate_limit_sync_interval,
+    overrides=parse_limits(settings.rate_limits),
+    max_buckets=settings.rate_limit_max_buckets,
+    trusted_proxies=frozenset(filter(None, (address.strip() for address in settings.trusted_proxies.split(",")))),
+)
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import secrets
+import time
+
+import redis.asyncio as redis
+from fastapi import HTTPException, status
+from redis.exceptions import NoScriptError, RedisError
+
+from src.conf import messages
+from src.conf.config import settings
+from src.database.redis_pool import redis_client
+from src.services.auth import auth_service
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] is the family, ARGV the presented token, its successor and the successor's lifetime.
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# KEYS[1] marks a legacy token as adopted, KEYS[2] is the new family; ARGV the new family, the
+# marker's lifetime, the first token and its lifetime. A token adopted before returns the family it
+# was swapped for, which the caller revokes: the script only touches the keys it is given.
+ADOPT_SCRIPT = """
+local family = redis.call('GET', KEYS[1])
+if family then
+    return family
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[2], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+
+SCRIPTS = {script: hashlib.sha1(script.encode()).hexdigest() for script in (ROTATE_SCRIPT, ADOPT_SCRIPT)}
+
+
+def unavailable(err: RedisError) -> HTTPException:
+    logger.warning("Refresh token store failed: %s", err)
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail=messages.TOKEN_STORE_UNAVAILABLE_ERROR)
+
+
+class RefreshTokenStore:
+    """
+    Rotating refresh token families in Redis.
+
+    Login starts a family: a random ``fam`` claim shared by every refresh token descending from
+    that login. Each token also carries a random ``jti``, and Redis keeps the ``jti`` of the only
+    token of the family that may still be used, expiring with it. Refreshing checks and replaces
+    it in one script. Presenting any other token of the family means one of them was stolen,
+    so the family is revoked and both the thief and the user have to log in again.
+
+    Tokens issued before families existed have neither claim and were only valid when equal to
+    ``users.refresh_token``. The route checks that column, read-only, and :meth:`adopt` swaps
+    such a token once for the first token of a new family. The column is no longer written and
+    can be dropped once the last legacy token has expired.
+
+    Redis errors fail closed with 503, since a token cannot be checked without the store.
+
+    :param client: Redis client.
+    :type client: redis.Redis
+    :param ttl: Lifetime of a refresh token in seconds.
+    :type ttl: int
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int):
+        self.redis = client
+        self.ttl = ttl
+        self.stats = {"issued": 0, "rotated": 0, "adopted": 0, "reused": 0, "unknown": 0}
+
+    @staticmethod
+    def family_key(family: str) -> str:
+        return f"refresh:family:{family}"
+
+    @staticmethod
+    def legacy_key(token: str) -> str:
+        return f"refresh:legacy:{hashlib.sha256(token.encode()).hexdigest()}"
+
+    async def run(self, script: str, keys: tuple, *args) -> int:
+        try:
+            return await self.redis.evalsha(SCRIPTS[script], len(keys), *keys, *args)
+        except NoScriptError:
+            return await self.redis.eval(script, len(keys), *keys, *args)
+
+    async def create(self, email: str, family: str) -> tuple[str, str]:
+        jti = secrets.token_urlsafe(16)
+        token = await auth_service.create_refresh_token(data={"sub": email, "fam": family, "jti": jti},
+                                                        expires_delta=self.ttl)
+        return token, jti
+
+    async def issue(self, email: str) -> str:
+        """
+        Start a family for a new login.
+
+        :param email: User's e-mail.
+        :type email: str
+        :return: Refresh token.
+        :rtype: str
+        """
+        family = secrets.token_urlsafe(16)
+        token, jti = await self.create(email, family)
+        try:
+            await self.redis.set(self.family_key(family), jti, ex=self.ttl)
+        except RedisError as err:
+            raise unavailable(err)
+        self.stats["issued"] += 1
+        return token
+
+    async def rotate(self, claims: dict) -> str | None:
+        """
+        Replace the current token of a family with its successor.
+
+        :param claims: Verified claims of the presented refresh token.
+        :type claims: dict
+        :return: New refresh token, or None if the token was reused or its family is gone.
+        :rtype: str | None
+        """
+        family = claims["fam"]
+        token, jti = await self.create(claims["sub"], family)
+        try:
+            result = await self.run(ROTATE_SCRIPT, (self.family_key(family),), claims["jti"], jti, self.ttl)
+        except RedisError as err:
+            raise unavailable(err)
+        if result == 1:
+            self.stats["rotated"] += 1
+            return token
+        self.stats["reused" if result == -1 else "unknown"] += 1
+        return None
+
+    async def adopt(self, token: str, claims: dict) -> str | None:
+        """
+        Swap a legacy refresh token, already matched against ``users.refresh_token``, for the
+        first token of a new family.
+
+        :param token: Legacy refresh token.
+        :type token: str
+        :param claims: Its verified claims.
+        :type claims: dict
+        :return: New refresh token, or None if the legacy token was already swapped, in which
+            case the family it was swapped for is revoked.
+        :rtype: str | None
+        """
+        family = secrets.token_urlsafe(16)
+        new_token, jti = await self.create(claims["sub"], family)
+        legacy_ttl = max(1, int(claims["exp"] - time.time()))
+        try:
+            result = await self.run(ADOPT_SCRIPT, (self.legacy_key(token), self.family_key(family)),
+                                    family, legacy_ttl, jti, self.ttl)
+            if result == 1:
+                self.stats["adopted"] += 1
+                return new_token
+            if isinstance(result, bytes):
+                result = result.decode()
+            await self.redis.delete(self.family_key(result))
+        except RedisError as err:
+            raise unavailable(err)
+        self.stats["reused"] += 1
+        return None
+
+
+refresh_tokens = RefreshTokenStore(redis_client, ttl=settings.refresh_token_ttl)
@@ -1,12 +1,20 @@
-from unittest.mock import MagicMock
+import asyncio
 
-from src.conf.messages import USER_EXISTS_ERROR
-from src.database.models import User
+import pytest
 
+from src.conf.messages import USER_EXISTS_ERROR, INVALID_REFRESH_TOKEN_ERROR
+from src.database.models import EmailOutbox, User
+from src.services.auth import auth_service
+from src.services.refresh_tokens import refresh_tokens
 
-def test_create_user(client, user, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+
+@pytest.fixture
+def token_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(refresh_tokens, "redis", fakeredis.FakeAsyncRedis())
+
+
+def test_create_user(client, session, user):
     response = client.post(
         "/api/auth/signup",
         json=user,
@@ -15,6 +23,9 @@ def test_create_user(client, user, monkeypatch):
     data = response.json()
     assert data["user"]["email"] == user.get("email")
     assert "id" in data["user"]
+    entry = session.query(EmailOutbox).filter(EmailOutbox.recipient == user.get("email")).one()
+    assert entry.kind == "confirm_email"
+    assert entry.username == user.get("username")
 
 
 def test_repeat_create_user(client, user):
@@ -27,6 +38,16 @@ def test_repeat_create_user(client, user):
     assert data["detail"] == USER_EXISTS_ERROR
 
 
+def test_create_user_case_insensitive(client, session, user):
+    response = client.post(
+        "/api/auth/signup",
+        json={**user, "email": user.get("email").upper()},
+    )
+    assert response.status_code == 409, response.text
+    assert response.json()["detail"] == USER_EXISTS_ERROR
+    assert session.query(EmailOutbox).filter(EmailOutbox.recipient == user.get("email").upper()).count() == 0
+
+
 def test_login_user_not_confirmed(client, user):
     response = client.post(
         "/api/auth/login",
@@ -37,7 +58,7 @@ def test_login_user_not_confirmed(client, user):
     assert data["detail"] == "Email not confirmed"
 
 
-def test_login_user(client, session, user):
+def test_login_user(client, session, user, token_store):
     current_user: User = session.query(User).filter(User.email == user.get('email')).first()
     current_user.confirmed = True
     session.commit()
@@ -67,4 +88,33 @@ def test_login_wrong_email(client, user):
     )
     assert response.status_code == 401, response.text
     data = response.json()
-    assert data["detail"] == "Invalid email"
\ No newline at end of file
+    assert data["detail"] == "Invalid email"
+
+
+def test_refresh_token_rotation(client, user, token_store):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    first = response.json()["refresh_token"]
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {first}"})
+    assert response.status_code == 200, response.text
+    second = response.json()["refresh_token"]
+    assert auth_service.decode_refresh_claims(second)["fam"] == auth_service.decode_refresh_claims(first)["fam"]
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {first}"})
+    assert response.status_code == 401, response.text
+    assert response.json()["detail"] == INVALID_REFRESH_TOKEN_ERROR
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {second}"})
+    assert response.status_code == 401, response.text
+
+
+def test_legacy_refresh_token(client, session, user, token_store):
+    current_user: User = session.query(User).filter(User.email == user.get('email')).first()
+    legacy = asyncio.run(auth_service.create_refresh_token(data={"sub": user.get('email')}))
+    current_user.refresh_token = legacy
+    session.commit()
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {legacy}"})
+    assert response.status_code == 200, response.text
+    assert "fam" in auth_service.decode_refresh_claims(response.json()["refresh_token"])
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {legacy}"})
+    assert response.status_code == 401, response.text
@@ -0,0 +1,92 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+import main
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.cache import response_cache
+
+
+@pytest.fixture(scope="module")
+def current_user(client, session):
+    user = User(username="sparse", email="sparse@example.com", password="x", confirmed=True)
+    session.add(user)
+    session.commit()
+    main.app.dependency_overrides[auth_service.get_current_user] = lambda: User(id=user.id)
+    yield user
+    del main.app.dependency_overrides[auth_service.get_current_user]
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    # The shared Redis pool cannot follow TestClient from one event loop to the next.
+    monkeypatch.setattr(response_cache, "routes", set())
+    monkeypatch.setattr(response_cache, "invalidate", AsyncMock())
+
+
+def test_import_sparse_row_is_readable(client, current_user):
+    response = client.post(
+        "/api/contacts/import",
+        content=b"first_name,last_name,email,phone_number\nSparse,Row,,\nBad,Email,not-an-email,\n",
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 1
+    assert [error["row"] for error in response.json()["errors"]] == [2]
+
+    response = client.get("/api/contacts/")
+    assert response.status_code == 200, response.text
+    contact = response.json()[0]
+    assert (contact["first_name"], contact["email"], contact["phone_number"]) == ("Sparse", None, None)
+
+    response = client.get("/api/contacts/search", params={"query": "Sparse"})
+    assert response.status_code == 200, response.text
+    assert [found["id"] for found in response.json()] == [contact["id"]]
+
+    response = client.get(f"/api/contacts/{contact['id']}")
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] is None
+
+
+def test_get_contacts_by_phone(client, current_user):
+    response = client.post("/api/contacts/", json={
+        "id": 0, "first_name": "Caller", "last_name": "Id", "email": None, "phone_number": "050 123 45 67",
+        "birthday": None, "additional_info": None,
+    })
+    assert response.status_code == 201, response.text
+
+    response = client.get("/api/contacts/by-phone/+380501234567")
+    assert response.status_code == 200, response.text
+    assert [contact["first_name"] for contact in response.json()] == ["Caller"]
+
+    response = client.get("/api/contacts/by-phone/12")
+    assert response.status_code == 422, response.text
+
+
+def test_find_duplicates(client, current_user):
+    for contact_id, first_name in ((101, "John"), (102, "Jon")):
+        response = client.post("/api/contacts/", json={
+            "id": contact_id, "first_name": first_name, "last_name": "Smith", "email": None, "phone_number": None,
+            "birthday": None, "additional_info": None,
+        })
+        assert response.status_code == 201, response.text
+
+    response = client.get("/api/contacts/duplicates")
+    assert response.status_code == 200, response.text
+    groups = response.json()["groups"]
+    assert [[contact["first_name"] for contact in group["contacts"]] for group in groups] == [["John", "Jon"]]
+    assert groups[0]["reasons"] == ["name"]
+
+
+def test_contact_etag_does_not_match_other_ids(client, current_user):
+    response = client.post("/api/contacts/", json={
+        "id": 201, "first_name": "Tagged", "last_name": "Contact", "email": None, "phone_number": None,
+        "birthday": None, "additional_info": None,
+    })
+    assert response.status_code == 201, response.text
+
+    etag = client.get("/api/contacts/201").headers["ETag"]
+    assert client.get("/api/contacts/201", headers={"If-None-Match": etag}).status_code == 304
+    response = client.get("/api/contacts/999", headers={"If-None-Match": etag})
+    assert response.status_code == 404, response.text
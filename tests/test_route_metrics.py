@@ -0,0 +1,18 @@
+from src.conf.config import settings
+
+
+def test_metrics(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "internal-secret")
+    headers = {"Authorization": "Bearer internal-secret"}
+    client.get("/api/stats/cache", headers=headers)
+    response = client.get("/metrics", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/api/stats/cache",status="200"}' in response.text
+
+
+def test_metrics_require_internal_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "internal-secret")
+    assert client.get("/metrics").status_code == 401
+    monkeypatch.setattr(settings, "internal_token", None)
+    assert client.get("/metrics", headers={"Authorization": "Bearer internal-secret"}).status_code == 404
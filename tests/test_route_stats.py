@@ -0,0 +1,23 @@
+import pytest
+
+from src.conf.config import settings
+
+
+@pytest.fixture
+def internal_token(monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "internal-secret")
+    return "internal-secret"
+
+
+def test_stats_disabled_without_internal_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", None)
+    response = client.get("/api/stats/pool", headers={"Authorization": "Bearer anything"})
+    assert response.status_code == 404, response.text
+
+
+def test_stats_require_internal_token(client, internal_token):
+    for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": f"Basic {internal_token}"}):
+        response = client.get("/api/stats/pool", headers=headers)
+        assert response.status_code == 401, response.text
+    response = client.get("/api/stats/pool", headers={"Authorization": f"Bearer {internal_token}"})
+    assert response.status_code == 200, response.text
@@ -0,0 +1,111 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, User
+from src.services.avatars import AvatarPipeline, LocalAvatarStorage, avatar_key, render_avatars
+
+
+def image_bytes(width: int, height: int, image_format: str = "PNG", color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="avatar.png")
+
+
+class TestRenderAvatars(unittest.TestCase):
+
+    def test_square_jpegs_of_every_size(self):
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as source:
+            source.write(image_bytes(1200, 800, "JPEG"))
+            source.flush()
+            avatars = render_avatars(source.name, (250, 100, 50))
+        self.assertEqual(set(avatars), {250, 100, 50})
+        for size, data in avatars.items():
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual((image.format, image.size), ("JPEG", (size, size)))
+
+
+class TestAvatarPipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.session_factory() as db:
+            db.add_all([User(username=name, email=f"{name}@example.com", password="x") for name in ("ann", "bob")])
+            await db.commit()
+        self.storage = LocalAvatarStorage(self.directory.name, "/static/avatars")
+        self.pipeline = AvatarPipeline(self.storage, self.session_factory, (250, 50), workers=2, max_bytes=100_000)
+        patcher = patch("src.repository.users.user_cache", AsyncMock())
+        self.user_cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        self.pipeline.shutdown()
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def avatar(self, email: str) -> str | None:
+        async with self.session_factory() as db:
+            return await db.scalar(select(User.avatar).where(User.email == email))
+
+    async def test_upload_is_resized_stored_and_set(self):
+        digest = await self.pipeline.accept(upload(image_bytes(400, 300)), "ann@example.com")
+        await self.pipeline.drain()
+        for size in (250, 50):
+            with Image.open(Path(self.directory.name) / avatar_key(digest, size)) as image:
+                self.assertEqual(image.size, (size, size))
+        self.assertEqual(await self.avatar("ann@example.com"), f"/static/avatars/{digest}_250.jpg")
+        self.assertEqual(self.pipeline.url(digest), f"/static/avatars/{digest}_250.jpg")
+        self.user_cache.invalidate.assert_awaited_once_with("ann@example.com")
+
+    async def test_same_content_is_rendered_once(self):
+        data = image_bytes(400, 300)
+        first = await self.pipeline.accept(upload(data), "ann@example.com")
+        second = await self.pipeline.accept(upload(data), "bob@example.com")
+        await self.pipeline.drain()
+        third = await self.pipeline.accept(upload(data), "bob@example.com")
+        await self.pipeline.drain()
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertEqual(self.pipeline.stats, {"accepted": 3, "rendered": 1, "deduplicated": 2, "failed": 0,
+                                               "rejected": 0})
+        self.assertEqual(await self.avatar("bob@example.com"), self.pipeline.url(first))
+
+    async def test_not_an_image_is_rejected(self):
+        with self.assertRaises(HTTPException) as error:
+            await self.pipeline.accept(upload(b"\x89PNG" + bytes(1024)), "ann@example.com")
+        self.assertEqual(error.exception.status_code, 400)
+        self.assertEqual(self.pipeline.stats["accepted"], 0)
+        self.assertEqual(self.pipeline.pending, 0)
+
+    async def test_too_large_upload_is_rejected(self):
+        with self.assertRaises(HTTPException) as error:
+            await self.pipeline.accept(upload(bytes(100_001)), "ann@example.com")
+        self.assertEqual(error.exception.status_code, 413)
+
+    async def test_pending_uploads_are_bounded(self):
+        self.pipeline.max_pending = 1
+        first = await self.pipeline.accept(upload(image_bytes(400, 300)), "ann@example.com")
+        with self.assertRaises(HTTPException) as error:
+            await self.pipeline.accept(upload(image_bytes(400, 300, color="blue")), "bob@example.com")
+        self.assertEqual((error.exception.status_code, error.exception.headers), (503, {"Retry-After": "1"}))
+        await self.pipeline.drain()
+        self.assertEqual(self.pipeline.pending, 0)
+        second = await self.pipeline.accept(upload(image_bytes(400, 300, color="blue")), "bob@example.com")
+        await self.pipeline.drain()
+        self.assertNotEqual(first, second)
+        self.assertEqual((self.pipeline.stats["accepted"], self.pipeline.stats["rejected"]), (2, 1))
@@ -0,0 +1,185 @@
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException, Response
+from jose import jwt
+from redis.exceptions import ConnectionError, NoScriptError
+
+from src.database.models import User
+from src.schemas import CurrentUser
+from src.services.auth import auth_service
+from src.services.cache import LRUCache, UserCache, ResponseCache, TokenCache, LOOKUP_SCRIPT, LOOKUP_SHA
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_expires(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        with patch("src.services.cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+        with patch("src.services.cache.time.monotonic", return_value=161):
+            self.assertIsNone(cache.get("a"))
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.cache = UserCache(self.redis, maxsize=10, local_ttl=30, ttl=900)
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com", password="x", avatar=None,
+                         confirmed=True)
+
+    async def test_set_then_local_hit(self):
+        cached = await self.cache.set(self.user)
+        self.redis.set.assert_awaited_once_with("user:deadpool@example.com", cached.model_dump_json(), ex=900)
+        self.assertNotIn("password", cached.model_dump_json())
+        self.assertEqual(await self.cache.get(self.user.email), cached)
+        self.assertEqual(self.cache.stats["local_hits"], 1)
+        self.redis.get.assert_not_awaited()
+
+    async def test_redis_hit(self):
+        cached = CurrentUser.model_validate(self.user)
+        self.redis.get.return_value = cached.model_dump_json().encode()
+        self.assertEqual(await self.cache.get(self.user.email), cached)
+        self.assertEqual(self.cache.stats["redis_hits"], 1)
+        self.assertEqual(len(self.cache.local), 1)
+
+    async def test_miss(self):
+        self.redis.get.return_value = None
+        self.assertIsNone(await self.cache.get(self.user.email))
+        self.assertEqual(self.cache.stats["redis_misses"], 1)
+
+    async def test_invalidate(self):
+        await self.cache.set(self.user)
+        await self.cache.invalidate(self.user.email)
+        self.redis.delete.assert_awaited_once_with("user:deadpool@example.com")
+        self.redis.get.return_value = None
+        self.assertIsNone(await self.cache.get(self.user.email))
+
+    async def test_redis_error_is_a_miss(self):
+        self.redis.get.side_effect = ConnectionError()
+        self.assertIsNone(await self.cache.get(self.user.email))
+        self.assertEqual(self.cache.stats["redis_errors"], 1)
+
+
+class TestTokenCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.cache = TokenCache(maxsize=10)
+
+    def test_hit_until_exp(self):
+        self.cache.set("token", {"sub": "a@example.com", "exp": time.time() + 60})
+        self.assertEqual(self.cache.get("token")["sub"], "a@example.com")
+        with patch("src.services.cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(self.cache.get("token"))
+        self.assertEqual(self.cache.report(), {"hits": 1, "misses": 1, "hit_ratio": 0.5, "size": 0})
+
+    def test_expired_or_exp_less_claims_are_not_cached(self):
+        self.cache.set("expired", {"sub": "a@example.com", "exp": time.time() - 1})
+        self.cache.set("forever", {"sub": "a@example.com"})
+        self.assertEqual(len(self.cache.local), 0)
+
+    def test_keyed_by_hash(self):
+        self.cache.set("token", {"exp": time.time() + 60})
+        self.assertNotIn("token", self.cache.local._data)
+
+    async def test_current_user_verifies_token_once(self):
+        token = await auth_service.create_access_token(data={"sub": "deadpool@example.com"})
+        user = CurrentUser(id=1, username="deadpool", email="deadpool@example.com", avatar=None, confirmed=True)
+        user_cache = AsyncMock()
+        user_cache.get.return_value = user
+        with patch("src.services.auth.token_cache", self.cache), patch("src.services.auth.user_cache", user_cache), \
+                patch("src.services.auth.jwt.decode", wraps=jwt.decode) as decode:
+            self.assertEqual(await auth_service.get_current_user(token, db=None), user)
+            self.assertEqual(await auth_service.get_current_user(token, db=None), user)
+        decode.assert_called_once()
+        self.assertEqual(self.cache.stats, {"hits": 1, "misses": 1})
+
+    async def test_refresh_token_is_rejected_from_cache_too(self):
+        token = await auth_service.create_refresh_token(data={"sub": "deadpool@example.com"})
+        with patch("src.services.auth.token_cache", self.cache):
+            for _ in range(2):
+                with self.assertRaises(HTTPException):
+                    await auth_service.get_current_user(token, db=None)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.cache = ResponseCache(self.redis, ttl=300, routes=["read_contacts"])
+        self.response = Response(content=b'[{"id": 1}]', media_type="application/json",
+                                 headers={"X-Next-Cursor": "abc"})
+        self.render = AsyncMock(return_value=self.response)
+
+    async def test_miss_stores_response(self):
+        self.redis.evalsha.return_value = [b"7"]
+        response = await self.cache.get_or_render("read_contacts", 1, {"limit": 10}, self.render)
+        self.assertIs(response, self.response)
+        key = self.cache.key("read_contacts", 1, b"7", {"limit": 10})
+        self.assertTrue(key.startswith("response:1:7:read_contacts:"))
+        self.redis.set.assert_awaited_once_with(key, self.cache.encode(self.response), ex=300)
+        self.assertEqual(self.cache.stats["read_contacts"]["misses"], 1)
+
+    async def test_hit_is_one_round_trip(self):
+        self.redis.evalsha.return_value = [b"7", self.cache.encode(self.response)]
+        response = await self.cache.get_or_render("read_contacts", 1, {"limit": 10}, self.render)
+        self.render.assert_not_awaited()
+        self.assertEqual(response.body, self.response.body)
+        self.assertEqual(response.headers["X-Next-Cursor"], "abc")
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(self.cache.report()["read_contacts"]["hit_ratio"], 1.0)
+        self.redis.evalsha.assert_awaited_once()
+        self.assertEqual(self.redis.evalsha.await_args.args[:3], (LOOKUP_SHA, 1, "contacts:generation:1"))
+        self.redis.get.assert_not_awaited()
+
+    async def test_script_is_sent_when_not_loaded(self):
+        self.redis.evalsha.side_effect = NoScriptError()
+        self.redis.eval.return_value = [b"7", self.cache.encode(self.response)]
+        await self.cache.get_or_render("read_contacts", 1, {"limit": 10}, self.render)
+        self.assertEqual(self.redis.eval.await_args.args[0], LOOKUP_SCRIPT)
+        self.render.assert_not_awaited()
+
+    async def test_params_order_does_not_matter(self):
+        self.assertEqual(self.cache.key("r", 1, b"7", {"a": 1, "b": 2}), self.cache.key("r", 1, b"7", {"b": 2, "a": 1}))
+        self.assertNotEqual(self.cache.key("r", 1, b"7", {"a": 1}), self.cache.key("r", 1, b"8", {"a": 1}))
+
+    async def test_missing_generation_is_a_miss(self):
+        self.redis.evalsha.return_value = []
+        await self.cache.get_or_render("read_contacts", 1, {}, self.render)
+        self.render.assert_awaited_once()
+        self.redis.set.assert_not_awaited()
+        self.assertEqual(self.cache.stats["read_contacts"]["misses"], 1)
+
+    async def test_disabled_route(self):
+        response = await self.cache.get_or_render("search_contacts", 1, {}, self.render)
+        self.assertIs(response, self.response)
+        self.redis.evalsha.assert_not_awaited()
+
+    async def test_redis_error_renders(self):
+        self.redis.evalsha.side_effect = ConnectionError()
+        response = await self.cache.get_or_render("read_contacts", 1, {}, self.render)
+        self.assertIs(response, self.response)
+        self.assertEqual(self.cache.stats["read_contacts"]["errors"], 1)
+
+    async def test_invalidate_replaces_generation(self):
+        await self.cache.invalidate(1)
+        self.assertEqual(self.redis.set.await_args.args[0], "contacts:generation:1")
+        self.assertEqual(self.cache.report(), {"read_contacts": {"hits": 0, "misses": 0, "errors": 0,
+                                                                 "hit_ratio": None}})
+
+
+if __name__ == '__main__':
+    unittest.main()
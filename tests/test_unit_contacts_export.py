@@ -0,0 +1,50 @@
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+from src.database.models import User
+from src.services.contacts_export import encode_csv, encode_ndjson, export_contacts
+
+ROW = (1, "A", "B, C", "a@test.com", "123", date(1990, 1, 2), None)
+
+
+async def batches(*rows):
+    for batch in rows:
+        yield batch
+
+
+class TestExportContacts(unittest.TestCase):
+
+    def test_encode_csv(self):
+        self.assertEqual(encode_csv([ROW], header=True).decode().splitlines(), [
+            "id,first_name,last_name,email,phone_number,birthday,additional_info",
+            '1,A,"B, C",a@test.com,123,1990-01-02,',
+        ])
+
+    def test_encode_ndjson(self):
+        self.assertEqual(encode_ndjson([ROW, ROW]).decode().splitlines()[1],
+                         '{"id": 1, "first_name": "A", "last_name": "B, C", "email": "a@test.com", '
+                         '"phone_number": "123", "birthday": "1990-01-02", "additional_info": null}')
+
+
+class TestExportStream(unittest.IsolatedAsyncioTestCase):
+
+    async def collect(self, fmt, *rows):
+        db = AsyncMock()
+        with patch("src.services.contacts_export.repository_contacts.stream_contacts",
+                   return_value=batches(*rows)):
+            chunks = [chunk async for chunk in export_contacts(fmt, db, User(id=1))]
+        db.close.assert_awaited_once()
+        return chunks
+
+    async def test_chunk_per_batch(self):
+        chunks = await self.collect("csv", [ROW], [ROW, ROW])
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 2])
+
+    async def test_empty_csv_has_header(self):
+        self.assertEqual(await self.collect("csv"), [encode_csv([], header=True)])
+        self.assertEqual(await self.collect("ndjson"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
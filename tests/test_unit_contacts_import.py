@@ -0,0 +1,92 @@
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+from pydantic import TypeAdapter, EmailStr, ValidationError
+
+from src.database.models import User
+from src.schemas import ContactImportSchema
+from src.services.contacts_import import iter_csv, iter_ndjson, import_contacts
+
+
+async def chunked(body: bytes, size: int = 7):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def collect(rows):
+    return [row async for batch in rows for row in batch]
+
+
+class TestParsers(unittest.IsolatedAsyncioTestCase):
+
+    async def test_csv_across_chunks(self):
+        body = 'First_Name,last_name,email\r\nA,B,\r\n"C, D","multi\nline",é@test.com\r\nE\r\n'.encode()
+        rows = await collect(iter_csv(chunked(body)))
+        self.assertEqual(rows, [
+            {"first_name": "A", "last_name": "B", "email": None},
+            {"first_name": "C, D", "last_name": "multi\nline", "email": "é@test.com"},
+            "Expected 3 fields, got 1",
+        ])
+
+    async def test_csv_unterminated_quote(self):
+        rows = await collect(iter_csv(chunked(b'first_name\n"A\n')))
+        self.assertEqual(rows, ["Unterminated quoted field"])
+
+    async def test_ndjson(self):
+        body = b'{"first_name": "A"}\n\n[1]\n{bad\n{"first_name": "B"}'
+        rows = await collect(iter_ndjson(chunked(body)))
+        self.assertEqual(rows[0], {"first_name": "A"})
+        self.assertEqual(rows[1], "Expected a JSON object")
+        self.assertTrue(rows[2].startswith("Invalid JSON"))
+        self.assertEqual(rows[3], {"first_name": "B"})
+
+
+class TestImportSchema(unittest.TestCase):
+
+    def test_email_rules_match_email_str(self):
+        email_str = TypeAdapter(EmailStr)
+        for email in ["a.b+c@Example.COM", "é@test.com", "John <j@x.com>", "a@xn--80ak6aa92e.com"]:
+            contact = ContactImportSchema(first_name="A", last_name="B", email=email)
+            self.assertEqual(contact.email, email_str.validate_python(email))
+        for email in ["a..b@x.com", "a@localhost", "a@x.invalid", "not-an-email"]:
+            with self.assertRaises(ValidationError):
+                ContactImportSchema(first_name="A", last_name="B", email=email)
+
+
+class TestImportContacts(unittest.IsolatedAsyncioTestCase):
+
+    async def test_batches_and_errors(self):
+        body = (b'first_name,last_name,email,birthday\n'
+                b'A,B,a@test.com,1990-01-02\n'
+                b',B,b@test.com,\n'
+                b'C,D,not-an-email,\n'
+                b'E,F,,\n'
+                b'G,H,g@test.com,\n')
+        batches, errors = [], [{}, {0: "Email already exists"}]
+
+        async def create(rows, db, user):
+            batches.append(list(rows))
+            return errors[len(batches) - 1]
+
+        with patch("src.services.contacts_import.repository_contacts.create_contacts_bulk", create), \
+                patch("src.services.contacts_import.settings.import_batch_size", 2):
+            result = await import_contacts(chunked(body), "csv", AsyncMock(), User(id=1))
+        self.assertEqual([[row["first_name"] for row in batch] for batch in batches], [["A", "E"], ["G"]])
+        self.assertEqual(batches[0][0]["birthday"], date(1990, 1, 2))
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(result.failed, 3)
+        self.assertEqual([error.row for error in result.errors], [2, 3, 5])
+        self.assertEqual(result.errors[2].errors, ["Email already exists"])
+
+    async def test_errors_truncated(self):
+        body = b'first_name,last_name\n' + b',\n' * 3
+        with patch("src.services.contacts_import.settings.import_max_errors", 2):
+            result = await import_contacts(chunked(body), "csv", AsyncMock(), User(id=1))
+        self.assertEqual(result.failed, 3)
+        self.assertEqual(len(result.errors), 2)
+        self.assertTrue(result.errors_truncated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from src.database.models import User
+from src.services.duplicates import (
+    DuplicateFinder,
+    find_duplicates,
+    name_key,
+    normalize_email,
+    soundex,
+)
+
+
+class TestKeys(unittest.TestCase):
+
+    def test_normalize_email(self):
+        self.assertEqual(normalize_email(" John.Doe+work@Example.com"), "john.doe@example.com")
+        self.assertEqual(normalize_email("j.o.h.n@googlemail.com"), "john@gmail.com")
+        self.assertIsNone(normalize_email("not an email"))
+        self.assertIsNone(normalize_email(None))
+
+    def test_soundex(self):
+        self.assertEqual(soundex("Robert"), "R163")
+        self.assertEqual(soundex("Rupert"), "R163")
+        self.assertEqual(soundex("Ashcraft"), "A261")
+        self.assertEqual(soundex("Tymczak"), "T522")
+        self.assertEqual(soundex("Pfister"), "P236")
+        self.assertEqual(soundex("Lee"), "L000")
+        self.assertEqual(soundex("Шевченко"), "шевченко")
+
+    def test_name_key(self):
+        self.assertEqual(name_key("Jon", "Smyth"), name_key("John", "Smith"))
+        self.assertIsNone(name_key("", None))
+
+
+class TestDuplicateFinder(unittest.TestCase):
+
+    def test_groups(self):
+        finder = DuplicateFinder(max_block=50)
+        finder.add([
+            (1, "John", "Smith", "john@example.com", None, None),
+            (2, "Johnny", "S.", "John@Example.com", "+380501234567", None),
+            (3, "Anna", "Lee", None, "+380501234567", None),
+            (4, "Jon", "Smyth", None, None, None),
+            (5, "Mary", "Major", "mary@example.com", None, date(1990, 1, 1)),
+            (6, "Marie", "Major", "mary@example.org", None, None),
+            (7, "Mary", "Major", None, None, date(1991, 1, 1)),
+            (8, "Solo", "Contact", "solo@example.com", "+3801112233", None),
+        ])
+        groups, skipped = finder.groups()
+        self.assertEqual(groups, [([1, 2, 3, 4], ["email", "name", "phone"]), ([6, 7], ["name"])])
+        self.assertEqual(skipped, 0)
+
+    def test_name_match_without_conflict(self):
+        finder = DuplicateFinder(max_block=50)
+        finder.add([(1, "Mary", "Major", None, None, date(1990, 1, 1)), (2, "Marie", "Major", None, None, None)])
+        self.assertEqual(finder.groups(), ([([1, 2], ["name"])], 0))
+
+    def test_large_block_skipped(self):
+        finder = DuplicateFinder(max_block=3)
+        finder.add([(i, name, None, None, "+3805550100", None) for i, name in enumerate(["Ann", "Bob", "Carl", "Dora"])])
+        self.assertEqual(finder.groups(), ([], 1))
+
+    def test_large_name_block_split_by_birthday(self):
+        finder = DuplicateFinder(max_block=3)
+        finder.add([(i, "John", "Smith", f"john{i}@example.com", None, date(1990, 1, i)) for i in range(1, 6)])
+        finder.add([(6, "Jon", "Smith", None, None, date(1990, 1, 2))])
+        self.assertEqual(finder.groups(), ([([2, 6], ["name"])], 0))
+
+    def test_ambiguous_name_match(self):
+        finder = DuplicateFinder(max_block=50)
+        finder.add([
+            (1, "John", "Smith", "john@example.com", None, None),
+            (2, "John", "Smith", "smith@example.com", None, None),
+            (3, "Jon", "Smith", None, None, None),
+        ])
+        self.assertEqual(finder.groups(), ([], 0))
+
+
+class TestFindDuplicates(unittest.IsolatedAsyncioTestCase):
+
+    async def test_find_duplicates(self):
+        async def stream(db, user, batch_size):
+            yield [(1, "John", "Smith", "john@example.com", None, None)]
+            yield [(2, "Ann", "Lee", "JOHN@example.com", None, None)]
+
+        with patch("src.services.duplicates.repository_contacts.stream_contact_keys", stream):
+            groups, skipped = await find_duplicates(db=None, user=User(id=1))
+        self.assertEqual(groups, [([1, 2], ["email"])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException, Response
+
+from src.database.models import Contact, User
+from src.routes.contacts import get_contact, read_contacts
+from src.services.etag import make_etag, parse_if_none_match
+
+
+class TestEtag(unittest.TestCase):
+
+    def test_make_etag(self):
+        self.assertEqual(make_etag(3, 1), '"3.1"')
+
+    def test_parse_if_none_match(self):
+        self.assertEqual(parse_if_none_match('"1", W/"2.3" ,*'), {'"1"', '"2.3"', '*'})
+        self.assertEqual(parse_if_none_match(None), set())
+
+
+@patch("src.routes.contacts.response_cache.routes", set())
+@patch("src.routes.contacts.repository_contacts")
+class TestConditionalReads(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.db = AsyncMock()
+        self.user = User(id=1)
+
+    async def test_list_not_modified(self, repository):
+        repository.get_contacts_version = AsyncMock(return_value=5)
+        response = await read_contacts(10, 0, None, '"5"', self.db, self.user)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], '"5"')
+        repository.get_contacts.assert_not_called()
+
+    async def test_list_modified(self, repository):
+        repository.get_contacts_version = AsyncMock(return_value=6)
+        repository.get_contacts = AsyncMock(return_value=[])
+        response = await read_contacts(10, 0, None, '"5"', self.db, self.user)
+        self.assertEqual(response.body, b"[]")
+        self.assertEqual(response.headers["ETag"], '"6"')
+
+    async def test_contact_same_collection_version(self, repository):
+        repository.get_contacts_version = AsyncMock(return_value=5)
+        response = await get_contact(Response(), 1, '"5.1.2"', self.db, self.user)
+        self.assertEqual(response.status_code, 304)
+        repository.get_contact.assert_not_called()
+
+    async def test_contact_unchanged_in_changed_collection(self, repository):
+        repository.get_contacts_version = AsyncMock(return_value=7)
+        repository.get_contact = AsyncMock(return_value=Contact(id=1, version=2))
+        response = await get_contact(Response(), 1, '"5.1.2"', self.db, self.user)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], '"7.1.2"')
+
+    async def test_contact_changed(self, repository):
+        contact = Contact(id=1, version=6)
+        repository.get_contacts_version = AsyncMock(return_value=7)
+        repository.get_contact = AsyncMock(return_value=contact)
+        response = Response()
+        self.assertEqual(await get_contact(response, 1, '"5.1.2"', self.db, self.user), contact)
+        self.assertEqual(response.headers["ETag"], '"7.1.6"')
+
+    async def test_other_contact_tag_is_not_a_match(self, repository):
+        repository.get_contacts_version = AsyncMock(return_value=5)
+        repository.get_contact = AsyncMock(return_value=None)
+        for tag in ('"5.1.2"', '"4.999.2"'):
+            with self.assertRaises(HTTPException) as error:
+                await get_contact(Response(), 999, tag, self.db, self.user)
+            self.assertEqual(error.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
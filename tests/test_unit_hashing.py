@@ -0,0 +1,34 @@
+import asyncio
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.hashing import PasswordHasher
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.hasher = PasswordHasher(workers=1, queue_size=0)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash("123456")
+        self.assertTrue(await self.hasher.verify("123456", hashed))
+        self.assertFalse(await self.hasher.verify("654321", hashed))
+        self.assertEqual(self.hasher.pending, 0)
+
+    async def test_saturated_pool(self):
+        running = asyncio.create_task(self.hasher.hash("123456"))
+        await asyncio.sleep(0)
+        with self.assertRaises(HTTPException) as err:
+            await self.hasher.hash("123456")
+        self.assertEqual(err.exception.status_code, 503)
+        self.assertEqual(self.hasher.rejected, 1)
+        await running
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.services.metrics import Metrics, MetricsMiddleware, UNMATCHED
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, registry=self.metrics)
+
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: int):
+            if item_id == 0:
+                raise HTTPException(status_code=404)
+            return {"id": item_id}
+
+        @app.get("/boom")
+        async def boom():
+            raise RuntimeError("boom")
+
+        self.client = TestClient(app, raise_server_exceptions=False)
+
+    def test_routes_are_labelled_by_template(self):
+        self.client.get("/items/1")
+        self.client.get("/items/2")
+        self.client.get("/items/0")
+        route = self.metrics.routes[("GET", "/items/{item_id}")]
+        self.assertEqual(route.count, 3)
+        self.assertEqual(route.statuses, {200: 2, 404: 1})
+        self.assertEqual(self.metrics.in_flight, 0)
+
+    def test_unmatched_and_errors(self):
+        self.client.get("/nowhere")
+        self.client.get("/boom")
+        self.assertEqual(self.metrics.routes[("GET", UNMATCHED)].statuses, {404: 1})
+        self.assertEqual(self.metrics.routes[("GET", "/boom")].statuses, {500: 1})
+
+    def test_render(self):
+        self.metrics.observe("GET", "/items/{item_id}", 200, 0.003)
+        self.metrics.observe("GET", "/items/{item_id}", 200, 0.2)
+        text = self.metrics.render()
+        self.assertIn('http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="0.005"} 1',
+                      text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="0.25"} 2',
+                      text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 2',
+                      text)
+        self.assertIn("http_requests_in_flight 0", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
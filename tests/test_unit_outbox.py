@@ -0,0 +1,232 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from email import message_from_bytes
+from unittest.mock import patch
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, EmailOutbox
+from src.repository import outbox as repository_outbox
+from src.repository.outbox import backoff
+from src.services.email import SMTPPool, SMTPSender, build_messages
+from src.services.outbox import OutboxWorker
+
+
+class StubSMTPServer:
+    """
+    Just enough of an SMTP server to accept mail on localhost, counting sessions and refusing
+    recipients listed in ``reject``.
+    """
+
+    def __init__(self, reject: set[str] = frozenset()):
+        self.reject = reject
+        self.sessions = 0
+        self.messages: list[tuple[list[str], bytes]] = []
+        self.writers = []
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.drop()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop(self) -> None:
+        for writer in self.writers:
+            writer.close()
+        self.writers.clear()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.sessions += 1
+        self.writers.append(writer)
+        recipients = []
+        writer.write(b"220 stub ESMTP\r\n")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip()
+                verb = command[:4].upper()
+                if verb == "EHLO":
+                    writer.write(b"250-stub\r\n250 8BITMIME\r\n")
+                elif verb == "RCPT":
+                    address = command.split(":", 1)[1].strip("<> ")
+                    if address in self.reject:
+                        writer.write(b"550 5.1.1 No such user\r\n")
+                    else:
+                        recipients.append(address)
+                        writer.write(b"250 OK\r\n")
+                elif verb == "DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    self.messages.append((recipients, data[:-5]))
+                    recipients = []
+                    writer.write(b"250 OK\r\n")
+                elif verb == "QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    if verb == "RSET":
+                        recipients = []
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def stub_sender(port: int) -> SMTPSender:
+    return SMTPSender(idle_timeout=60, hostname="127.0.0.1", port=port, use_tls=False, start_tls=False)
+
+
+class TestBackoff(unittest.TestCase):
+
+    def test_doubles_up_to_max(self):
+        with patch("src.repository.outbox.settings.outbox_backoff_base", 30), \
+                patch("src.repository.outbox.settings.outbox_backoff_max", 100):
+            self.assertEqual([backoff(attempts).total_seconds() for attempts in (1, 2, 3, 4)], [30, 60, 100, 100])
+
+
+class TestSMTPSender(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubSMTPServer(reject={"nobody@example.com"})
+        self.sender = stub_sender(await self.server.start())
+
+    async def asyncTearDown(self):
+        await self.sender.close()
+        await self.server.stop()
+
+    async def test_batch_uses_one_session(self):
+        recipients = [(f"user{i}@example.com", f"user{i}", "http://testserver/") for i in range(5)]
+        errors = await self.sender.send_many(build_messages("confirm_email", recipients))
+        self.assertEqual(errors, [None] * 5)
+        self.assertEqual(self.server.sessions, 1)
+        self.assertEqual(len(self.server.messages), 5)
+        body = message_from_bytes(self.server.messages[0][1]).get_payload(decode=True).decode()
+        self.assertIn("Hi user0", body)
+        self.assertIn("http://testserver/api/auth/confirmed_email/", body)
+
+    async def test_refused_recipient_does_not_stop_batch(self):
+        recipients = [("a@example.com", "a", "h/"), ("nobody@example.com", "n", "h/"), ("b@example.com", "b", "h/")]
+        errors = await self.sender.send_many(build_messages("confirm_email", recipients))
+        self.assertIsNone(errors[0])
+        self.assertIn("No such user", str(errors[1]))
+        self.assertIsNone(errors[2])
+        self.assertEqual([rcpt for rcpt, _ in self.server.messages], [["a@example.com"], ["b@example.com"]])
+        self.assertEqual(self.server.sessions, 1)
+
+    async def test_reconnects_after_server_drops_session(self):
+        messages = build_messages("confirm_email", [("a@example.com", "a", "h/"), ("b@example.com", "b", "h/")])
+        await self.sender.send_many(messages[:1])
+        self.server.drop()
+        await asyncio.sleep(0.01)
+        self.assertEqual(await self.sender.send_many(messages[1:]), [None])
+        self.assertEqual(self.server.sessions, 2)
+        self.assertEqual(len(self.server.messages), 2)
+
+    async def test_unreachable_server_fails_whole_batch(self):
+        await self.server.stop()
+        messages = build_messages("confirm_email", [("a@example.com", "a", "h/"), ("b@example.com", "b", "h/")])
+        errors = await self.sender.send_many(messages)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(all(isinstance(error, OSError) for error in errors))
+
+
+class TestSMTPPool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubSMTPServer(reject={"nobody@example.com"})
+        port = await self.server.start()
+        self.pool = SMTPPool(2, idle_timeout=60, hostname="127.0.0.1", port=port, use_tls=False, start_tls=False)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        await self.server.stop()
+
+    async def test_batch_split_across_sessions_keeps_order_of_errors(self):
+        recipients = [(f"user{i}@example.com", f"user{i}", "h/") for i in range(4)] + [("nobody@example.com", "n", "h/")]
+        errors = await self.pool.send_many(build_messages("confirm_email", recipients))
+        self.assertEqual(errors[:4], [None] * 4)
+        self.assertIn("No such user", str(errors[4]))
+        self.assertEqual(self.pool.sessions, 2)
+        self.assertEqual(len(self.server.messages), 4)
+        await self.pool.send_many(build_messages("confirm_email", recipients[:1]))
+        self.assertEqual(self.server.sessions, 2)
+
+
+class TestOutboxWorker(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.server = StubSMTPServer(reject={"nobody@example.com"})
+        self.worker = OutboxWorker(self.session_factory, stub_sender(await self.server.start()), batch_size=10,
+                                   poll_interval=60)
+
+    async def asyncTearDown(self):
+        await self.worker.stop()
+        await self.server.stop()
+        await self.engine.dispose()
+
+    async def enqueue(self, *recipients: str) -> None:
+        async with self.session_factory() as db:
+            for recipient in recipients:
+                await repository_outbox.enqueue_email("confirm_email", recipient, recipient.split("@")[0],
+                                                      "http://testserver/", db)
+
+    async def entries(self) -> list[EmailOutbox]:
+        async with self.session_factory() as db:
+            return list((await db.scalars(select(EmailOutbox))).all())
+
+    async def test_batch_sent_and_failure_rescheduled(self):
+        await self.enqueue("a@example.com", "nobody@example.com", "b@example.com")
+        started = datetime.utcnow()
+        self.assertEqual(await self.worker.send_batch(), 3)
+        self.assertEqual(self.server.sessions, 1)
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertEqual(self.worker.stats, {"batches": 1, "sent": 2, "failed": 1})
+        [entry] = await self.entries()
+        self.assertEqual(entry.recipient, "nobody@example.com")
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn("No such user", entry.last_error)
+        self.assertGreaterEqual(entry.next_attempt_at, started + backoff(1))
+        self.assertEqual(await self.worker.send_batch(), 0)
+
+    async def test_claimed_entries_are_leased(self):
+        await self.enqueue("a@example.com")
+        async with self.session_factory() as db:
+            self.assertEqual(len(await repository_outbox.claim_batch(10, db)), 1)
+            self.assertEqual(await repository_outbox.claim_batch(10, db), [])
+        [entry] = await self.entries()
+        self.assertGreater(entry.next_attempt_at, datetime.utcnow() + timedelta(seconds=60))
+
+    async def test_entries_past_max_attempts_are_not_claimed(self):
+        await self.enqueue("nobody@example.com")
+        with patch("src.repository.outbox.settings.outbox_max_attempts", 1), \
+                patch("src.repository.outbox.settings.outbox_backoff_base", 0):
+            self.assertEqual(await self.worker.send_batch(), 1)
+            self.assertEqual(await self.worker.send_batch(), 0)
+        [entry] = await self.entries()
+        self.assertEqual(entry.attempts, 1)
+
+    async def test_wake_sends_without_waiting_for_poll(self):
+        self.worker.start()
+        await asyncio.sleep(0.05)
+        await self.enqueue("a@example.com")
+        self.worker.wake()
+        # Wait for the whole batch, not just the message: stopping the worker while it still
+        # holds a session can leave the connection behind for teardown.
+        for _ in range(100):
+            if self.worker.stats["batches"]:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(self.worker.stats["sent"], 1)
@@ -0,0 +1,22 @@
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.pagination import encode_cursor, decode_cursor
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip(self):
+        cursor = encode_cursor(42)
+        self.assertEqual(decode_cursor(cursor, int), [42])
+
+    def test_malformed(self):
+        for cursor in ("not a cursor", encode_cursor("42"), encode_cursor(1, 2)):
+            with self.assertRaises(HTTPException) as err:
+                decode_cursor(cursor, int)
+            self.assertEqual(err.exception.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
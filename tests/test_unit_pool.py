@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.pool import TimedQueuePool, pool_options, pool_stats
+
+
+class TestPoolOptions(unittest.TestCase):
+
+    def test_queue_pool_from_settings(self):
+        options = pool_options(make_url("postgresql+asyncpg://u:p@localhost/db"))
+        self.assertIs(options["poolclass"], TimedQueuePool)
+        self.assertTrue(options["pool_pre_ping"])
+
+    def test_memory_sqlite_keeps_default_pool(self):
+        self.assertEqual(pool_options(make_url("sqlite+aiosqlite://")), {})
+
+
+class TestPoolStats(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "pool.db")
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=TimedQueuePool, pool_size=1,
+                                          max_overflow=0, pool_timeout=0.05)
+        pool_stats.reset()
+        pool_stats.listen(self.engine)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def test_checkouts_and_waits(self):
+        for _ in range(2):
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        report = pool_stats.report(self.engine)
+        self.assertEqual(report["checkouts"], 2)
+        self.assertEqual(report["connects"], 1)
+        self.assertEqual(report["peak_checked_out"], 1)
+        self.assertEqual(sum(report["wait_ms_histogram"].values()), 2)
+        self.assertEqual(report["size"], 1)
+        self.assertEqual(report["checked_out"], 0)
+
+    async def test_timeout(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            with self.assertRaises(TimeoutError):
+                async with self.engine.connect():
+                    pass
+        report = pool_stats.report(self.engine)
+        self.assertEqual(report["timeouts"], 1)
+        self.assertGreaterEqual(report["wait_ms_max"], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
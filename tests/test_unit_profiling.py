@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import profiling
+from src.database.profiling import QueryProfile, QueryProfilerMiddleware, current_profile, parameters_shape
+
+
+class TestParametersShape(unittest.TestCase):
+
+    def test_shapes(self):
+        self.assertEqual(parameters_shape((1, "a", None), False), "(int, str, NoneType)")
+        self.assertEqual(parameters_shape({"id": 1}, False), "{id: int}")
+        self.assertEqual(parameters_shape([(1, "a"), (2, "b")], True), "2 x (int, str)")
+
+
+class TestProfiling(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        profiling.listen(self.engine)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_profile_counts_queries(self):
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+        try:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT :x"), {"x": 1})
+                await connection.execute(text("SELECT :x"), {"x": 2})
+                await connection.execute(text("SELECT 2"))
+        finally:
+            current_profile.reset(token)
+        self.assertEqual(profile.count, 3)
+        self.assertGreater(profile.seconds, 0)
+        self.assertEqual(profile.repeated(2), [("SELECT ?", 2)])
+
+    async def test_slow_query_is_logged_without_values(self):
+        with patch("src.database.profiling.settings.sql_slow_query_ms", 0), \
+                self.assertLogs("src.database.profiling", "WARNING") as logs:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT :secret"), {"secret": "hunter2"})
+        self.assertIn("SELECT ?", logs.output[0])
+        self.assertIn("(str)", logs.output[0])
+        self.assertNotIn("hunter2", logs.output[0])
+
+
+class TestQueryProfilerMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        profiling.listen(self.engine)
+        app = FastAPI()
+        app.add_middleware(QueryProfilerMiddleware)
+
+        @app.get("/users/{user_id}")
+        async def read_user(user_id: int):
+            async with self.engine.connect() as connection:
+                for _ in range(3):
+                    await connection.execute(text("SELECT :id"), {"id": user_id})
+            return {"id": user_id}
+
+        self.client = TestClient(app)
+
+    def test_repeated_statements_are_flagged(self):
+        with patch("src.database.profiling.settings.sql_repeat_threshold", 3), \
+                self.assertLogs("src.database.profiling", "WARNING") as logs:
+            response = self.client.get("/users/1")
+        self.assertNotIn("server-timing", response.headers)
+        self.assertIn("GET /users/{user_id} ran the same statement 3 times: SELECT ?", logs.output[0])
+
+    def test_few_repeats_are_not_flagged(self):
+        with self.assertNoLogs("src.database.profiling", "WARNING"):
+            self.client.get("/users/1")
+
+    def test_server_timing_in_debug(self):
+        with patch("src.database.profiling.settings.debug", True):
+            response = self.client.get("/users/1")
+        self.assertRegex(response.headers["server-timing"], r'^db;dur=[\d.]+;desc="3 queries"$')
+
+
+if __name__ == '__main__':
+    unittest.main()
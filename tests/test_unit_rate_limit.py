@@ -0,0 +1,179 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+
+from src.services.auth import auth_service
+from src.services.rate_limit import ANONYMOUS, HybridRateLimiter, Limit, identify, parse_limits
+
+
+class StubRedis:
+    """
+    The pipelined ``INCRBY``/``EXPIRE`` subset of Redis the limiter uses, shared by limiters.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.fail = False
+
+    def pipeline(self, transaction: bool = True):
+        return StubPipeline(self)
+
+
+class StubPipeline:
+
+    def __init__(self, redis: StubRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def incrby(self, key: str, amount: int):
+        self.commands.append((key, amount))
+
+    def expire(self, key: str, seconds: int):
+        self.commands.append(None)
+
+    async def execute(self) -> list:
+        if self.redis.fail:
+            raise ConnectionError("down")
+        results = []
+        for command in self.commands:
+            if command is None:
+                results.append(True)
+            else:
+                key, amount = command
+                self.redis.counters[key] = self.redis.counters.get(key, 0) + amount
+                results.append(self.redis.counters[key])
+        return results
+
+
+class TestParseLimits(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_limits(" search_contacts=50/60, export_contacts.anonymous=0/60,*.user=100/1 ,"), {
+            ("search_contacts", "*"): Limit(50, 60),
+            ("export_contacts", "anonymous"): Limit(0, 60),
+            ("*", "user"): Limit(100, 1),
+        })
+
+
+class TestHybridRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = StubRedis()
+        self.limit = Limit(3, 60)
+
+    def limiter(self, overrides: dict | None = None) -> HybridRateLimiter:
+        return HybridRateLimiter(self.redis, sync_interval=1, overrides=overrides or {})
+
+    def test_bucket_refills_at_the_limit_rate(self):
+        limiter = self.limiter()
+        with patch("src.services.rate_limit.time.monotonic", return_value=1000):
+            self.assertEqual([limiter.hit("r", "user", "a", self.limit) for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(limiter.hit("r", "user", "a", self.limit), 20)
+            self.assertEqual(limiter.hit("r", "user", "b", self.limit), 0)
+        with patch("src.services.rate_limit.time.monotonic", return_value=1020):
+            self.assertEqual(limiter.hit("r", "user", "a", self.limit), 0)
+        self.assertEqual(limiter.stats, {"allowed": 5, "rejected": 1, "syncs": 0, "sync_errors": 0, "evicted": 0})
+
+    def test_overrides_by_route_and_tier(self):
+        limiter = self.limiter(parse_limits("r=10/60,r.anonymous=1/60,*.user=5/60"))
+        self.assertEqual(limiter.resolve("r", "anonymous", self.limit), Limit(1, 60))
+        self.assertEqual(limiter.resolve("r", "user", self.limit), Limit(10, 60))
+        self.assertEqual(limiter.resolve("other", "user", self.limit), Limit(5, 60))
+        self.assertEqual(limiter.resolve("other", "anonymous", self.limit), self.limit)
+
+    async def test_reconciliation_caps_buckets_to_cluster_wide_count(self):
+        first, second = self.limiter(), self.limiter()
+        self.assertEqual(first.hit("r", "user", "a", self.limit), 0)
+        self.assertEqual(first.hit("r", "user", "a", self.limit), 0)
+        await first.sync()
+        self.assertEqual(second.hit("r", "user", "a", self.limit), 0)
+        await second.sync()
+        self.assertGreater(second.hit("r", "user", "a", self.limit), 0)
+        await first.sync()
+        self.assertEqual(list(self.redis.counters.values()), [3])
+        self.assertEqual(first.stats["syncs"], 1)
+
+    async def test_bucket_shrinks_to_the_share_of_the_process(self):
+        limiter = self.limiter()
+        limit = Limit(8, 60)
+        limiter.hit("r", "user", "a", limit)
+        with patch("src.services.rate_limit.time.time", return_value=6000):
+            self.redis.counters["ratelimit:r:user:a:100"] = 3
+            await limiter.sync()
+        bucket = limiter.buckets[("r", "user:a")]
+        self.assertEqual((bucket.capacity, bucket.tokens), (2, 2))
+        self.assertAlmostEqual(bucket.rate, limit.rate / 4)
+
+    async def test_failed_reconciliation_is_retried(self):
+        limiter = self.limiter()
+        limiter.hit("r", "user", "a", self.limit)
+        self.redis.fail = True
+        await limiter.sync()
+        self.assertEqual(limiter.stats["sync_errors"], 1)
+        self.redis.fail = False
+        await limiter.sync()
+        self.assertEqual(list(self.redis.counters.values()), [1])
+
+    async def test_idle_full_buckets_are_dropped(self):
+        limiter = self.limiter()
+        with patch("src.services.rate_limit.time.monotonic", return_value=1000):
+            limiter.hit("r", "user", "a", self.limit)
+            await limiter.sync()
+        self.assertEqual(len(limiter.buckets), 1)
+        with patch("src.services.rate_limit.time.monotonic", return_value=1060):
+            await limiter.sync()
+        self.assertEqual(len(limiter.buckets), 0)
+
+    def test_least_recently_used_bucket_is_evicted(self):
+        limiter = HybridRateLimiter(self.redis, sync_interval=1, overrides={}, max_buckets=2)
+        for client in ("a", "b", "a", "c"):
+            limiter.hit("r", "anonymous", client, self.limit)
+        self.assertEqual(list(limiter.buckets), [("r", "anonymous:a"), ("r", "anonymous:c")])
+        self.assertEqual(limiter.stats["evicted"], 1)
+
+
+class TestRateLimitDependency(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.limiter = HybridRateLimiter(StubRedis(), sync_interval=1, overrides={},
+                                         trusted_proxies=frozenset({"testclient", "10.0.0.2"}))
+        app = FastAPI()
+
+        @app.get("/", dependencies=[Depends(self.limiter.limit("index", times=2, seconds=5))])
+        async def index():
+            return {}
+
+        self.client = TestClient(app)
+
+    def test_too_many_requests(self):
+        self.assertEqual([self.client.get("/").status_code for _ in range(2)], [200, 200])
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "3")
+
+    async def test_users_and_addresses_have_separate_buckets(self):
+        token = await auth_service.create_access_token(data={"sub": "deadpool@example.com"})
+        for headers in ({}, {"X-Forwarded-For": "10.0.0.1, 10.0.0.2"}, {"Authorization": f"Bearer {token}"}):
+            self.assertEqual([self.client.get("/", headers=headers).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(sorted(client for _, client in self.limiter.buckets),
+                         ["anonymous:10.0.0.1", "anonymous:testclient", "user:deadpool@example.com"])
+
+    def test_forwarded_for_needs_a_trusted_proxy(self):
+        self.limiter.trusted_proxies = frozenset()
+        for address in ("10.0.0.1", "10.0.0.3", "10.0.0.4"):
+            self.client.get("/", headers={"X-Forwarded-For": address})
+        self.assertEqual(self.client.get("/").status_code, 429)
+        self.assertEqual([client for _, client in self.limiter.buckets], ["anonymous:testclient"])
+
+    def test_request_without_client_address(self):
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"x-forwarded-for", b"10.0.0.1")]})
+        self.assertEqual(identify(request, frozenset({"10.0.0.2"})), (ANONYMOUS, "unknown"))
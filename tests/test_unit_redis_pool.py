@@ -0,0 +1,30 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from redis.exceptions import ConnectionError
+
+from src.database.redis_pool import TimedConnectionPool
+
+
+class TestTimedConnectionPool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pool = TimedConnectionPool(max_connections=1, timeout=0.01)
+        patcher = patch.object(self.pool, "ensure_connection", AsyncMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_waits_for_a_connection_and_times_out(self):
+        connection = await self.pool.get_connection()
+        with self.assertRaises(ConnectionError):
+            await self.pool.get_connection()
+        report = self.pool.report()
+        self.assertEqual((report["in_use"], report["idle"]), (1, 0))
+        self.assertEqual((report["checkouts"], report["timeouts"]), (2, 1))
+        self.assertGreaterEqual(report["wait_ms_max"], 10)
+        await self.pool.release(connection)
+        self.assertEqual(self.pool.report()["idle"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
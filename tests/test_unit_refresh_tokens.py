@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest.mock import AsyncMock
+
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+
+from src.services.auth import auth_service
+from src.services.refresh_tokens import RefreshTokenStore
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis[lua] is not installed")
+class TestRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.store = RefreshTokenStore(self.redis, ttl=3600)
+
+    async def asyncTearDown(self):
+        await self.redis.aclose()
+
+    async def test_rotation_chain(self):
+        token = await self.store.issue("deadpool@example.com")
+        for _ in range(3):
+            claims = auth_service.decode_refresh_claims(token)
+            token = await self.store.rotate(claims)
+            self.assertIsNotNone(token)
+        claims = auth_service.decode_refresh_claims(token)
+        self.assertEqual(claims["sub"], "deadpool@example.com")
+        family_key = self.store.family_key(claims["fam"])
+        self.assertEqual(await self.redis.get(family_key), claims["jti"].encode())
+        self.assertGreater(await self.redis.ttl(family_key), 3590)
+        self.assertEqual(self.store.stats, {"issued": 1, "rotated": 3, "adopted": 0, "reused": 0, "unknown": 0})
+
+    async def test_reuse_revokes_the_family(self):
+        stolen = auth_service.decode_refresh_claims(await self.store.issue("deadpool@example.com"))
+        current = auth_service.decode_refresh_claims(await self.store.rotate(stolen))
+        self.assertIsNone(await self.store.rotate(stolen))
+        self.assertIsNone(await self.store.rotate(current))
+        self.assertEqual((self.store.stats["reused"], self.store.stats["unknown"]), (1, 1))
+
+    async def test_families_are_independent(self):
+        first = auth_service.decode_refresh_claims(await self.store.issue("deadpool@example.com"))
+        second = auth_service.decode_refresh_claims(await self.store.issue("deadpool@example.com"))
+        self.assertNotEqual(first["fam"], second["fam"])
+        await self.store.rotate(first)
+        self.assertIsNone(await self.store.rotate(first))
+        self.assertIsNotNone(await self.store.rotate(second))
+
+    async def test_legacy_token_is_adopted_once(self):
+        legacy = await auth_service.create_refresh_token(data={"sub": "deadpool@example.com"})
+        claims = auth_service.decode_refresh_claims(legacy)
+        token = await self.store.adopt(legacy, claims)
+        adopted = auth_service.decode_refresh_claims(token)
+        self.assertIsNone(await self.store.adopt(legacy, claims))
+        self.assertFalse(await self.redis.exists(self.store.family_key(adopted["fam"])))
+        self.assertIsNone(await self.store.rotate(adopted))
+        ttl = await self.redis.ttl(self.store.legacy_key(legacy))
+        self.assertAlmostEqual(ttl, claims["exp"] - time.time(), delta=2)
+
+    async def test_redis_error_is_unavailable(self):
+        store = RefreshTokenStore(AsyncMock(), ttl=3600)
+        store.redis.set.side_effect = ConnectionError()
+        with self.assertRaises(HTTPException) as error:
+            await store.issue("deadpool@example.com")
+        self.assertEqual(error.exception.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,54 +1,132 @@
 import unittest
-from unittest.mock import MagicMock
+from datetime import date
+from unittest.mock import MagicMock, AsyncMock, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import User, Contact
+from src.database.models import User, Contact, birthday_key, phone_e164
 from src.schemas import ContactSchema, ContactBirthday
 from src.repository.contacts import (
     get_contact,
     get_contacts,
+    get_contacts_after,
+    stream_contacts,
     get_birthdays_week,
     create_contact,
+    create_contacts_bulk,
+    batch_contacts,
     update_contact,
     search_contacts,
     remove_contact,
+    get_contacts_by_phone,
+    get_contacts_by_ids,
+    merge_contacts,
 )
 
 
 class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
+        # Unlike execute() and commit(), these are not coroutines on AsyncSession.
+        self.session.add = MagicMock()
+        self.session.add_all = MagicMock()
+        self.session.expunge = MagicMock()
         self.user = User(id=1)
+        patcher = patch("src.repository.contacts.response_cache", AsyncMock())
+        self.response_cache = patcher.start()
+        self.addCleanup(patcher.stop)
 
     async def test_get_contacts(self):
         contacts = [Contact(), Contact(), Contact()]
-        self.session.query().filter().limit().offset().all.return_value = contacts
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
         result = await get_contacts(limit=10, offset=0, user=self.user, db=self.session)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_after(self):
+        contacts = [Contact(id=11), Contact(id=12)]
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result = await get_contacts_after(limit=10, after_id=10, db=self.session, user=self.user)
+        self.assertEqual(result, contacts)
+        stmt = str(self.session.execute.call_args.args[0])
+        self.assertIn("contacts.id >", stmt)
+        self.assertIn("ORDER BY contacts.id", stmt)
+
+    async def test_stream_contacts(self):
+        async def partitions():
+            yield [(1, 'A')]
+            yield [(2, 'B')]
+        mocked_result = MagicMock()
+        mocked_result.partitions.return_value = partitions()
+        self.session.stream.return_value = mocked_result
+        result = [rows async for rows in stream_contacts(db=self.session, user=self.user, batch_size=500)]
+        self.assertEqual(result, [[(1, 'A')], [(2, 'B')]])
+        stmt = self.session.stream.call_args.args[0]
+        self.assertEqual(stmt.get_execution_options()["yield_per"], 500)
+        self.assertIn("ORDER BY contacts.id", str(stmt))
+
     async def test_get_contact_found(self):
         contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = contact
+        self.session.execute.return_value = mocked_contact
         result = await get_contact(contact_id=0, db=self.session, user=self.user)
         self.assertEqual(result, contact)
 
     async def test_get_contact_not_found(self):
-        self.session.query().filter().first.return_value = None
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = None
+        self.session.execute.return_value = mocked_contact
         result = await get_contact(contact_id=0, db=self.session, user=self.user)
         self.assertIsNone(result)
 
     async def test_get_birthdays_week(self):
         contacts = [Contact(id=1, first_name='A', last_name='B', birthday='2020-01-01')]
         contacts_birthday = [ContactBirthday(id=1, first_name='A', last_name='B', birthday='2020-01-01')]
-        self.session.query().filter().all.return_value = contacts
+        mocked_contacts = MagicMock()
+        mocked_contacts.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
         result = await get_birthdays_week(db=self.session, user=self.user)
         self.assertEqual(contacts_birthday, result)
 
+    async def test_get_birthdays_week_year_wraparound(self):
+        self.session.execute.return_value = MagicMock()
+        with patch("src.repository.contacts.date") as mocked_date:
+            mocked_date.today.return_value = date(2023, 12, 29)
+            await get_birthdays_week(db=self.session, user=self.user, days=7)
+        stmt = self.session.execute.call_args.args[0].compile()
+        self.assertIn("contacts.birthday_key >= :birthday_key_1 OR contacts.birthday_key <= :birthday_key_2", str(stmt))
+        self.assertEqual((stmt.params["birthday_key_1"], stmt.params["birthday_key_2"]),
+                         (birthday_key(date(2000, 12, 29)), birthday_key(date(2000, 1, 5))))
+
+    def test_birthday_key(self):
+        self.assertEqual(birthday_key(date(1990, 1, 1)), 1)
+        self.assertEqual(birthday_key(date(1992, 2, 29)), 60)
+        self.assertEqual(birthday_key(date(1991, 3, 1)), 61)
+        self.assertEqual(Contact(birthday=date(1991, 12, 31)).birthday_key, 366)
+
+    def test_phone_e164(self):
+        self.assertEqual(phone_e164('+38 (050) 123-45-67'), '+380501234567')
+        self.assertEqual(phone_e164('050 123 45 67'), '+380501234567')
+        self.assertEqual(phone_e164('380501234567'), '+380501234567')
+        self.assertEqual(phone_e164('00380501234567'), '+380501234567')
+        self.assertEqual(phone_e164('+1 (555) 123-4567'), '+15551234567')
+        self.assertEqual(phone_e164('555 1234', country_code='1'), '+15551234')
+        self.assertIsNone(phone_e164('123'))
+        self.assertIsNone(phone_e164('+0501234567'))
+        self.assertIsNone(phone_e164(None))
+        self.assertEqual(Contact(phone_number='050 123 45 67').phone_e164, '+380501234567')
+
     async def test_create_contact(self):
         body = ContactSchema(id=1, first_name='A', last_name='B', birthday='2020-01-01', email='test@test.com',
                              phone_number='123', additional_info='other')
+        version = MagicMock()
+        version.scalar_one.return_value = 7
+        self.session.execute.return_value = version
         result = await create_contact(body=body, db=self.session, user=self.user)
         self.assertEqual(result.id, body.id)
         self.assertEqual(result.first_name, body.first_name)
@@ -57,39 +135,147 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.email, body.email)
         self.assertEqual(result.phone_number, body.phone_number)
         self.assertEqual(result.additional_info, body.additional_info)
+        self.assertEqual(result.version, 7)
         self.assertTrue(hasattr(result, 'id'))
+        self.session.add.assert_called_once_with(result)
+        self.session.commit.assert_awaited_once()
+        self.response_cache.invalidate.assert_awaited_once_with(1)
+
+    async def test_create_contacts_bulk(self):
+        rows = [dict(first_name='A', last_name='B', email=email, phone_number=None, birthday=None,
+                     additional_info=None) for email in ('a@test.com', 'b@test.com', 'a@test.com', 'c@test.com')]
+        existing = MagicMock()
+        existing.scalars.return_value = ['b@test.com']
+        self.session.execute.return_value = existing
+        errors = await create_contacts_bulk(rows=rows, db=self.session, user=self.user)
+        self.assertEqual(errors, {1: 'Email already exists', 2: 'Duplicate email in upload'})
+        inserted = self.session.execute.call_args.args[1]
+        self.assertEqual([row['email'] for row in inserted], ['a@test.com', 'c@test.com'])
+        self.session.add.assert_not_called()
+        self.session.add_all.assert_not_called()
+        self.session.commit.assert_awaited_once()
+
+    async def test_batch_contacts(self):
+        updates = [ContactSchema(id=contact_id, first_name='A', last_name='B', email=email, phone_number='123',
+                                 birthday='2020-01-01', additional_info=None)
+                   for contact_id, email in ((1, 'a@test.com'), (2, 'b@test.com'), (3, 'c@test.com'), (9, 'd@test.com'))]
+        owned, taken, version = MagicMock(), MagicMock(), MagicMock()
+        owned.scalars.return_value = [1, 2, 3, 4]
+        taken.__iter__.return_value = [(1, 'a@test.com'), (5, 'b@test.com')]
+        version.scalar_one.return_value = 7
+        self.session.execute.side_effect = [owned, taken, version, MagicMock(), MagicMock()]
+        results = await batch_contacts(updates=updates, deletes=[4, 8], db=self.session, user=self.user)
+        self.assertEqual([(r.id, r.action, r.status) for r in results], [
+            (1, 'update', 'updated'), (2, 'update', 'conflict'), (3, 'update', 'updated'), (9, 'update', 'not_found'),
+            (4, 'delete', 'deleted'), (8, 'delete', 'not_found'),
+        ])
+        values = self.session.execute.call_args_list[3].args[1]
+        self.assertEqual([value['contact_id'] for value in values], [1, 3])
+        self.assertEqual((values[0]['birthday_key'], values[0]['version']), (1, 7))
+        self.assertIn("contacts.id IN", str(self.session.execute.call_args_list[4].args[0]))
+        self.session.commit.assert_awaited_once()
 
     async def test_update_contact(self):
         body = Contact(id=1, first_name='A', last_name='B', birthday='2020-01-01', email='test@test.com',
                              phone_number='123', additional_info='other')
-        self.session.query().filter().first.return_value = body
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = body
+        self.session.execute.return_value = mocked_contact
         result = await update_contact(body=body, contact_id=1, db=self.session, user=self.user)
         self.assertEqual(result, body)
 
     async def test_update_contact_not_found(self):
         body = Contact(id=1, first_name='A', last_name='B', birthday='2020-01-01', email='test@test.com',
                              phone_number='123', additional_info='other')
-        self.session.query().filter().first.return_value = None
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = None
+        self.session.execute.return_value = mocked_contact
         result = await update_contact(body=body, contact_id=1, db=self.session, user=self.user)
         self.assertIsNone(result)
 
     async def test_search_contacts(self):
-        body = [Contact(), Contact()]
-        self.session.query().filter().all.return_value = body
-        result = await search_contacts(query="1", db=self.session, user=self.user)
+        body = [(Contact(), 1.0), (Contact(), 0.5)]
+        mocked_contacts = MagicMock()
+        mocked_contacts.all.return_value = body
+        self.session.execute.return_value = mocked_contacts
+        result = await search_contacts(query="1", limit=10, after=None, db=self.session, user=self.user)
         self.assertEqual(result, body)
 
+    async def test_search_contacts_empty_query(self):
+        result = await search_contacts(query="@ ", limit=10, after=None, db=self.session, user=self.user)
+        self.assertEqual(result, [])
+        self.session.execute.assert_not_awaited()
+
     async def test_remove_contact(self):
         body = Contact()
-        self.session.query().filter().first.return_value = body
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = body
+        self.session.execute.return_value = mocked_contact
         result = await remove_contact(contact_id='1', db=self.session, user=self.user)
         self.assertEqual(result, body)
+        self.response_cache.invalidate.assert_awaited_once_with(1)
 
     async def test_remove_contact_not_found(self):
-        self.session.query().filter().first.return_value = None
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = None
+        self.session.execute.return_value = mocked_contact
         result = await remove_contact(contact_id='1', db=self.session, user=self.user)
         self.assertIsNone(result)
+        self.response_cache.invalidate.assert_not_awaited()
+
+
+    async def test_get_contacts_by_phone(self):
+        contacts = [Contact(id=1, phone_number='0501234567'), Contact(id=2, phone_number='+380501234567')]
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result = await get_contacts_by_phone(phone='+380501234567', db=self.session, user=self.user)
+        self.assertEqual(result, contacts)
+        stmt = self.session.execute.await_args.args[0].compile()
+        self.assertIn('contacts.phone_e164 =', str(stmt))
+        self.assertEqual(stmt.params['phone_e164_1'], '+380501234567')
 
+    async def test_get_contacts_by_ids(self):
+        contacts = [Contact(id=1), Contact(id=3)]
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result = await get_contacts_by_ids(contact_ids=[3, 1], db=self.session, user=self.user)
+        self.assertEqual(result, contacts)
+        self.assertEqual(await get_contacts_by_ids(contact_ids=[], db=self.session, user=self.user), [])
+        self.session.execute.assert_awaited_once()
+
+    async def test_merge_contacts(self):
+        contact = Contact(id=2, first_name='A', last_name='B', email=None, phone_number='123', birthday=None,
+                          additional_info='work')
+        duplicates = [
+            Contact(id=1, first_name='A', last_name='B', email='a@test.com', phone_number='456',
+                    birthday=date(2000, 2, 1), additional_info='work'),
+            Contact(id=3, first_name='A', last_name='B', email='b@test.com', phone_number=None, birthday=None,
+                    additional_info='home'),
+        ]
+        found, version = MagicMock(), MagicMock()
+        found.scalars.return_value.all.return_value = [duplicates[0], contact, duplicates[1]]
+        version.scalar_one.return_value = 7
+        self.session.execute.side_effect = [found, MagicMock(), version]
+        result = await merge_contacts(contact_id=2, duplicate_ids=[1, 3], db=self.session, user=self.user)
+        self.assertIs(result, contact)
+        self.assertEqual((contact.email, contact.phone_number, contact.birthday, contact.birthday_key),
+                         ('a@test.com', '123', date(2000, 2, 1), 32))
+        self.assertEqual(contact.additional_info, 'work\nhome')
+        self.assertEqual(contact.version, 7)
+        self.assertTrue(str(self.session.execute.call_args_list[1].args[0]).startswith("DELETE FROM contacts"))
+        self.session.commit.assert_awaited_once()
+        self.response_cache.invalidate.assert_awaited_once_with(1)
+
+    async def test_merge_contacts_not_found(self):
+        found = MagicMock()
+        found.scalars.return_value.all.return_value = [Contact(id=2)]
+        self.session.execute.return_value = found
+        result = await merge_contacts(contact_id=2, duplicate_ids=[5], db=self.session, user=self.user)
+        self.assertIsNone(result)
+        self.session.commit.assert_not_awaited()
+        self.response_cache.invalidate.assert_not_awaited()
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
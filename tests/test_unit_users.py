@@ -1,7 +1,8 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas import UserModel
@@ -14,25 +15,51 @@ from src.repository.users import (
 class TestUsers(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
         self.user = User(id=1)
 
     async def test_user_by_email(self):
         body = User()
-        self.session.query().filter().first.return_value = body
+        mocked_user = MagicMock()
+        mocked_user.scalar_one_or_none.return_value = body
+        self.session.execute.return_value = mocked_user
         result = await get_user_by_email(email='@', db=self.session)
         self.assertEqual(result, body)
 
     async def test_user_by_email_not_found(self):
-        self.session.query().filter().first.return_value = None
+        mocked_user = MagicMock()
+        mocked_user.scalar_one_or_none.return_value = None
+        self.session.execute.return_value = mocked_user
         result = await get_user_by_email(email='@', db=self.session)
         self.assertIsNone(result)
 
+    async def test_user_by_email_ignores_case(self):
+        self.session.execute.return_value = MagicMock()
+        await get_user_by_email(email='Deadpool@Example.com', db=self.session)
+        stmt = self.session.execute.await_args.args[0]
+        self.assertIn("lower(users.email) = :lower_1", str(stmt))
+        self.assertEqual(stmt.compile().params["lower_1"], "deadpool@example.com")
+
     async def test_create_user(self):
         body = UserModel(username='Name111', email='@', password='123456', confirmed=True)
+        created = User(id=1, username=body.username, email=body.email)
+        mocked_result = MagicMock()
+        mocked_result.scalar_one.return_value = created
+        self.session.execute.return_value = mocked_result
         result = await create_user(body=body, db=self.session)
-        self.assertEqual(result.username, body.username)
-        self.assertEqual(result.email, body.email)
+        self.assertIs(result, created)
+        stmt = self.session.execute.await_args.args[0]
+        self.assertTrue(str(stmt).startswith("INSERT INTO users"))
+        self.assertIn("RETURNING", str(stmt))
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
+
+    async def test_create_user_email_taken(self):
+        body = UserModel(username='Name111', email='@', password='123456', confirmed=True)
+        self.session.execute.side_effect = IntegrityError("INSERT", {}, Exception("UNIQUE"))
+        self.assertIsNone(await create_user(body=body, db=self.session))
+        self.session.rollback.assert_awaited_once()
+        self.session.commit.assert_not_awaited()
 
 
 if __name__ == '__main__':